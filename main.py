@@ -1,27 +1,53 @@
-from live_inspect.watch_cursor import WatchCursor
+from src.desktop.environment import StartupTimer
+from psutil import Process
+startup=StartupTimer(started_at=Process().create_time())
+
 from contextlib import asynccontextmanager
 from fastmcp.utilities.types import Image
 from src.desktop.service import Desktop
-from humancursor import SystemCursor
-from markdownify import markdownify
+from src.desktop.dispatch import ToolDispatcher, check_value
+from src.desktop.views import DesktopState
+from src.desktop.config import TOOL_WORKERS, INPUT_PAUSE, LAUNCH_TIMEOUT, INPUT_HUMANLIKE, STARTUP_REPORT, STATE_DEBUG
+from src.desktop.inject import VK_RETURN
+from src.web.config import SCRAPE_TIMEOUT, SCRAPE_CONNECTIONS, SCRAPE_CONNECTIONS_PER_HOST, SCRAPE_KEEPALIVE, SCRAPE_MEMORY_ENTRIES, SCRAPE_CACHE_DIR, SCRAPE_CACHE_MAX_BYTES, SCRAPE_FRESH_FOR, SCRAPE_MAX_URLS, SCRAPE_MAX_BYTES, SCRAPE_CHUNK_SIZE, SCRAPE_PAGE_SIZE, SCRAPE_PAGE_TTL
+from src.tree.serializer import to_json
 from textwrap import dedent
 from fastmcp import FastMCP
 from typing import Literal
 import uiautomation as ua
 import pyautogui as pg
-import pyperclip as pc
-import requests
 import asyncio
 import click
 
 pg.FAILSAFE=False
-pg.PAUSE=1.0
+pg.PAUSE=INPUT_PAUSE
+startup.mark('interpreter and imports')
 
 desktop=Desktop()
-cursor=SystemCursor()
-watch_cursor=WatchCursor()
+dispatcher=ToolDispatcher(workers=TOOL_WORKERS)
+
+def to_markdown(html:str)->str:
+    from markdownify import markdownify
+    return markdownify(html=html)
+
+fetcher=None
+
+def get_fetcher():
+    '''The fetcher, with its caches, is made by the first scrape and not at server start.'''
+    global fetcher
+    if fetcher is None:
+        from src.web.service import WebFetcher
+        fetcher=WebFetcher(
+            convert=to_markdown,memory_entries=SCRAPE_MEMORY_ENTRIES,cache_dir=SCRAPE_CACHE_DIR,cache_max_bytes=SCRAPE_CACHE_MAX_BYTES,
+            fresh_for=SCRAPE_FRESH_FOR,timeout=SCRAPE_TIMEOUT,connections=SCRAPE_CONNECTIONS,connections_per_host=SCRAPE_CONNECTIONS_PER_HOST,keepalive=SCRAPE_KEEPALIVE,
+            max_bytes=SCRAPE_MAX_BYTES,chunk_size=SCRAPE_CHUNK_SIZE,page_size=SCRAPE_PAGE_SIZE,page_ttl=SCRAPE_PAGE_TTL
+        )
+    return fetcher
+
+startup.mark('desktop')
 windows_version=desktop.get_windows_version()
 default_language=desktop.get_default_language()
+startup.mark('environment (cached)' if desktop.environment.is_cached else 'environment (probed)')
 
 instructions=dedent(f'''
 Windows MCP server provides tools to interact directly with the {windows_version} desktop, 
@@ -31,42 +57,104 @@ thus enabling to operate the desktop on the user's behalf.
 @asynccontextmanager
 async def lifespan(app: FastMCP):
     """Runs initialization code before the server starts and cleanup code after it shuts down."""
+    startup.mark('transport')
+    watch_cursor=None
     try:
+        from live_inspect.watch_cursor import WatchCursor
+        watch_cursor=WatchCursor()
         watch_cursor.start()
-        await asyncio.sleep(1) # Simulate startup latency
+        startup.mark('cursor watcher')
+        desktop.start_pool()
+        desktop.start_encoder()
+        startup.mark('workers')
+        desktop.start_tree_mirror()
+        startup.mark('tree mirror')
+        desktop.shell.start()
+        desktop.start_menu.start()
+        startup.mark('shell and start menu')
+        if STARTUP_REPORT:
+            startup.report()
         yield
     finally:
-        watch_cursor.stop()
+        # Queued tools are cancelled first, they would otherwise start on a shell, mirror or pool already stopped
+        dispatcher.shutdown()
+        desktop.stop_tree_mirror()
+        desktop.shell.close()
+        desktop.stop_encoder()
+        desktop.stop_pool()
+        if fetcher is not None:
+            await fetcher.close()
+        if watch_cursor is not None:
+            watch_cursor.stop()
 
 mcp=FastMCP(name='windows-mcp',instructions=instructions,lifespan=lifespan)
 
 @mcp.tool(name='Launch-Tool', description='Launch an application from the Windows Start Menu by name (e.g., "notepad", "calculator", "chrome")')
+@dispatcher.input
 def launch_tool(name: str) -> str:
     response,status=desktop.launch_app(name.lower())
     if status!=0:
         return response
-    consecutive_waits=2
-    for _ in range(consecutive_waits):
-        if not desktop.is_app_running(name):
-            pg.sleep(1.0)
-        else:
-            return response
-    return f'Launching {name.title()} wait for it to come load.'
+    result=desktop.wait_for_window(name,timeout=LAUNCH_TIMEOUT)
+    # The waits above stand in for the settle, the window may still come up when they gave up
+    desktop.mark_input(settle=False)
+    if not result.is_met:
+        return f'Launching {name.title()} wait for it to come load.'
+    desktop.wait_for_input_idle(result.value)
+    return response
     
 @mcp.tool(name='Powershell-Tool', description='Execute PowerShell commands and return the output with status code')
+@dispatcher.read
 def powershell_tool(command: str) -> str:
     response,status_code=desktop.execute_command(command)
     return f'Response: {response}\nStatus Code: {status_code}'
 
-@mcp.tool(name='State-Tool',description='Capture comprehensive desktop state including default language used by user interface, focused/opened applications, interactive UI elements (buttons, text fields, menus), informative content (text, labels, status), and scrollable areas. Optionally includes visual screenshot when use_vision=True. Essential for understanding current desktop context and available UI interactions.')
-def state_tool(use_vision:bool=False):
-    desktop_state=desktop.get_state(use_vision=use_vision)
-    interactive_elements=desktop_state.tree_state.interactive_elements_to_string()
-    informative_elements=desktop_state.tree_state.informative_elements_to_string()
-    scrollable_elements=desktop_state.tree_state.scrollable_elements_to_string()
+@mcp.tool(name='State-Tool',description='Capture comprehensive desktop state including default language used by user interface, focused/opened applications, interactive UI elements (buttons, text fields, menus), informative content (text, labels, status), and scrollable areas. Optionally includes visual screenshot when use_vision=True, of the whole screen, only the foreground window (capture="window") or a region [x, y, width, height]. With vision_delta=True only the regions that changed since the previous screenshot are sent, keyframe=True forces a whole frame. Every state carries a snapshot version, pass it back as since_version to get only the elements added, removed or changed since then, and the unchanged ones whose label moved; omit it for the full state. Set output="json" for a compact columnar JSON document instead of markdown tables. Essential for understanding current desktop context and available UI interactions.')
+@dispatcher.read
+def state_tool(use_vision:bool=False,capture:Literal['screen','window']='screen',region:list[int]=None,vision_delta:bool=False,keyframe:bool=False,since_version:int=None,output:Literal['markdown','json']='markdown'):
+    if region is not None and len(region) != 4:
+        raise ValueError("Region must be a list of exactly 4 integers [x, y, width, height]")
+    desktop_state=desktop.get_state(use_vision=use_vision,capture=capture,region=tuple(region) if region else None,vision_delta=vision_delta,keyframe=keyframe)
+    tree_state=desktop_state.tree_state
+    previous_state=desktop.get_snapshot(since_version) if since_version is not None else None
+    screenshot=[]
+    if desktop_state.screenshot_delta is not None:
+        screenshot.append(desktop_state.screenshot_delta.to_string())
+    if desktop_state.screenshot is not None:
+        screenshot.append(Image(data=desktop_state.screenshot,format=desktop_state.screenshot_format))
+    screenshot.extend(Image(data=tile,format=desktop_state.screenshot_format) for tile in desktop_state.screenshot_tiles)
+    debug=get_debug_info(desktop_state) if STATE_DEBUG else []
+    if output=='json':
+        document={'language':default_language,'encoding':desktop.encoding,**desktop_state.to_columns()}
+        if debug:
+            document['debug']=debug
+        if previous_state is not None:
+            document.update(since_version=since_version,**tree_state.diff(previous_state.tree_state).to_columns())
+        return [to_json(document)]+screenshot
+    if previous_state is not None:
+        delta=tree_state.diff(previous_state.tree_state)
+        snapshot=f'{desktop_state.version} ({len(delta)} elements changed since version {since_version})'
+        heading='Changes in'
+        interactive_elements=delta.interactive_elements_to_string()
+        informative_elements=delta.informative_elements_to_string()
+        scrollable_elements=delta.scrollable_elements_to_string()
+    else:
+        snapshot=f'{desktop_state.version}'
+        if since_version is not None:
+            snapshot+=f' (version {since_version} is no longer available, the full state follows)'
+        heading='List of'
+        interactive_elements=tree_state.interactive_elements_to_string()
+        informative_elements=tree_state.informative_elements_to_string()
+        scrollable_elements=tree_state.scrollable_elements_to_string()
     apps=desktop_state.apps_to_string()
     active_app=desktop_state.active_app_to_string()
+    debug_info='\nDebug:\n'+'\n'.join(debug)+'\n' if debug else ''
+    if tree_state.is_truncated:
+        scrollable_elements+=f'\n\nThe UI tree was only partially captured, {tree_state.skipped_subtrees} subtrees were skipped.'
     return [dedent(f'''
+    Snapshot Version:
+    {snapshot}
+
     Default Language of User:
     {default_language} with encoding: {desktop.encoding}
                             
@@ -76,18 +164,36 @@ def state_tool(use_vision:bool=False):
     Opened Apps:
     {apps}
 
-    List of Interactive Elements:
+    {heading} Interactive Elements:
     {interactive_elements or 'No interactive elements found.'}
 
-    List of Informative Elements:
+    {heading} Informative Elements:
     {informative_elements or 'No informative elements found.'}
 
-    List of Scrollable Elements:
+    {heading} Scrollable Elements:
     {scrollable_elements or 'No scrollable elements found.'}
-    ''')]+([Image(data=desktop_state.screenshot,format='png')] if use_vision else [])
+    ''')+debug_info]+screenshot
+
+def get_debug_info(desktop_state:DesktopState)->list[str]:
+    '''Counters of the caches and workers behind the state, one line each.'''
+    debug=[desktop.process_cache.get_stats().to_string()]
+    if desktop_state.screenshot_stats is not None:
+        debug.append(desktop_state.screenshot_stats.to_string())
+    input_stats,read_stats=dispatcher.get_stats()
+    debug.append(f'Input tools: {input_stats.to_string()}')
+    debug.append(f'Read tools: {read_stats.to_string()}')
+    if desktop.pool is not None:
+        debug.append(f'Tree walk: {desktop.pool.get_stats().to_string()}')
+    return debug
     
 @mcp.tool(name='Clipboard-Tool',description='Copy text to clipboard or retrieve current clipboard content. Use "copy" mode with text parameter to copy, "paste" mode to retrieve.')
-def clipboard_tool(mode: Literal['copy', 'paste'], text: str = None)->str:
+async def clipboard_tool(mode: Literal['copy', 'paste'], text: str = None)->str:
+    # A copy changes what a later paste shortcut types, so it keeps its place among the input
+    run=dispatcher.run_input if mode == 'copy' else dispatcher.run_read
+    return await run(clipboard, mode, text)
+
+def clipboard(mode: str, text: str = None)->str:
+    import pyperclip as pc
     if mode == 'copy':
         if text:
             pc.copy(text)  # Copy text to system clipboard
@@ -100,35 +206,53 @@ def clipboard_tool(mode: Literal['copy', 'paste'], text: str = None)->str:
     else:
         raise ValueError('Invalid mode. Use "copy" or "paste".')
 
-@mcp.tool(name='Click-Tool',description='Click on UI elements at specific coordinates. Supports left/right/middle mouse buttons and single/double/triple clicks. Use coordinates from State-Tool output.')
-def click_tool(loc:list[int],button:Literal['left','right','middle']='left',clicks:int=1)->str:
+@mcp.tool(name='Click-Tool',description='Click on UI elements at specific coordinates. Supports left/right/middle mouse buttons and single/double/triple clicks. Use coordinates from State-Tool output. Set humanlike=True to glide the pointer to the element instead of jumping to it.')
+@dispatcher.input
+def click_tool(loc:list[int],button:Literal['left','right','middle']='left',clicks:int=1,humanlike:bool=INPUT_HUMANLIKE)->str:
     if len(loc) != 2:
         raise ValueError("Location must be a list of exactly 2 integers [x, y]")
     x,y=loc[0],loc[1]
-    control=desktop.get_element_under_cursor()
-    pg.click(x=x,y=y,button=button,clicks=click,duration=0.2)
+    name,control_type=desktop.get_element_at(x,y)
+    if humanlike:
+        pg.click(x=x,y=y,button=button,clicks=clicks,duration=0.2)
+    else:
+        desktop.input_engine.click(x,y,button=button,clicks=clicks)
+    desktop.mark_input()
     num_clicks={1:'Single',2:'Double',3:'Triple'}
-    return f'{num_clicks.get(clicks)} {button} Clicked on {control.Name} Element with ControlType {control.ControlTypeName} at ({x},{y}).'
+    return f'{num_clicks.get(clicks)} {button} Clicked on {name} Element with ControlType {control_type} at ({x},{y}).'
 
-@mcp.tool(name='Type-Tool',description='Type text into input fields, text areas, or focused elements. Set clear=True to replace existing text, False to append. Click on target element coordinates first.')
-def type_tool(loc:list[int],text:str,clear:bool=False,press_enter:bool=False)->str:
+@mcp.tool(name='Type-Tool',description='Type text into input fields, text areas, or focused elements. Set clear=True to replace existing text, False to append. Click on target element coordinates first. Text is typed at once and long text is pasted; set humanlike=True to type it key by key at a human pace.')
+@dispatcher.input
+def type_tool(loc:list[int],text:str,clear:bool=False,press_enter:bool=False,humanlike:bool=INPUT_HUMANLIKE)->str:
     if len(loc) != 2:
         raise ValueError("Location must be a list of exactly 2 integers [x, y]")
     x,y=loc[0],loc[1]
-    pg.leftClick(x=x, y=y,duration=0.2)
-    control=desktop.get_element_under_cursor()
+    name,control_type=desktop.get_element_at(x,y)
+    if humanlike:
+        pg.leftClick(x=x, y=y,duration=0.2)
+    else:
+        desktop.input_engine.click(x,y)
+    desktop.mark_input()
 
     if clear=='True':
         pg.hotkey('ctrl','a')
         pg.press('backspace')
 
-    pg.typewrite(text,interval=0.1)
+    if humanlike:
+        pg.typewrite(text,interval=0.1)
+    else:
+        desktop.input_engine.type_text(text)
     
     if press_enter:
-        pg.press('enter')
-    return f'Typed {text} on {control.Name} Element with ControlType {control.ControlTypeName} at ({x},{y}).'
+        if humanlike:
+            pg.press('enter')
+        else:
+            desktop.input_engine.press_keys([VK_RETURN])
+    desktop.mark_input()
+    return f'Typed {text} on {name} Element with ControlType {control_type} at ({x},{y}).'
 
 @mcp.tool(name='Resize-Tool',description='Resize active application window (e.g., "notepad", "calculator", "chrome", etc.) to specific size (WIDTHxHEIGHT) or move to specific location (X,Y).')
+@dispatcher.input
 def resize_tool(size:list[int]=None,loc:list[int]=None)->str:
     if size is not None and len(size) != 2:
         raise ValueError("Size must be a list of exactly 2 integers [width, height]")
@@ -136,15 +260,21 @@ def resize_tool(size:list[int]=None,loc:list[int]=None)->str:
         raise ValueError("Location must be a list of exactly 2 integers [x, y]")
     size_tuple = tuple(size) if size is not None else None
     loc_tuple = tuple(loc) if loc is not None else None
-    response,_=desktop.resize_app(size_tuple,loc_tuple)
+    response,status=desktop.resize_app(size_tuple,loc_tuple)
+    if status==0:
+        desktop.mark_input()
     return response
 
 @mcp.tool(name='Switch-Tool',description='Switch to a specific application window (e.g., "notepad", "calculator", "chrome", etc.) and bring to foreground.')
+@dispatcher.input
 def switch_tool(name: str) -> str:
     response,status=desktop.switch_app(name)
+    if status==0:
+        desktop.mark_input()
     return response
 
 @mcp.tool(name='Scroll-Tool',description='Scroll at specific coordinates or current mouse position. Use wheel_times to control scroll amount (1 wheel = ~3-5 lines). Essential for navigating lists, web pages, and long content.')
+@dispatcher.input
 def scroll_tool(loc:list[int]=None,type:Literal['horizontal','vertical']='vertical',direction:Literal['up','down','left','right']='down',wheel_times:int=1)->str:
     if loc:
         if len(loc) != 2:
@@ -178,51 +308,152 @@ def scroll_tool(loc:list[int]=None,type:Literal['horizontal','vertical']='vertic
                     return 'Invalid direction. Use "left" or "right".'
         case _:
             return 'Invalid type. Use "horizontal" or "vertical".'
+    desktop.mark_input()
     return f'Scrolled {type} {direction} by {wheel_times} wheel times.'
 
-@mcp.tool(name='Drag-Tool',description='Drag and drop operation from source coordinates to destination coordinates. Useful for moving files, resizing windows, or drag-and-drop interactions.')
-def drag_tool(from_loc:list[int],to_loc:list[int])->str:
+@mcp.tool(name='Drag-Tool',description='Drag and drop operation from source coordinates to destination coordinates. Useful for moving files, resizing windows, or drag-and-drop interactions. Set humanlike=True for a slower, animated drag.')
+@dispatcher.input
+def drag_tool(from_loc:list[int],to_loc:list[int],humanlike:bool=INPUT_HUMANLIKE)->str:
     if len(from_loc) != 2:
         raise ValueError("from_loc must be a list of exactly 2 integers [x, y]")
     if len(to_loc) != 2:
         raise ValueError("to_loc must be a list of exactly 2 integers [x, y]")
     x1,y1=from_loc[0],from_loc[1]
     x2,y2=to_loc[0],to_loc[1]
-    pg.moveTo(x1, y1)
-    pg.dragTo(x2, y2, duration=0.5)
-    control=desktop.get_element_under_cursor()
-    return f'Dragged {control.Name} element with ControlType {control.ControlTypeName} from ({x1},{y1}) to ({x2},{y2}).'
+    name,control_type=desktop.get_element_at(x1,y1)
+    if humanlike:
+        pg.moveTo(x1, y1)
+        pg.dragTo(x2, y2, duration=0.5)
+    else:
+        desktop.input_engine.drag((x1,y1),(x2,y2))
+    desktop.mark_input()
+    return f'Dragged {name} element with ControlType {control_type} from ({x1},{y1}) to ({x2},{y2}).'
 
 @mcp.tool(name='Move-Tool',description='Move mouse cursor to specific coordinates without clicking. Useful for hovering over elements or positioning cursor before other actions.')
+@dispatcher.input
 def move_tool(to_loc:list[int])->str:
     if len(to_loc) != 2:
         raise ValueError("to_loc must be a list of exactly 2 integers [x, y]")
     x,y=to_loc[0],to_loc[1]
     pg.moveTo(x, y)
+    # Hovering can open tooltips and menus
+    desktop.mark_input()
     return f'Moved the mouse pointer to ({x},{y}).'
 
 @mcp.tool(name='Shortcut-Tool',description='Execute keyboard shortcuts using key combinations. Pass keys as list (e.g., ["ctrl", "c"] for copy, ["alt", "tab"] for app switching, ["win", "r"] for Run dialog).')
+@dispatcher.input
 def shortcut_tool(shortcut:list[str]):
     pg.hotkey(*shortcut)
+    desktop.mark_input()
     return f"Pressed {'+'.join(shortcut)}."
 
 @mcp.tool(name='Key-Tool',description='Press individual keyboard keys. Supports special keys like "enter", "escape", "tab", "space", "backspace", "delete", arrow keys ("up", "down", "left", "right"), function keys ("f1"-"f12").')
+@dispatcher.input
 def key_tool(key:str='')->str:
     pg.press(key)
+    desktop.mark_input()
     return f'Pressed the key {key}.'
 
 @mcp.tool(name='Wait-Tool',description='Pause execution for specified duration in seconds. Useful for waiting for applications to load, animations to complete, or adding delays between actions.')
-def wait_tool(duration:int)->str:
-    pg.sleep(duration)
+async def wait_tool(duration:int)->str:
+    await asyncio.sleep(duration)
     return f'Waited for {duration} seconds.'
 
-@mcp.tool(name='Scrape-Tool',description='Fetch and convert webpage content to markdown format. Provide full URL including protocol (http/https). Returns structured text content suitable for analysis.')
-def scrape_tool(url:str)->str:
-    response=requests.get(url,timeout=10)
-    html=response.text
-    content=markdownify(html=html)
-    return f'Scraped the contents of the entire webpage:\n{content}'
+@mcp.tool(name='Wait-Until-Tool',description='Wait until a condition holds and return as soon as it does, instead of pausing for a fixed time. condition="foreground_change" waits for another window to come to the foreground, "window" for a window whose title matches name to appear, "input_idle" for a just launched foreground app to finish starting up, and "region_settled" for the screen, or a region [x, y, width, height], to stop changing. Gives up after timeout seconds.')
+@dispatcher.read
+def wait_until_tool(condition:Literal['foreground_change','window','input_idle','region_settled'],name:str=None,region:list[int]=None,timeout:float=10.0)->str:
+    match condition:
+        case 'foreground_change':
+            result=desktop.wait_for_foreground_change(timeout=timeout)
+            description='Another window came to the foreground'
+        case 'window':
+            if not name:
+                raise ValueError('Name is required when waiting for a window')
+            result=desktop.wait_for_window(name,timeout=timeout)
+            description=f'A window matching {name} appeared'
+        case 'input_idle':
+            result=desktop.wait_for_input_idle(timeout=timeout)
+            description='The foreground app finished starting up'
+        case 'region_settled':
+            if region is not None and len(region) != 4:
+                raise ValueError("Region must be a list of exactly 4 integers [x, y, width, height]")
+            result=desktop.wait_for_region(tuple(region) if region is not None else None,timeout=timeout)
+            description='The screen settled'
+        case _:
+            return 'Invalid condition. Use "foreground_change", "window", "input_idle" or "region_settled".'
+    return result.to_string(description)
+
+def get_tool_function(tool:str)->str:
+    '''The name of a tool's blocking body as the dispatcher keeps it.'''
+    return tool.lower().replace('-','_')
+
+BATCH_STEP_TOOLS=('Launch-Tool','Powershell-Tool','Click-Tool','Type-Tool','Resize-Tool','Switch-Tool','Scroll-Tool','Drag-Tool','Move-Tool','Shortcut-Tool','Key-Tool','Wait-Until-Tool')
+
+@mcp.tool(name='Batch-Tool',description='Run a sequence of actions in one call. Each step is {"tool": "<tool name>", "args": {...}} with the same arguments as that tool, for example {"tool": "Type-Tool", "args": {"loc": [400, 300], "text": "hello"}}. Steps can use ' + ', '.join(BATCH_STEP_TOOLS) + '. A step may also wait afterwards, "wait" for a number of seconds or "wait_until" with the arguments of Wait-Until-Tool. With stop_on_error=True the steps after a failed one are skipped. Set capture_state=True to get the desktop state once at the end, as State-Tool returns it (use_vision for a screenshot).')
+@dispatcher.input
+def batch_tool(steps:list[dict],stop_on_error:bool=True,capture_state:bool=False,use_vision:bool=False):
+    if not steps:
+        raise ValueError("Steps must be a list of at least one step")
+    # Every step is checked before the first one sends any input
+    for index,step in enumerate(steps,start=1):
+        if step.get('tool') not in BATCH_STEP_TOOLS:
+            raise ValueError(f'Step {index}: {step.get("tool")!r} can not run in a batch. Use one of {", ".join(BATCH_STEP_TOOLS)}.')
+        unknown=set(step)-{'tool','args','wait','wait_until'}
+        if unknown:
+            raise ValueError(f'Step {index}: unknown keys {", ".join(sorted(unknown))}. A step takes tool, args, wait and wait_until.')
+        try:
+            dispatcher.check_args(get_tool_function(step['tool']),step.get('args',{}))
+            if step.get('wait') is not None:
+                check_value('wait',step['wait'],float)
+            if step.get('wait_until'):
+                dispatcher.check_args('wait_until_tool',step['wait_until'])
+        except ValueError as ex:
+            raise ValueError(f'Step {index} ({step["tool"]}): {ex}')
+    results=[]
+    for index,step in enumerate(steps,start=1):
+        tool=step['tool']
+        try:
+            response=dispatcher.tools[get_tool_function(tool)](**step.get('args',{}))
+            if step.get('wait'):
+                pg.sleep(float(step['wait']))
+            if step.get('wait_until'):
+                waited=dispatcher.tools['wait_until_tool'](**step['wait_until'])
+                response=f'{response} {waited}'
+        except Exception as ex:
+            results.append(f'{index}. {tool} failed: {ex}')
+            if stop_on_error:
+                if index<len(steps):
+                    results.append(f'Stopped, the remaining {len(steps)-index} steps were skipped.')
+                break
+            continue
+        results.append(f'{index}. {tool}: {response}')
+    summary='\n'.join(results)
+    if not capture_state:
+        return [summary]
+    return [summary]+dispatcher.tools['state_tool'](use_vision=use_vision)
+
+@mcp.tool(name='Scrape-Tool',description='Fetch and convert webpage content to markdown format. Provide full URL including protocol (http/https), or several as urls to fetch them in parallel. Returns structured text content suitable for analysis, without scripts, styles and navigation. Long webpages come in pages, pass the cursor given at the end of a page to get the next one. Pages fetched in the last minute come from a cache, older ones are only downloaded again when they changed.')
+async def scrape_tool(url:str=None,urls:list[str]=None,cursor:str=None)->str:
+    fetcher=get_fetcher()
+    if cursor:
+        return fetcher.get_page(cursor).to_string()
+    urls=([url] if url else [])+list(urls or [])
+    if not urls:
+        raise ValueError("Provide a url, a list of urls or a cursor")
+    if len(urls)>SCRAPE_MAX_URLS:
+        raise ValueError(f"At most {SCRAPE_MAX_URLS} urls can be scraped in one call")
+    if len(urls)==1:
+        result=await fetcher.fetch(urls[0])
+        return fetcher.paginate(result).to_string()
+    sections=[]
+    for url,result in zip(urls,await fetcher.fetch_many(urls)):
+        if isinstance(result,Exception):
+            sections.append(f'Failed to scrape {url}: {result or type(result).__name__}')
+        else:
+            sections.append(f'{url}\n{fetcher.paginate(result).to_string()}')
+    return '\n\n'.join(sections)
 
+startup.mark('tools')
 
 @click.command()
 @click.option(
@@ -0,0 +1,131 @@
+from threading import Lock, Thread
+from typing import Callable
+from time import time
+import json
+import sys
+import csv
+import os
+import io
+
+def parse_start_apps(text:str)->dict[str,str]:
+    '''Reads the CSV of Get-StartApps into lower cased app names and their AppID.'''
+    reader=csv.DictReader(io.StringIO(text))
+    return {row['Name'].lower():row.get('AppID') or '' for row in reader if row.get('Name')}
+
+def get_directories_signature(directories:list[str])->tuple[int,float]:
+    '''
+    Number of folders and the latest folder modification time under the directories. Adding, removing or renaming a
+    shortcut changes the modification time of the folder it is in, so the files themselves are not read.
+    '''
+    count,latest=0,0.0
+    pending=list(directories)
+    while pending:
+        directory=pending.pop()
+        try:
+            latest=max(latest,os.stat(directory).st_mtime)
+            count+=1
+            with os.scandir(directory) as entries:
+                pending.extend(entry.path for entry in entries if entry.is_dir(follow_symlinks=False))
+        except OSError:
+            continue
+    return (count,latest)
+
+class StartMenuCatalog:
+    '''
+    The apps of the Start Menu kept in memory and in a small file on disk. The loader returns the CSV of Get-StartApps
+    and only runs when the catalog is older than the ttl or a shortcut folder changed, and then on a background thread
+    while the current catalog keeps answering. Any callable returning that CSV works, such as one reading a fixture.
+    '''
+    def __init__(self,loader:Callable[[],str],cache_path:str|None=None,ttl:float=3600.0,directories:list[str]|None=None):
+        self.loader=loader
+        self.cache_path=cache_path
+        self.ttl=ttl
+        self.directories=directories or []
+        self.apps:dict[str,str]|None=None
+        self.loaded_at=0.0
+        self.signature:tuple[int,float]|None=None
+        self.version=0
+        self.lock=Lock()
+        self.refresh_lock=Lock()
+        self.refresh_thread:Thread|None=None
+
+    def start(self):
+        '''Loads the cached catalog and refreshes it in the background when there is none or it is stale.'''
+        if self.apps is None:
+            self.read_cache()
+        if self.apps is None or self.is_stale():
+            self.refresh_in_background()
+
+    def get_apps(self)->dict[str,str]:
+        '''Returns the catalog at once when one is known and refreshes it in the background when it is stale.'''
+        if self.apps is None:
+            self.read_cache()
+        if self.apps is None:
+            self.refresh()
+        elif self.is_stale():
+            self.refresh_in_background()
+        return self.apps or {}
+
+    def is_stale(self)->bool:
+        if time()-self.loaded_at>self.ttl:
+            return True
+        return self.signature!=get_directories_signature(self.directories)
+
+    def refresh(self)->dict[str,str]:
+        '''Runs the loader now, a refresh already running is waited for and its result used instead.'''
+        version=self.version
+        with self.refresh_lock:
+            if self.version!=version and self.apps is not None:
+                return self.apps
+            signature=get_directories_signature(self.directories)
+            try:
+                apps=parse_start_apps(self.loader())
+            except Exception as ex:
+                print(f"Error: {ex}",file=sys.stderr)
+                return self.apps or {}
+            if not apps:
+                # A failed listing is not cached over a good one
+                return self.apps or {}
+            with self.lock:
+                self.apps=apps
+                self.loaded_at=time()
+                self.signature=signature
+                self.version+=1
+            self.write_cache()
+            return apps
+
+    def refresh_in_background(self):
+        with self.lock:
+            if self.refresh_thread is not None and self.refresh_thread.is_alive():
+                return None
+            self.refresh_thread=Thread(target=self.refresh,name='start-menu-refresh',daemon=True)
+            self.refresh_thread.start()
+
+    def read_cache(self):
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path,encoding='utf-8') as file:
+                cache=json.load(file)
+            apps,loaded_at,signature=cache['apps'],cache['loaded_at'],tuple(cache['signature'])
+        except (OSError,ValueError,KeyError,TypeError) as ex:
+            print(f"Error: {ex}",file=sys.stderr)
+            return None
+        with self.lock:
+            self.apps=apps
+            self.loaded_at=loaded_at
+            self.signature=signature
+            self.version+=1
+
+    def write_cache(self):
+        if self.cache_path is None:
+            return None
+        try:
+            os.makedirs(os.path.dirname(self.cache_path),exist_ok=True)
+            temporary_path=f'{self.cache_path}.tmp'
+            with open(temporary_path,'w',encoding='utf-8') as file:
+                json.dump({'apps':self.apps,'loaded_at':self.loaded_at,'signature':list(self.signature)},file,ensure_ascii=False)
+            # Readers never see a half written cache
+            os.replace(temporary_path,self.cache_path)
+        except OSError as ex:
+            print(f"Error: {ex}",file=sys.stderr)
@@ -1,4 +1,5 @@
 from typing import Set
+import os
 
 BROWSER_NAMES=set(['msedge.exe','chrome.exe','firefox.exe'])
 
@@ -12,4 +13,83 @@ EXCLUDED_APPS:Set[str]=set([
     'Windows.UI.Core.CoreWindow',
 ])
 
-PROCESS_PER_MONITOR_DPI_AWARE = 2
\ No newline at end of file
+PROCESS_PER_MONITOR_DPI_AWARE = 2
+
+# Processes whose executable name, path and browser flag are kept, least recently used ones are dropped first
+PROCESS_CACHE_SIZE = 512
+
+# Workers of the shared UI Automation pool and how many recent tasks its latency figures cover
+WORKER_POOL_SIZE = 8
+WORKER_POOL_LATENCY_WINDOW = 256
+
+# Workers of the read only tools, tools that send input always run one at a time
+TOOL_WORKERS = 8
+
+# Seconds a snapshot answers coordinate lookups for before the element is looked up live again
+SNAPSHOT_MAX_AGE = 30.0
+
+# Snapshots kept for State-Tool to diff against
+SNAPSHOT_HISTORY = 4
+
+# Encoding of State-Tool screenshots: 'png', 'jpeg' or 'webp', with the quality used by the lossy ones
+SCREENSHOT_FORMAT = 'jpeg'
+SCREENSHOT_QUALITY = 85
+
+# Filter used to downscale screenshots, one of PIL's Image.Resampling names
+SCREENSHOT_RESAMPLE = 'BILINEAR'
+
+# Encode screenshots in a worker process instead of on the request thread
+SCREENSHOT_ENCODER_PROCESS = True
+
+# Screenshot deltas: tile edge in pixels, deltas between keyframes, and the share of changed tiles above which a keyframe is sent instead
+VISION_TILE_SIZE = 64
+VISION_KEYFRAME_INTERVAL = 10
+VISION_MAX_DIRTY_RATIO = 0.5
+
+# PowerShell sessions kept open for commands, seconds a command may run before its session is killed and replaced, and
+# whether every command gets a session no other command ran in
+SHELL_POOL_SIZE = 2
+SHELL_COMMAND_TIMEOUT = 25.0
+SHELL_STATELESS = False
+
+# Start Menu catalog: on-disk cache, seconds before it is loaded again, and the shortcut folders whose changes reload it sooner
+START_MENU_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.windows-mcp', 'start-menu.json')
+START_MENU_TTL = 3600.0
+START_MENU_DIRECTORIES = [
+    os.path.join(os.environ.get('PROGRAMDATA', 'C:\\ProgramData'), 'Microsoft', 'Windows', 'Start Menu', 'Programs'),
+    os.path.join(os.environ.get('APPDATA', os.path.expanduser('~')), 'Microsoft', 'Windows', 'Start Menu', 'Programs'),
+]
+
+# Seconds pyautogui pauses after every call it makes, input is settled by waiting for the screen instead
+INPUT_PAUSE = 0.05
+
+# Seconds always paused after input, before the foreground window is watched until it stops changing
+ACTION_SETTLE_PAUSE = 0.1
+
+# Seconds to wait for the foreground window to settle after input, for a switched window to come forward and for a launched app's window to appear
+ACTION_SETTLE_TIMEOUT = 1.0
+SWITCH_TIMEOUT = 1.0
+LAUNCH_TIMEOUT = 5.0
+
+# Seconds between the first two checks of a wait and the longest pause the backoff grows to
+WAIT_POLL_INTERVAL = 0.02
+WAIT_MAX_POLL_INTERVAL = 0.25
+
+# Batched input: events per SendInput call, seconds between two batches, length above which text is pasted instead of
+# typed (0 always types), seconds before the clipboard is restored after a paste, and whether tools default to the old
+# animated pyautogui input
+INPUT_CHUNK_SIZE = 200
+INPUT_BATCH_PAUSE = 0.01
+INPUT_PASTE_THRESHOLD = 200
+INPUT_PASTE_RESTORE_DELAY = 1.0
+INPUT_HUMANLIKE = False
+
+# Windows version and user language are probed once and cached here, until the build or locale changes or the ttl passes
+ENVIRONMENT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.windows-mcp', 'environment.json')
+ENVIRONMENT_CACHE_TTL = 7 * 24 * 3600.0
+
+# Print how long each phase of the server start took to stderr
+STARTUP_REPORT = True
+
+# Append the counters of the caches and workers behind a state to the State-Tool output
+STATE_DEBUG = False
@@ -0,0 +1,88 @@
+from src.desktop.pool import WorkerPool
+from src.desktop.views import PoolStats
+from typing import Callable, Literal, get_args, get_origin
+from functools import wraps
+import inspect
+import asyncio
+import math
+
+def check_value(name:str,value,annotation):
+    '''
+    Raises a ValueError when the value does not have the type of an int, float, bool or list[int] annotation. Numbers
+    of int and float parameters can not be negative or infinite, a bool is not taken for a number.
+    '''
+    if annotation is bool and not isinstance(value,bool):
+        raise ValueError(f'Invalid {name} {value!r}, it must be true or false.')
+    if annotation is int and (isinstance(value,bool) or not isinstance(value,int)):
+        raise ValueError(f'Invalid {name} {value!r}, it must be a whole number.')
+    if annotation is float and (isinstance(value,bool) or not isinstance(value,(int,float))):
+        raise ValueError(f'Invalid {name} {value!r}, it must be a number.')
+    if annotation in (int,float) and not (0<=value<math.inf):
+        raise ValueError(f'Invalid {name} {value!r}, it can not be negative.')
+    if get_origin(annotation) is list and get_args(annotation)==(int,):
+        if not isinstance(value,list) or any(isinstance(item,bool) or not isinstance(item,int) for item in value):
+            raise ValueError(f'Invalid {name} {value!r}, it must be a list of whole numbers.')
+
+class ToolDispatcher:
+    '''
+    Runs the blocking bodies of tools off the event loop. Tools that send input or move windows run one at a time on a
+    single worker, in the order they were called, so the input of concurrent calls never interleaves. Tools that only
+    read run side by side on their own workers. The blocking bodies are kept by function name, so a tool can run others
+    within its own turn.
+    '''
+    def __init__(self,workers:int=8,latency_window:int=256):
+        self.tools:dict[str,Callable]={}
+        self.input_pool=WorkerPool(max_workers=1,latency_window=latency_window,thread_name_prefix='input-worker')
+        self.read_pool=WorkerPool(max_workers=workers,latency_window=latency_window,thread_name_prefix='tool-worker')
+
+    async def run_input(self,fn:Callable,/,*args,**kwargs):
+        return await asyncio.wrap_future(self.input_pool.submit(fn,*args,**kwargs))
+
+    async def run_read(self,fn:Callable,/,*args,**kwargs):
+        return await asyncio.wrap_future(self.read_pool.submit(fn,*args,**kwargs))
+
+    def input(self,fn:Callable)->Callable:
+        '''Makes a blocking tool async, its body joins the ordered input queue.'''
+        self.tools[fn.__name__]=fn
+        @wraps(fn)
+        async def tool(*args,**kwargs):
+            return await self.run_input(fn,*args,**kwargs)
+        return tool
+
+    def read(self,fn:Callable)->Callable:
+        '''Makes a blocking tool async, its body runs next to other read only tools.'''
+        self.tools[fn.__name__]=fn
+        @wraps(fn)
+        async def tool(*args,**kwargs):
+            return await self.run_read(fn,*args,**kwargs)
+        return tool
+
+    def check_args(self,name:str,args:dict):
+        '''
+        Raises a ValueError when the blocking body of the tool can not take the arguments: one is unknown, a required
+        one is missing, a value is not among the choices of a Literal parameter or does not pass check_value.
+        '''
+        fn=self.tools[name]
+        if not isinstance(args,dict):
+            raise ValueError(f'The arguments must be an object of names and values, not {type(args).__name__}.')
+        try:
+            bound=inspect.signature(fn).bind(**args)
+        except TypeError as ex:
+            raise ValueError(str(ex))
+        parameters=inspect.signature(fn).parameters
+        for parameter,value in bound.arguments.items():
+            annotation=fn.__annotations__.get(parameter)
+            # A None default means the parameter is optional
+            if value is None and parameters[parameter].default is None:
+                continue
+            if get_origin(annotation) is Literal and value not in get_args(annotation):
+                raise ValueError(f'Invalid {parameter} {value!r}. Use one of {", ".join(map(repr,get_args(annotation)))}.')
+            check_value(parameter,value,annotation)
+
+    def get_stats(self)->tuple[PoolStats,PoolStats]:
+        '''Stats of the input queue and of the read only workers.'''
+        return self.input_pool.get_stats(),self.read_pool.get_stats()
+
+    def shutdown(self):
+        self.input_pool.shutdown(wait=False,cancel_futures=True)
+        self.read_pool.shutdown(wait=False,cancel_futures=True)
@@ -0,0 +1,108 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+from threading import Lock
+from time import time
+import json
+import sys
+import os
+
+class EnvironmentCache:
+    '''
+    Facts about the machine that are slow to probe, such as the Windows version, kept in a small file on disk. The
+    probes only run, all at once on their own threads, when there is no cache, it is older than the ttl or the
+    signature of the machine changed. A probe raises when it fails, its default is then used and nothing is cached.
+    '''
+    def __init__(self,probes:dict[str,Callable[[],str]],defaults:dict[str,str]|None=None,signature:Callable[[],list]|None=None,cache_path:str|None=None,ttl:float=604800.0):
+        self.probes=probes
+        self.defaults=defaults or {}
+        self.signature=signature or (lambda: [])
+        self.cache_path=cache_path
+        self.ttl=ttl
+        self.values:dict[str,str]|None=None
+        self.is_cached=False
+        self.lock=Lock()
+
+    def get(self,name:str)->str:
+        with self.lock:
+            if self.values is None:
+                self.values=self.load()
+        return self.values.get(name,self.defaults.get(name,''))
+
+    def load(self)->dict[str,str]:
+        signature=self.get_signature()
+        values=self.read_cache(signature)
+        self.is_cached=values is not None
+        if values is not None:
+            return values
+        values,failed=self.probe()
+        if not failed:
+            # A fallback is not cached over what the next start may probe
+            self.write_cache(values,signature)
+        return values
+
+    def get_signature(self)->list:
+        try:
+            return list(self.signature())
+        except Exception as ex:
+            print(f"Error: {ex}",file=sys.stderr)
+            return []
+
+    def probe(self)->tuple[dict[str,str],bool]:
+        values,failed={},False
+        with ThreadPoolExecutor(max_workers=max(len(self.probes),1),thread_name_prefix='environment-probe') as executor:
+            futures={name:executor.submit(probe) for name,probe in self.probes.items()}
+            for name,future in futures.items():
+                try:
+                    values[name]=future.result()
+                except Exception as ex:
+                    print(f"Error: {ex}",file=sys.stderr)
+                    values[name]=self.defaults.get(name,'')
+                    failed=True
+        return values,failed
+
+    def read_cache(self,signature:list)->dict[str,str]|None:
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path,encoding='utf-8') as file:
+                cache=json.load(file)
+            values,probed_at,cached_signature=cache['values'],cache['probed_at'],cache['signature']
+        except (OSError,ValueError,KeyError,TypeError) as ex:
+            print(f"Error: {ex}",file=sys.stderr)
+            return None
+        if cached_signature!=signature or time()-probed_at>self.ttl or not set(self.probes).issubset(values):
+            return None
+        return values
+
+    def write_cache(self,values:dict[str,str],signature:list):
+        if self.cache_path is None:
+            return None
+        try:
+            os.makedirs(os.path.dirname(self.cache_path),exist_ok=True)
+            temporary_path=f'{self.cache_path}.tmp'
+            with open(temporary_path,'w',encoding='utf-8') as file:
+                json.dump({'values':values,'probed_at':time(),'signature':signature},file,ensure_ascii=False)
+            os.replace(temporary_path,self.cache_path)
+        except OSError as ex:
+            print(f"Error: {ex}",file=sys.stderr)
+
+class StartupTimer:
+    '''Wall time of the phases of the server start, measured from the start of the process.'''
+    def __init__(self,started_at:float|None=None):
+        self.started_at=started_at if started_at is not None else time()
+        self.last=self.started_at
+        self.phases:list[tuple[str,float]]=[]
+
+    def mark(self,phase:str):
+        '''Ends the phase that began at the previous mark.'''
+        now=time()
+        self.phases.append((phase,now-self.last))
+        self.last=now
+
+    def to_string(self)->str:
+        phases=', '.join(f'{phase} {duration*1000:.0f} ms' for phase,duration in self.phases)
+        return f'Startup took {(self.last-self.started_at)*1000:.0f} ms: {phases}'
+
+    def report(self,file:Any=None):
+        # stdout carries the protocol on the stdio transport
+        print(self.to_string(),file=file or sys.stderr)
@@ -0,0 +1,208 @@
+from src.desktop.views import KeyEvent, PointerEvent
+from typing import Any, Callable, Sequence
+from time import sleep
+import ctypes
+import sys
+
+INPUT_MOUSE=0
+INPUT_KEYBOARD=1
+KEYEVENTF_KEYUP=0x0002
+KEYEVENTF_UNICODE=0x0004
+MOUSEEVENTF_MOVE=0x0001
+MOUSEEVENTF_VIRTUALDESK=0x4000
+MOUSEEVENTF_ABSOLUTE=0x8000
+BUTTON_FLAGS={'left':(0x0002,0x0004),'right':(0x0008,0x0010),'middle':(0x0020,0x0040)}
+VK_TAB=0x09
+VK_RETURN=0x0D
+VK_CONTROL=0x11
+VK_V=0x56
+SM_XVIRTUALSCREEN,SM_YVIRTUALSCREEN,SM_CXVIRTUALSCREEN,SM_CYVIRTUALSCREEN=76,77,78,79
+
+# Fixed width fields, the layout matches user32 on 32 and 64 bit Windows
+class MOUSEINPUT(ctypes.Structure):
+    _fields_=[('dx',ctypes.c_int32),('dy',ctypes.c_int32),('mouseData',ctypes.c_uint32),('dwFlags',ctypes.c_uint32),('time',ctypes.c_uint32),('dwExtraInfo',ctypes.c_size_t)]
+
+class KEYBDINPUT(ctypes.Structure):
+    _fields_=[('wVk',ctypes.c_uint16),('wScan',ctypes.c_uint16),('dwFlags',ctypes.c_uint32),('time',ctypes.c_uint32),('dwExtraInfo',ctypes.c_size_t)]
+
+class HARDWAREINPUT(ctypes.Structure):
+    _fields_=[('uMsg',ctypes.c_uint32),('wParamL',ctypes.c_uint16),('wParamH',ctypes.c_uint16)]
+
+class INPUTUNION(ctypes.Union):
+    _fields_=[('mi',MOUSEINPUT),('ki',KEYBDINPUT),('hi',HARDWAREINPUT)]
+
+class INPUT(ctypes.Structure):
+    _fields_=[('type',ctypes.c_uint32),('union',INPUTUNION)]
+
+def build_text_events(text:str)->list[KeyEvent]:
+    '''
+    Key events that type the text whatever the keyboard layout: every UTF-16 code unit is pressed and released as a
+    unicode event, so characters outside the BMP become their surrogate pair. Line breaks and tabs are sent as the
+    Enter and Tab keys, which apps act on where a typed character would be ignored.
+    '''
+    events=[]
+    text=text.replace('\r\n','\n').replace('\r','\n')
+    for character in text:
+        if character in ('\n','\t'):
+            code=VK_RETURN if character=='\n' else VK_TAB
+            events.append(KeyEvent(code=code,is_unicode=False))
+            events.append(KeyEvent(code=code,is_unicode=False,is_up=True))
+            continue
+        encoded=character.encode('utf-16-le')
+        for index in range(0,len(encoded),2):
+            code=int.from_bytes(encoded[index:index+2],'little')
+            events.append(KeyEvent(code=code))
+            events.append(KeyEvent(code=code,is_up=True))
+    return events
+
+def build_key_events(keys:Sequence[int])->list[KeyEvent]:
+    '''Presses the virtual keys in order and releases them in reverse, as a shortcut is pressed.'''
+    return [KeyEvent(code=key,is_unicode=False) for key in keys]+[KeyEvent(code=key,is_unicode=False,is_up=True) for key in reversed(keys)]
+
+def normalize_point(x:int,y:int,screen:tuple[int,int,int,int])->tuple[int,int]:
+    '''
+    Maps a pixel of the virtual screen (left, top, width, height) to the 0-65535 range of absolute pointer events.
+    Windows maps back by scaling down and truncating, rounding up here makes that land on the same pixel.
+    '''
+    left,top,width,height=screen
+    normalized_x=((x-left)*65536+width-1)//width
+    normalized_y=((y-top)*65536+height-1)//height
+    return (min(max(normalized_x,0),65535),min(max(normalized_y,0),65535))
+
+def build_move_events(x:int,y:int,screen:tuple[int,int,int,int])->list[PointerEvent]:
+    normalized_x,normalized_y=normalize_point(x,y,screen)
+    return [PointerEvent(x=normalized_x,y=normalized_y,flags=MOUSEEVENTF_MOVE|MOUSEEVENTF_ABSOLUTE|MOUSEEVENTF_VIRTUALDESK)]
+
+def build_click_events(x:int,y:int,screen:tuple[int,int,int,int],button:str='left',clicks:int=1)->list[PointerEvent]:
+    '''Moves to the point and clicks there, the clicks of one batch share a timestamp and count as a double click.'''
+    if button not in BUTTON_FLAGS:
+        raise ValueError(f'Invalid button {button}. Use "left", "right" or "middle".')
+    down,up=BUTTON_FLAGS[button]
+    events=build_move_events(x,y,screen)
+    position=events[0]
+    for _ in range(clicks):
+        events.append(PointerEvent(x=position.x,y=position.y,flags=down|MOUSEEVENTF_ABSOLUTE|MOUSEEVENTF_VIRTUALDESK))
+        events.append(PointerEvent(x=position.x,y=position.y,flags=up|MOUSEEVENTF_ABSOLUTE|MOUSEEVENTF_VIRTUALDESK))
+    return events
+
+def build_drag_events(start:tuple[int,int],end:tuple[int,int],screen:tuple[int,int,int,int],steps:int=10)->list[list[PointerEvent]]:
+    '''
+    A drag as three batches: press at the start, move to the end in steps, release there. Apps only begin a drag once
+    they have seen the press, so the batches are meant to be sent apart with the app settling in between.
+    '''
+    down,up=BUTTON_FLAGS['left']
+    press=build_move_events(*start,screen)
+    position=press[0]
+    press.append(PointerEvent(x=position.x,y=position.y,flags=down|MOUSEEVENTF_ABSOLUTE|MOUSEEVENTF_VIRTUALDESK))
+    moves=[]
+    (x1,y1),(x2,y2)=start,end
+    steps=max(steps,1)
+    for step in range(1,steps+1):
+        moves.extend(build_move_events(round(x1+(x2-x1)*step/steps),round(y1+(y2-y1)*step/steps),screen))
+    position=moves[-1]
+    release=[PointerEvent(x=position.x,y=position.y,flags=up|MOUSEEVENTF_ABSOLUTE|MOUSEEVENTF_VIRTUALDESK)]
+    return [press,moves,release]
+
+def chunk_events(events:Sequence[Any],size:int)->list[list[Any]]:
+    '''Splits the events into batches of at most size events, an even size keeps each press with its release.'''
+    size=max(size,1)
+    return [list(events[index:index+size]) for index in range(0,len(events),size)]
+
+def to_inputs(events:Sequence[KeyEvent|PointerEvent])->ctypes.Array:
+    '''The events as the INPUT array SendInput takes.'''
+    inputs=(INPUT*len(events))()
+    for item,event in zip(inputs,events):
+        if isinstance(event,KeyEvent):
+            item.type=INPUT_KEYBOARD
+            flags=KEYEVENTF_KEYUP if event.is_up else 0
+            if event.is_unicode:
+                item.union.ki=KEYBDINPUT(wVk=0,wScan=event.code,dwFlags=flags|KEYEVENTF_UNICODE,time=0,dwExtraInfo=0)
+            else:
+                item.union.ki=KEYBDINPUT(wVk=event.code,wScan=0,dwFlags=flags,time=0,dwExtraInfo=0)
+        else:
+            item.type=INPUT_MOUSE
+            item.union.mi=MOUSEINPUT(dx=event.x,dy=event.y,mouseData=event.data,dwFlags=event.flags,time=0,dwExtraInfo=0)
+    return inputs
+
+class InputEngine:
+    '''
+    Sends keyboard and pointer input as batches of events, each batch in a single SendInput call. Long sequences go in
+    chunks with a short pause and a settle callback in between, so a busy app's input queue does not drop events.
+    Text longer than the paste threshold is pasted through the clipboard instead, with the previous text put back
+    paste_restore_delay seconds later.
+    '''
+    def __init__(self,chunk_size:int=200,batch_pause:float=0.01,paste_threshold:int=200,paste_restore_delay:float=1.0,settle:Callable[[],Any]|None=None):
+        self.chunk_size=chunk_size
+        self.batch_pause=batch_pause
+        self.paste_threshold=paste_threshold
+        self.paste_restore_delay=paste_restore_delay
+        self.settle=settle
+        self.user32=None
+
+    def get_user32(self):
+        if self.user32 is None:
+            self.user32=ctypes.WinDLL('user32',use_last_error=True)
+        return self.user32
+
+    def get_virtual_screen(self)->tuple[int,int,int,int]:
+        user32=self.get_user32()
+        return tuple(user32.GetSystemMetrics(index) for index in (SM_XVIRTUALSCREEN,SM_YVIRTUALSCREEN,SM_CXVIRTUALSCREEN,SM_CYVIRTUALSCREEN))
+
+    def send(self,events:Sequence[KeyEvent|PointerEvent])->int:
+        if not events:
+            return 0
+        inputs=to_inputs(events)
+        sent=self.get_user32().SendInput(len(inputs),inputs,ctypes.sizeof(INPUT))
+        if sent!=len(inputs):
+            # Windows blocks input to the windows of a more privileged process (UIPI)
+            raise OSError(f'SendInput sent {sent} of {len(inputs)} events, the target window may belong to an elevated process')
+        return sent
+
+    def wait(self):
+        if self.batch_pause:
+            sleep(self.batch_pause)
+        if self.settle is not None:
+            self.settle()
+
+    def send_batches(self,batches:Sequence[Sequence[KeyEvent|PointerEvent]]):
+        for index,batch in enumerate(batches):
+            if index:
+                self.wait()
+            self.send(batch)
+
+    def type_text(self,text:str):
+        if self.paste_threshold and len(text)>self.paste_threshold:
+            self.paste_text(text)
+        else:
+            self.send_batches(chunk_events(build_text_events(text),self.chunk_size))
+
+    def paste_text(self,text:str):
+        import pyperclip
+        try:
+            previous=pyperclip.paste()
+        except pyperclip.PyperclipException as ex:
+            print(f"Error: {ex}",file=sys.stderr)
+            previous=None
+        pyperclip.copy(text)
+        user32=self.get_user32()
+        sequence=user32.GetClipboardSequenceNumber()
+        try:
+            self.send(build_key_events([VK_CONTROL,VK_V]))
+            # Multi-process apps such as Chrome read the clipboard on another thread, well after the keys were handled
+            sleep(self.paste_restore_delay)
+        finally:
+            # Text copied in the meantime is newer than the previous text and stays
+            if previous is not None and user32.GetClipboardSequenceNumber()==sequence:
+                pyperclip.copy(previous)
+
+    def press_keys(self,keys:Sequence[int]):
+        self.send(build_key_events(keys))
+
+    def move(self,x:int,y:int):
+        self.send(build_move_events(x,y,self.get_virtual_screen()))
+
+    def click(self,x:int,y:int,button:str='left',clicks:int=1):
+        self.send(build_click_events(x,y,self.get_virtual_screen(),button=button,clicks=clicks))
+
+    def drag(self,start:tuple[int,int],end:tuple[int,int],steps:int=10):
+        self.send_batches(build_drag_events(start,end,self.get_virtual_screen(),steps=steps))
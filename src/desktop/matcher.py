@@ -0,0 +1,203 @@
+from fuzzywuzzy import fuzz, utils
+from collections import Counter
+from typing import Iterable
+import numpy as np
+
+def ratio_bound(matches:np.ndarray,length:np.ndarray)->np.ndarray:
+    '''Upper bound of fuzz.ratio for strings of that total length sharing that many characters.'''
+    with np.errstate(divide='ignore',invalid='ignore'):
+        return np.where(length>0,np.round(100*(2.0*matches/length)+1e-7),0)
+
+def partial_bound(matches:np.ndarray,shorter:np.ndarray)->np.ndarray:
+    '''Upper bound of fuzz.partial_ratio, the window of the longer string may be cut short by its end.'''
+    matches=np.minimum(matches,shorter)
+    with np.errstate(divide='ignore',invalid='ignore'):
+        return np.where(matches>0,np.round(100*(2.0*matches/(shorter+matches))+1e-7),0)
+
+class NameMatcher:
+    '''
+    Returns what process.extractOne(query, names, score_cutoff=...) returns, for names kept between calls. Names are
+    normalized once when added and their character and token counts are kept in arrays. A query bounds the fuzz.WRatio
+    score of every name from those counts at once, then scores names best bound first until no remaining name can
+    beat the best score found.
+    '''
+    def __init__(self,names:Iterable[str]=(),capacity:int=64):
+        self.rows:dict[str,int]={}
+        self.names:list[str|None]=[None]*capacity
+        self.processed:list[str]=['']*capacity
+        self.tokens:list[frozenset[str]]=[frozenset()]*capacity
+        self.free:list[int]=list(range(capacity-1,-1,-1))
+        self.columns:dict[str,int]={}
+        self.characters=np.zeros((capacity,0),dtype=np.int32)
+        self.set_characters=np.zeros((capacity,0),dtype=np.int32)
+        # length, spaces, token count, distinct tokens, length of the joined distinct tokens
+        self.counts=np.zeros((5,capacity),dtype=np.int64)
+        self.order=np.zeros(capacity,dtype=np.int64)
+        self.active=np.zeros(capacity,dtype=bool)
+        self.token_rows:dict[str,set[int]]={}
+        self.next_order=0
+        self.scored=0
+        self.update(names)
+
+    def __len__(self)->int:
+        return len(self.rows)
+
+    def __contains__(self,name:str)->bool:
+        return name in self.rows
+
+    def grow(self):
+        capacity=len(self.names)
+        self.names.extend([None]*capacity)
+        self.processed.extend(['']*capacity)
+        self.tokens.extend([frozenset()]*capacity)
+        self.free.extend(range(2*capacity-1,capacity-1,-1))
+        self.characters=np.vstack((self.characters,np.zeros_like(self.characters)))
+        self.set_characters=np.vstack((self.set_characters,np.zeros_like(self.set_characters)))
+        self.counts=np.hstack((self.counts,np.zeros_like(self.counts)))
+        self.order=np.concatenate((self.order,np.zeros_like(self.order)))
+        self.active=np.concatenate((self.active,np.zeros_like(self.active)))
+
+    def get_column(self,character:str)->int:
+        column=self.columns.get(character)
+        if column is None:
+            column=self.columns[character]=len(self.columns)
+            padding=np.zeros((len(self.names),1),dtype=np.int32)
+            self.characters=np.hstack((self.characters,padding))
+            self.set_characters=np.hstack((self.set_characters,padding))
+        return column
+
+    def add(self,name:str,order:int|None=None):
+        if name in self.rows:
+            return None
+        if not self.free:
+            self.grow()
+        row=self.free.pop()
+        # Normalized as extractOne normalizes its choices
+        processed=utils.full_process(name,force_ascii=True)
+        tokens=processed.split()
+        token_set=frozenset(tokens)
+        # Columns first, a new character widens the arrays
+        characters=[(self.get_column(character),count) for character,count in Counter(processed.replace(' ','')).items()]
+        set_characters=[(self.get_column(character),count) for character,count in Counter(''.join(token_set)).items()]
+        for column,count in characters:
+            self.characters[row,column]=count
+        for column,count in set_characters:
+            self.set_characters[row,column]=count
+        self.counts[:,row]=(len(processed),processed.count(' '),len(tokens),len(token_set),sum(map(len,token_set))+len(token_set)-1)
+        for token in token_set:
+            self.token_rows.setdefault(token,set()).add(row)
+        if order is None:
+            order,self.next_order=self.next_order,self.next_order+1
+        self.order[row]=order
+        self.active[row]=True
+        self.rows[name]=row
+        self.names[row]=name
+        self.processed[row]=processed
+        self.tokens[row]=token_set
+
+    def remove(self,name:str):
+        row=self.rows.pop(name,None)
+        if row is None:
+            return None
+        for token in self.tokens[row]:
+            rows=self.token_rows[token]
+            rows.discard(row)
+            if not rows:
+                del self.token_rows[token]
+        self.characters[row]=0
+        self.set_characters[row]=0
+        self.active[row]=False
+        self.names[row]=None
+        self.tokens[row]=frozenset()
+        self.free.append(row)
+
+    def update(self,names:Iterable[str]):
+        '''Makes the names, in this order, the only candidates. Names already known are not normalized again.'''
+        names=list(dict.fromkeys(names))
+        for name in set(self.rows).difference(names):
+            self.remove(name)
+        for order,name in enumerate(names):
+            row=self.rows.get(name)
+            if row is None:
+                self.add(name,order=order)
+            else:
+                # Ties go to the earlier name, as in extractOne
+                self.order[row]=order
+        self.next_order=len(names)
+
+    def get_bounds(self,processed:str)->np.ndarray:
+        '''Upper bound of fuzz.WRatio between the processed query and every row, zero for free rows.'''
+        tokens=processed.split()
+        token_set=frozenset(tokens)
+        query_characters=np.zeros(len(self.columns),dtype=np.int32)
+        query_set_characters=np.zeros(len(self.columns),dtype=np.int32)
+        # Characters no name has can not match, they only count in the length
+        for character,count in Counter(processed.replace(' ','')).items():
+            if character in self.columns:
+                query_characters[self.columns[character]]=count
+        for character,count in Counter(''.join(token_set)).items():
+            if character in self.columns:
+                query_set_characters[self.columns[character]]=count
+        length,spaces,token_count,set_size,set_length=self.counts
+        query_length,query_spaces,query_token_count=len(processed),processed.count(' '),len(tokens)
+        query_set_size,query_set_length=len(token_set),sum(map(len,token_set))+len(token_set)-1
+        characters=np.minimum(self.characters,query_characters).sum(axis=1)
+        set_characters=np.minimum(self.set_characters,query_set_characters).sum(axis=1)
+        # Length of the joined token set intersection
+        section=np.zeros(len(self.names),dtype=np.int64)
+        shared=np.zeros(len(self.names),dtype=np.int64)
+        for token in token_set:
+            rows=self.token_rows.get(token)
+            if rows:
+                rows=np.fromiter(rows,dtype=np.int64,count=len(rows))
+                section[rows]+=len(token)
+                shared[rows]+=1
+        section=np.where(shared>0,section+shared-1,0)
+        # Spaces the joined tokens of both strings can have in common
+        gaps=np.minimum(token_count,query_token_count)-1
+        set_gaps=np.minimum(set_size,query_set_size)-1
+        sorted_length=length-spaces+token_count-1
+        query_sorted_length=query_length-query_spaces+query_token_count-1
+        matches=characters+np.minimum(spaces,query_spaces)
+        base=ratio_bound(matches,length+query_length)
+        with np.errstate(divide='ignore',invalid='ignore'):
+            length_ratio=np.maximum(length,query_length)/np.minimum(length,query_length)
+        token_sort=ratio_bound(characters+gaps,sorted_length+query_sorted_length)
+        token_set_ratio=np.maximum(
+            ratio_bound(set_characters+set_gaps,set_length+query_set_length),
+            np.where(shared>0,ratio_bound(section,section+np.minimum(set_length,query_set_length)),0)
+        )
+        whole=np.maximum(base,np.maximum(token_sort*.95,token_set_ratio*.95))
+        partial_scale=np.where(length_ratio>8,.6,.9)
+        partial=partial_bound(matches,np.minimum(length,query_length))
+        partial_token_sort=partial_bound(characters+gaps,np.minimum(sorted_length,query_sorted_length))
+        # The intersection is a substring of both combined strings
+        partial_token_set=np.where(shared>0,100,partial_bound(set_characters+set_gaps,np.minimum(set_length,query_set_length)))
+        partial=np.maximum(np.maximum(base,partial*partial_scale),np.maximum(partial_token_sort*.95*partial_scale,partial_token_set*.95*partial_scale))
+        bounds=np.round(np.where(length_ratio<1.5,whole,partial))
+        return np.where(self.active&(length>0)&(query_length>0),bounds,0)
+
+    def extract_one(self,query:str,score_cutoff:int=0)->tuple[str,int]|None:
+        if not self.rows:
+            return None
+        # Normalized as extractOne normalizes its query
+        processed=utils.full_process(utils.full_process(query),force_ascii=True)
+        bounds=self.get_bounds(processed)
+        rows=np.flatnonzero(self.active&(bounds>=score_cutoff))
+        rows=rows[np.lexsort((self.order[rows],-bounds[rows]))]
+        best_row,best_score=-1,-1
+        self.scored=0
+        for row,bound in zip(rows.tolist(),bounds[rows].tolist()):
+            if bound<best_score:
+                break
+            if bound==best_score and self.order[row]>self.order[best_row]:
+                continue
+            self.scored+=1
+            score=fuzz.WRatio(processed,self.processed[row],full_process=False)
+            if score<score_cutoff:
+                continue
+            if score>best_score or (score==best_score and self.order[row]<self.order[best_row]):
+                best_row,best_score=row,score
+        if best_row<0:
+            return None
+        return (self.names[best_row],best_score)
@@ -0,0 +1,78 @@
+from src.desktop.views import PoolStats
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock, local
+from time import perf_counter
+from collections import deque
+from uiautomation import UIAutomationInitializerInThread
+
+thread_state=local()
+
+def initialize_worker():
+    # Kept for the lifetime of the worker so COM stays initialized between tasks
+    thread_state.initializer=UIAutomationInitializerInThread()
+
+class WorkerPool(ThreadPoolExecutor):
+    '''Process-wide pool of UI Automation ready workers that tracks its queue depth and task latencies.'''
+    def __init__(self,max_workers:int,latency_window:int=256,thread_name_prefix:str='ua-worker'):
+        super().__init__(max_workers=max_workers,thread_name_prefix=thread_name_prefix,initializer=initialize_worker)
+        self.size=max_workers
+        self.lock=Lock()
+        self.queued=0
+        self.running=0
+        self.submitted=0
+        self.completed=0
+        self.failed=0
+        self.max_queue_depth=0
+        self.wait_times:deque[float]=deque(maxlen=latency_window)
+        self.run_times:deque[float]=deque(maxlen=latency_window)
+
+    def submit(self,fn,/,*args,**kwargs)->Future:
+        submitted_at=perf_counter()
+        with self.lock:
+            self.submitted+=1
+            self.queued+=1
+            self.max_queue_depth=max(self.max_queue_depth,self.queued)
+
+        def task():
+            started_at=perf_counter()
+            with self.lock:
+                self.queued-=1
+                self.running+=1
+                self.wait_times.append(started_at-submitted_at)
+            is_failed=False
+            try:
+                return fn(*args,**kwargs)
+            except BaseException:
+                is_failed=True
+                raise
+            finally:
+                with self.lock:
+                    self.running-=1
+                    self.completed+=1
+                    self.failed+=is_failed
+                    self.run_times.append(perf_counter()-started_at)
+
+        try:
+            return super().submit(task)
+        except RuntimeError:
+            with self.lock:
+                self.queued-=1
+            raise
+
+    def get_stats(self)->PoolStats:
+        with self.lock:
+            wait_times=sorted(self.wait_times)
+            run_times=sorted(self.run_times)
+            return PoolStats(
+                size=self.size,
+                queue_depth=self.queued,
+                max_queue_depth=self.max_queue_depth,
+                running=self.running,
+                submitted=self.submitted,
+                completed=self.completed,
+                failed=self.failed,
+                mean_wait=sum(wait_times)/len(wait_times) if wait_times else 0.0,
+                p95_wait=wait_times[int(0.95*(len(wait_times)-1))] if wait_times else 0.0,
+                mean_run=sum(run_times)/len(run_times) if run_times else 0.0,
+                p95_run=run_times[int(0.95*(len(run_times)-1))] if run_times else 0.0
+            )
@@ -0,0 +1,66 @@
+from src.desktop.views import ProcessInfo, ProcessCacheStats
+from psutil import Process, NoSuchProcess, AccessDenied
+from collections import OrderedDict
+from threading import Lock
+import sys
+
+class ProcessCache:
+    '''
+    Executable name, path and browser flag of processes by PID. An entry is only trusted while the process still has
+    the create time it was read with, a PID that was freed and given to a new process is read again.
+    '''
+    def __init__(self,browser_names:set[str],max_entries:int=512):
+        self.browser_names=frozenset(browser_names)
+        self.max_entries=max_entries
+        self.entries:OrderedDict[int,ProcessInfo]=OrderedDict()
+        self.lock=Lock()
+        self.hits=0
+        self.misses=0
+        self.reused_pids=0
+        self.failures=0
+
+    def get(self,pid:int)->ProcessInfo|None:
+        try:
+            process=Process(pid)
+            # Process reads the create time to identify the process, checking it costs no further call
+            create_time=process.create_time()
+        except (NoSuchProcess,AccessDenied,ValueError):
+            with self.lock:
+                self.failures+=1
+                self.entries.pop(pid,None)
+            return None
+        with self.lock:
+            info=self.entries.get(pid)
+            if info is not None and info.create_time==create_time:
+                self.hits+=1
+                self.entries.move_to_end(pid)
+                return info
+            self.misses+=1
+            self.reused_pids+=info is not None
+        try:
+            name=process.name()
+        except (NoSuchProcess,AccessDenied) as ex:
+            print(f"Error: {ex}",file=sys.stderr)
+            with self.lock:
+                self.failures+=1
+            return None
+        try:
+            path=process.exe()
+        except (NoSuchProcess,AccessDenied):
+            # Elevated processes hide their path from a normal user, the name is still known
+            path=''
+        info=ProcessInfo(pid=pid,create_time=create_time,name=name,path=path,is_browser=name in self.browser_names)
+        with self.lock:
+            self.entries[pid]=info
+            self.entries.move_to_end(pid)
+            while len(self.entries)>self.max_entries:
+                self.entries.popitem(last=False)
+        return info
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def get_stats(self)->ProcessCacheStats:
+        with self.lock:
+            return ProcessCacheStats(entries=len(self.entries),hits=self.hits,misses=self.misses,reused_pids=self.reused_pids,failures=self.failures)
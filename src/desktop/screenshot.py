@@ -0,0 +1,62 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from types import ModuleType
+from PIL import Image
+from io import BytesIO
+import sys
+
+def encode_image(image:Image.Image,format:str='png',quality:int=80)->bytes:
+    buffer=BytesIO()
+    match format:
+        case 'jpeg':
+            image.convert('RGB').save(buffer,format='JPEG',quality=quality)
+        case 'webp':
+            image.save(buffer,format='WEBP',quality=quality,method=2)
+        case _:
+            image.save(buffer,format='PNG')
+    return buffer.getvalue()
+
+def encode_raw(mode:str,size:tuple[int,int],data:bytes,format:str,quality:int)->bytes:
+    '''Runs in the encoder process, the image crosses the process boundary as raw pixels.'''
+    return encode_image(Image.frombytes(mode,size,data),format=format,quality=quality)
+
+class ScreenshotEncoder:
+    '''
+    Encodes screenshots in a worker process so the encoder does not hold the GIL of the server. Falls back to
+    encoding on the calling thread when the process is not running or has died.
+    '''
+    def __init__(self):
+        self.executor:ProcessPoolExecutor|None=None
+
+    def start(self):
+        if self.executor is None:
+            self.executor=ProcessPoolExecutor(max_workers=1,mp_context=get_context('spawn'))
+            # A spawned process runs the main module of its parent again, which for the server builds the desktop, probes
+            # the environment and registers the tools. It is started from a bare main module instead, the pickled tasks
+            # import the little they need themselves.
+            main_module=sys.modules['__main__']
+            sys.modules['__main__']=ModuleType('__main__')
+            try:
+                # Spawn the process now rather than on the first screenshot
+                future=self.executor.submit(int)
+            finally:
+                sys.modules['__main__']=main_module
+            future.result()
+
+    def stop(self):
+        if self.executor is None:
+            return None
+        executor,self.executor=self.executor,None
+        executor.shutdown(wait=True,cancel_futures=True)
+
+    def encode(self,image:Image.Image,format:str='png',quality:int=80)->bytes:
+        executor=self.executor
+        if executor is None:
+            return encode_image(image,format=format,quality=quality)
+        try:
+            return executor.submit(encode_raw,image.mode,image.size,image.tobytes(),format,quality).result()
+        except BrokenProcessPool as ex:
+            print(f"Error: {ex}",file=sys.stderr)
+            self.executor=None
+            return encode_image(image,format=format,quality=quality)
@@ -1,42 +1,166 @@
-from uiautomation import Control, GetRootControl, IsIconic, IsZoomed, IsWindowVisible, ControlType, ControlFromCursor, IsTopLevelWindow, ShowWindow, ControlFromHandle, GetForegroundWindow, SetForegroundWindow, GetScreenSize
-from src.desktop.config import EXCLUDED_APPS, AVOIDED_APPS, BROWSER_NAMES, PROCESS_PER_MONITOR_DPI_AWARE
-from src.desktop.views import DesktopState, App, Size, Status
+from uiautomation import Control, GetRootControl, IsIconic, IsZoomed, IsWindowVisible, ControlType, ControlFromCursor, IsTopLevelWindow, ControlFromPoint, ShowWindow, ControlFromHandle, GetForegroundWindow, SetForegroundWindow, GetScreenSize
+from src.desktop.config import EXCLUDED_APPS, AVOIDED_APPS, BROWSER_NAMES, PROCESS_PER_MONITOR_DPI_AWARE, WORKER_POOL_SIZE, WORKER_POOL_LATENCY_WINDOW, SNAPSHOT_MAX_AGE, SNAPSHOT_HISTORY, SCREENSHOT_FORMAT, SCREENSHOT_QUALITY, SCREENSHOT_RESAMPLE, SCREENSHOT_ENCODER_PROCESS, VISION_TILE_SIZE, VISION_KEYFRAME_INTERVAL, VISION_MAX_DIRTY_RATIO, PROCESS_CACHE_SIZE, START_MENU_CACHE_PATH, START_MENU_TTL, START_MENU_DIRECTORIES, SHELL_POOL_SIZE, SHELL_COMMAND_TIMEOUT, SHELL_STATELESS, ACTION_SETTLE_PAUSE, ACTION_SETTLE_TIMEOUT, SWITCH_TIMEOUT, LAUNCH_TIMEOUT, WAIT_POLL_INTERVAL, WAIT_MAX_POLL_INTERVAL, INPUT_CHUNK_SIZE, INPUT_BATCH_PAUSE, INPUT_PASTE_THRESHOLD, INPUT_PASTE_RESTORE_DELAY, ENVIRONMENT_CACHE_PATH, ENVIRONMENT_CACHE_TTL
+from concurrent.futures import ThreadPoolExecutor
+from src.desktop.pool import WorkerPool
+from src.desktop.views import DesktopState, App, Size, Status, ScreenshotStats, WaitResult
+from src.desktop.wait import wait_until, foreground_changed, foreground_is, window_appears, input_idle, region_settled
+from src.desktop.screenshot import ScreenshotEncoder
+from src.desktop.process import ProcessCache
+from src.desktop.catalog import StartMenuCatalog
+from src.desktop.shell import ShellPool, PowerShellDialect
+from src.desktop.inject import InputEngine
+from src.desktop.environment import EnvironmentCache
 from PIL.Image import Image as PILImage
 from locale import getpreferredencoding
 from contextlib import contextmanager
+from collections import OrderedDict
+from threading import Lock
+from src.mirror.uia import UIAutomationEventSource
+from src.tree.config import ENABLE_TREE_MIRROR
+from src.mirror.service import TreeMirror
+from src.tree.classifier import Classifier
 from src.tree.service import Tree
-from fuzzywuzzy import process
-from typing import Optional
-from psutil import Process
-from time import sleep
-from io import BytesIO
-from PIL import Image
+from typing import Optional, TYPE_CHECKING
+from functools import cached_property
+from time import sleep, perf_counter
+from PIL import Image, ImageGrab
 import win32process
-import subprocess
 import pyautogui
 import win32con
 import ctypes
+import sys
 import csv
 import os
 import io
 
+if TYPE_CHECKING:
+    from src.desktop.matcher import NameMatcher
+    from src.desktop.tiles import TileDiffer
+
 class Desktop:
     def __init__(self):
         ctypes.windll.shcore.SetProcessDpiAwareness(PROCESS_PER_MONITOR_DPI_AWARE)
         self.encoding=getpreferredencoding()
+        self.shell=ShellPool(PowerShellDialect(),size=SHELL_POOL_SIZE,timeout=SHELL_COMMAND_TIMEOUT,stateless=SHELL_STATELESS,cwd=os.path.expanduser(path='~'))
         self.desktop_state=None
+        self.state_lock=Lock()
+        self.state_version=0
+        self.state_history:OrderedDict[int,DesktopState]=OrderedDict()
+        self.last_input_at=None
+        self.tree_mirror=None
+        self.pool=None
+        self.encoder=ScreenshotEncoder()
+        self.screenshot_stats=ScreenshotStats()
+        self.classifier=Classifier()
+        self.start_menu=StartMenuCatalog(loader=self.load_start_menu,cache_path=START_MENU_CACHE_PATH,ttl=START_MENU_TTL,directories=START_MENU_DIRECTORIES)
+        self.start_menu_apps:dict[str,str]|None=None
+        self.process_cache=ProcessCache(browser_names=BROWSER_NAMES,max_entries=PROCESS_CACHE_SIZE)
+        self.input_engine=InputEngine(chunk_size=INPUT_CHUNK_SIZE,batch_pause=INPUT_BATCH_PAUSE,paste_threshold=INPUT_PASTE_THRESHOLD,paste_restore_delay=INPUT_PASTE_RESTORE_DELAY)
+        self.environment=EnvironmentCache(
+            probes={'windows_version':self.probe_windows_version,'default_language':self.probe_default_language},
+            defaults={'windows_version':'Windows','default_language':''},
+            signature=self.get_environment_signature,cache_path=ENVIRONMENT_CACHE_PATH,ttl=ENVIRONMENT_CACHE_TTL
+        )
+
+    # Made on first use, numpy and fuzzywuzzy are imported by the tools that need them and not at server start
+    @cached_property
+    def app_matcher(self)->'NameMatcher':
+        from src.desktop.matcher import NameMatcher
+        return NameMatcher()
+
+    @cached_property
+    def start_menu_matcher(self)->'NameMatcher':
+        from src.desktop.matcher import NameMatcher
+        return NameMatcher()
+
+    @cached_property
+    def tile_differ(self)->'TileDiffer':
+        from src.desktop.tiles import TileDiffer
+        return TileDiffer(tile_size=VISION_TILE_SIZE,keyframe_interval=VISION_KEYFRAME_INTERVAL,max_dirty_ratio=VISION_MAX_DIRTY_RATIO)
+
+    def start_pool(self):
+        if self.pool is None:
+            self.pool=WorkerPool(max_workers=WORKER_POOL_SIZE,latency_window=WORKER_POOL_LATENCY_WINDOW)
+
+    def stop_pool(self):
+        if self.pool is None:
+            return None
+        pool,self.pool=self.pool,None
+        pool.shutdown(wait=True,cancel_futures=True)
+
+    def start_encoder(self):
+        if not SCREENSHOT_ENCODER_PROCESS:
+            return None
+        try:
+            self.encoder.start()
+        except Exception as ex:
+            # Screenshots are then encoded on the request thread
+            print(f"Error: {ex}",file=sys.stderr)
+
+    def stop_encoder(self):
+        self.encoder.stop()
+
+    @contextmanager
+    def get_executor(self):
+        '''Yields the shared pool, or a pool for this call only when the shared one is not running.'''
+        if self.pool is not None:
+            yield self.pool
+        else:
+            with ThreadPoolExecutor() as executor:
+                yield executor
+    
+    def start_tree_mirror(self):
+        if not ENABLE_TREE_MIRROR or self.tree_mirror is not None:
+            return None
+        tree_mirror=TreeMirror(source=UIAutomationEventSource())
+        try:
+            tree_mirror.start()
+            self.tree_mirror=tree_mirror
+        except Exception as ex:
+            # Without events the tree is walked on every call
+            print(f"Error: {ex}",file=sys.stderr)
+
+    def stop_tree_mirror(self):
+        if self.tree_mirror is None:
+            return None
+        self.tree_mirror.stop()
+        self.tree_mirror=None
         
-    def get_state(self,use_vision:bool=False)->DesktopState:
+    def get_state(self,use_vision:bool=False,capture:str='screen',region:tuple[int,int,int,int]|None=None,vision_delta:bool=False,keyframe:bool=False)->DesktopState:
         tree=Tree(self)
         active_app,apps=self.get_apps()
         tree_state=tree.get_state()
-        if use_vision:
-            annotated_screenshot=tree.annotated_screenshot(tree_state.interactive_nodes,scale=0.5)
-            screenshot=self.screenshot_in_bytes(annotated_screenshot)
-        else:
-            screenshot=None
-        self.desktop_state=DesktopState(apps= apps,active_app=active_app,screenshot=screenshot,tree_state=tree_state)
-        return self.desktop_state
+        # Walks run side by side, the screenshot deltas and the snapshot history are updated one state at a time
+        with self.state_lock:
+            screenshot,screenshot_delta,screenshot_tiles,screenshot_stats=None,None,[],None
+            if use_vision:
+                self.screenshot_stats=ScreenshotStats()
+                bbox=self.get_capture_bbox(capture=capture,region=region)
+                annotated_screenshot=tree.annotated_screenshot(tree_state.interactive_nodes,scale=0.5,bbox=bbox)
+                if vision_delta:
+                    screenshot_delta=self.tile_differ.diff(annotated_screenshot,keyframe=keyframe,area=bbox)
+                else:
+                    # The client got a whole frame, the next delta has to start from a keyframe
+                    self.tile_differ.reset()
+                if screenshot_delta is None or screenshot_delta.is_keyframe:
+                    screenshot=self.screenshot_in_bytes(annotated_screenshot)
+                else:
+                    screenshot_tiles=[self.screenshot_in_bytes(annotated_screenshot.crop(rect)) for rect in screenshot_delta.rects]
+                screenshot_stats=self.screenshot_stats
+            self.state_version+=1
+            self.desktop_state=DesktopState(
+                apps= apps,active_app=active_app,screenshot=screenshot,tree_state=tree_state,version=self.state_version,
+                screenshot_format=SCREENSHOT_FORMAT,screenshot_delta=screenshot_delta,screenshot_tiles=screenshot_tiles,screenshot_stats=screenshot_stats
+            )
+            self.state_history[self.state_version]=self.desktop_state
+            self.app_matcher.update(app.name for app in [active_app]+apps if app is not None)
+            while len(self.state_history)>SNAPSHOT_HISTORY:
+                self.state_history.popitem(last=False)
+            return self.desktop_state
+
+    def get_snapshot(self,version:int)->DesktopState|None:
+        '''Returns an earlier state by version while it is still kept.'''
+        return self.state_history.get(version)
     
     def get_window_element_from_element(self,element:Control)->Control|None:
         while element is not None:
@@ -72,37 +196,113 @@ class Desktop:
     
     def get_element_under_cursor(self)->Control:
         return ControlFromCursor()
+
+    def mark_input(self,settle:bool=True):
+        '''
+        Records that input was sent, the snapshot no longer shows what is on screen. With settle it first waits for the
+        foreground window to show the result, which is what a fixed pause after every action used to stand in for.
+        '''
+        if settle:
+            self.wait_for_settle()
+        self.last_input_at=perf_counter()
+
+    def wait_for(self,check,timeout:float)->WaitResult:
+        return wait_until(check,timeout=timeout,interval=WAIT_POLL_INTERVAL,max_interval=WAIT_MAX_POLL_INTERVAL)
+
+    def wait_for_settle(self,timeout:float=ACTION_SETTLE_TIMEOUT)->WaitResult:
+        '''Pauses briefly after input, then waits for the foreground window to stop changing.'''
+        sleep(ACTION_SETTLE_PAUSE)
+        bbox=self.get_capture_bbox(capture='window')
+        try:
+            return self.wait_for(region_settled(lambda: ImageGrab.grab(bbox=bbox,all_screens=True)),timeout)
+        except OSError as ex:
+            # The screen can not be grabbed while the desktop is locked
+            print(f"Error: {ex}",file=sys.stderr)
+            return WaitResult(is_met=False,elapsed=ACTION_SETTLE_PAUSE,polls=0)
+
+    def wait_for_input_idle(self,handle:int|None=None,timeout:float=LAUNCH_TIMEOUT)->WaitResult:
+        '''
+        Waits for the app owning the window, the foreground one by default, to finish starting up. Windows only tracks
+        this once per process, later it holds at once, so it says nothing about input sent to a running app.
+        '''
+        try:
+            _,pid=win32process.GetWindowThreadProcessId(handle or GetForegroundWindow())
+        except Exception as ex:
+            print(f"Error: {ex}",file=sys.stderr)
+            return WaitResult(is_met=True,elapsed=0.0,polls=0)
+        return self.wait_for(input_idle(pid),timeout)
+
+    def wait_for_foreground_change(self,handle:int|None=None,timeout:float=ACTION_SETTLE_TIMEOUT)->WaitResult:
+        '''Waits for another window than the given one, the current foreground one by default, to come forward.'''
+        return self.wait_for(foreground_changed(handle or GetForegroundWindow()),timeout)
+
+    def wait_for_window(self,name:str,timeout:float=LAUNCH_TIMEOUT)->WaitResult:
+        '''Waits for a visible window whose title matches the name, the value of the result is its handle.'''
+        return self.wait_for(window_appears(name),timeout)
+
+    def wait_for_region(self,region:tuple[int,int,int,int]|None=None,timeout:float=ACTION_SETTLE_TIMEOUT)->WaitResult:
+        '''Waits for the region (x, y, width, height), the whole screen by default, to stop changing.'''
+        bbox=self.get_capture_bbox(region=region)
+        return self.wait_for(region_settled(lambda: ImageGrab.grab(bbox=bbox,all_screens=True)),timeout)
+
+    def is_snapshot_stale(self)->bool:
+        if self.desktop_state is None:
+            return True
+        tree_state=self.desktop_state.tree_state
+        if self.last_input_at is not None and self.last_input_at>=tree_state.captured_at:
+            return True
+        if perf_counter()-tree_state.captured_at>SNAPSHOT_MAX_AGE:
+            return True
+        active_app=self.desktop_state.active_app
+        return active_app is not None and active_app.handle!=GetForegroundWindow()
+
+    def get_element_at(self,x:int,y:int)->tuple[str,str]:
+        '''Returns the name and control type of the element at the point, from the last snapshot while it is fresh.'''
+        if not self.is_snapshot_stale():
+            node=self.desktop_state.tree_state.element_at(x,y)
+            if node is not None:
+                return node.name,node.control_type
+        control=ControlFromPoint(x,y)
+        if control is None:
+            return '',''
+        return control.Name,control.LocalizedControlType.title()
     
-    def get_apps_from_start_menu(self)->dict[str,str]:
+    def load_start_menu(self)->str:
         command='Get-StartApps | ConvertTo-Csv -NoTypeInformation'
-        apps_info,_=self.execute_command(command)
-        reader=csv.DictReader(io.StringIO(apps_info))
-        return {row.get('Name').lower():row.get('AppID') for row in reader}
+        apps_info,status=self.execute_command(command)
+        if status!=0:
+            raise RuntimeError(apps_info)
+        return apps_info
+
+    def get_apps_from_start_menu(self,refresh:bool=False)->dict[str,str]:
+        apps_map=self.start_menu.refresh() if refresh else self.start_menu.get_apps()
+        # Every load of the catalog makes a new dict, so the matcher is rebuilt exactly when the apps it knows are replaced
+        if apps_map is not self.start_menu_apps:
+            self.start_menu_matcher.update(apps_map.keys())
+            self.start_menu_apps=apps_map
+        return apps_map
     
-    def execute_command(self,command:str)->tuple[str,int]:
+    def execute_command(self,command:str,timeout:float|None=None)->tuple[str,int]:
         try:
-            result = subprocess.run(
-                ['powershell', '-NoProfile', '-Command', command], 
-                capture_output=True, 
-                errors='ignore',
-                timeout=25,
-                cwd=os.path.expanduser(path='~')
-            )
-            stdout=result.stdout
-            stderr=result.stderr
-            return (stdout or stderr,result.returncode)
-        except subprocess.TimeoutExpired:
-            return ('Command execution timed out', 1)
+            result=self.shell.run(command,timeout=timeout)
+            if result.is_timed_out:
+                return ('Command execution timed out', 1)
+            return (result.stdout or result.stderr,result.exit_code)
         except Exception as e:
             return ('Command execution failed', 1)
         
-    def is_app_browser(self,node:Control):
-        process=Process(node.ProcessId)
-        return process.name() in BROWSER_NAMES
+    def is_app_browser(self,node:Control)->bool:
+        info=self.process_cache.get(node.ProcessId)
+        return info is not None and info.is_browser
     
     def get_default_language(self)->str:
+        return self.environment.get('default_language')
+
+    def probe_default_language(self)->str:
         command="Get-Culture | Select-Object Name,DisplayName | ConvertTo-Csv -NoTypeInformation"
-        response,_=self.execute_command(command)
+        response,status=self.execute_command(command)
+        if status!=0:
+            raise RuntimeError(response)
         reader=csv.DictReader(io.StringIO(response))
         return "".join([row.get('DisplayName') for row in reader])
     
@@ -133,12 +333,16 @@ class Desktop:
     def is_app_running(self, name: str) -> bool:
         if self.desktop_state is None:
             self.get_state()
-        apps = {app.name: app for app in [self.desktop_state.active_app] + self.desktop_state.apps if app is not None}
-        return process.extractOne(name, list(apps.keys()), score_cutoff=60) is not None
+        with self.state_lock:
+            return self.app_matcher.extract_one(name, score_cutoff=60) is not None
 
     def launch_app(self,name:str)->tuple[str,int]:
         apps_map=self.get_apps_from_start_menu()
-        matched_app=process.extractOne(name,apps_map.keys(),score_cutoff=70)
+        matched_app=self.start_menu_matcher.extract_one(name,score_cutoff=70)
+        if matched_app is None:
+            # The app may have been installed since the catalog was loaded
+            apps_map=self.get_apps_from_start_menu(refresh=True)
+            matched_app=self.start_menu_matcher.extract_one(name,score_cutoff=70)
         if matched_app is None:
             return (f'{name.title()} not found in start menu.',1)
         app_name,_=matched_app
@@ -154,7 +358,8 @@ class Desktop:
     def switch_app(self,name:str='',handle:int=None):
         apps={app.name:app for app in [self.desktop_state.active_app]+self.desktop_state.apps if app is not None}
         if not handle:
-            matched_app:Optional[tuple[str,float]]=process.extractOne(name,list(apps.keys()),score_cutoff=70)
+            with self.state_lock:
+                matched_app:Optional[tuple[str,float]]=self.app_matcher.extract_one(name,score_cutoff=70)
             if matched_app is None:
                 return (f'Application {name.title()} not found.',1)
             app_name,_=matched_app
@@ -184,6 +389,7 @@ class Desktop:
             content=f'Switched to {app_name.title()} window.'
             
         win32process.AttachThreadInput(foreground_thread,target_thread,False)
+        self.wait_for(foreground_is(target_handle),SWITCH_TIMEOUT)
         return content,0
     
     def get_app_size(self,control:Control):
@@ -206,7 +412,6 @@ class Desktop:
         
     def get_apps(self) -> tuple[App|None,list[App]]:
         try:
-            sleep(0.5)
             desktop = GetRootControl()  # Get the desktop control
             elements = desktop.GetChildren()
             apps = []
@@ -216,7 +421,9 @@ class Desktop:
                 if element.ControlType in [ControlType.WindowControl, ControlType.PaneControl]:
                     status = self.get_app_status(element)
                     size=self.get_app_size(element)
-                    apps.append(App(name=element.Name, depth=depth, status=status,size=size,handle=element.NativeWindowHandle))
+                    info=self.process_cache.get(element.ProcessId)
+                    exe=info.name if info is not None else ''
+                    apps.append(App(name=element.Name, depth=depth, status=status,size=size,handle=element.NativeWindowHandle,exe=exe))
         except Exception as ex:
             print(f"Error: {ex}")
             apps = []
@@ -227,10 +434,19 @@ class Desktop:
         return (active_app,apps)
     
     def get_windows_version(self)->str:
+        return self.environment.get('windows_version')
+
+    def probe_windows_version(self)->str:
         response,status=self.execute_command("(Get-CimInstance Win32_OperatingSystem).Caption")
-        if status==0:
-            return response.strip()
-        return "Windows"
+        if status!=0:
+            raise RuntimeError(response)
+        return response.strip()
+
+    def get_environment_signature(self)->list:
+        '''The Windows build and the user locale, an upgrade or a change of the display language probes again.'''
+        buffer=ctypes.create_unicode_buffer(85)
+        ctypes.windll.kernel32.GetUserDefaultLocaleName(buffer,len(buffer))
+        return [*sys.getwindowsversion()[:3],buffer.value]
     
     def get_user_account_type(self)->str:
         response,status=self.execute_command("(Get-LocalUser -Name $env:USERNAME).PrincipalSource")
@@ -245,15 +461,40 @@ class Desktop:
         width,height=GetScreenSize()
         return Size(width=width,height=height)
     
-    def screenshot_in_bytes(self,screenshot:PILImage)->bytes:
-        buffer=BytesIO()
-        screenshot.save(buffer,format='PNG')
-        return buffer.getvalue()
+    def screenshot_in_bytes(self,screenshot:PILImage,format:str=SCREENSHOT_FORMAT,quality:int=SCREENSHOT_QUALITY)->bytes:
+        start=perf_counter()
+        data=self.encoder.encode(screenshot,format=format,quality=quality)
+        self.screenshot_stats.encode_time+=perf_counter()-start
+        self.screenshot_stats.encoded_bytes+=len(data)
+        return data
 
-    def get_screenshot(self,scale:float=0.7)->Image.Image:
-        screenshot=pyautogui.screenshot()
+    def get_capture_bbox(self,capture:str='screen',region:tuple[int,int,int,int]|None=None)->tuple[int,int,int,int]|None:
+        '''Returns the (left, top, right, bottom) screen rectangle to capture, None for the whole screen.'''
+        if region is not None:
+            x,y,width,height=region
+            return (x,y,x+width,y+height)
+        if capture=='window':
+            try:
+                box=ControlFromHandle(GetForegroundWindow()).BoundingRectangle
+                if not box.isempty():
+                    return (box.left,box.top,box.right,box.bottom)
+            except Exception as ex:
+                print(f"Error: {ex}",file=sys.stderr)
+        return None
+
+    def get_screenshot(self,scale:float=0.7,bbox:tuple[int,int,int,int]|None=None)->Image.Image:
+        start=perf_counter()
+        if bbox is None:
+            screenshot=pyautogui.screenshot()
+        else:
+            screenshot=ImageGrab.grab(bbox=bbox,all_screens=True)
+        self.screenshot_stats.capture_time=perf_counter()-start
+        self.screenshot_stats.captured_size=Size(width=screenshot.width,height=screenshot.height)
+        start=perf_counter()
         size=(screenshot.width*scale, screenshot.height*scale)
-        screenshot.thumbnail(size=size, resample=Image.Resampling.LANCZOS)
+        screenshot.thumbnail(size=size, resample=Image.Resampling[SCREENSHOT_RESAMPLE])
+        self.screenshot_stats.scale_time=perf_counter()-start
+        self.screenshot_stats.scaled_size=Size(width=screenshot.width,height=screenshot.height)
         return screenshot
     
     @contextmanager
@@ -0,0 +1,265 @@
+from src.desktop.views import ShellResult
+from threading import Thread, Condition
+from subprocess import Popen, PIPE
+from abc import ABC, abstractmethod
+from queue import Queue, Empty
+from time import perf_counter
+from typing import IO
+import subprocess
+import secrets
+import signal
+import base64
+import sys
+import os
+
+class ShellDialect(ABC):
+    '''How to start a shell that reads one command per line from stdin, and how to frame a command for it.'''
+    argv:tuple[str,...]
+
+    def setup(self)->str:
+        '''Sent once when a session starts.'''
+        return ''
+
+    @abstractmethod
+    def frame(self,command:str,token:str)->str:
+        '''
+        One line that runs the command from the home folder, then writes the token and the exit code as the last line
+        of stdout and the token as the last line of stderr.
+        '''
+
+class PowerShellDialect(ShellDialect):
+    argv=('powershell','-NoProfile','-NoLogo','-NonInteractive','-Command','-')
+
+    def setup(self)->str:
+        return "[Console]::OutputEncoding=[Text.Encoding]::UTF8; $ProgressPreference='SilentlyContinue'\n"
+
+    def frame(self,command:str,token:str)->str:
+        # Base64 keeps a multi line command on the single line -Command - reads at a time
+        encoded=base64.b64encode(command.encode('utf-8')).decode('ascii')
+        return (
+            "$global:LASTEXITCODE=0; $__errors=$Error.Count; Set-Location ~; "
+            f"try {{ & ([ScriptBlock]::Create([Text.Encoding]::UTF8.GetString([Convert]::FromBase64String('{encoded}')))) | Out-Default }} "
+            "catch { [Console]::Error.WriteLine($_) }; "
+            "$__code=if ($global:LASTEXITCODE) { $global:LASTEXITCODE } elseif ($Error.Count -gt $__errors) { 1 } else { 0 }; "
+            f"[Console]::Out.WriteLine('{token} ' + $__code); [Console]::Error.WriteLine('{token}')\n"
+        )
+
+class BashDialect(ShellDialect):
+    argv=('bash','--noprofile','--norc')
+
+    def frame(self,command:str,token:str)->str:
+        encoded=base64.b64encode(command.encode('utf-8')).decode('ascii')
+        # The subshell keeps cd and variables to the command, stdin stays with the session
+        return (
+            f"( cd ~ && eval \"$(printf %s '{encoded}' | base64 -d)\" ) </dev/null; "
+            f"printf '%s %d\\n' '{token}' $?; printf '%s\\n' '{token}' >&2\n"
+        )
+
+def pump(pipe:IO[bytes],queue:Queue):
+    '''Moves the lines of a pipe to a queue, None marks the end of the pipe.'''
+    try:
+        for line in iter(pipe.readline,b''):
+            queue.put(line)
+    except (OSError,ValueError):
+        pass
+    finally:
+        queue.put(None)
+        pipe.close()
+
+class ShellSession:
+    '''A long lived shell process that runs one framed command at a time.'''
+    def __init__(self,dialect:ShellDialect,cwd:str|None=None):
+        self.dialect=dialect
+        self.process=Popen(
+            dialect.argv,stdin=PIPE,stdout=PIPE,stderr=PIPE,cwd=cwd,
+            creationflags=getattr(subprocess,'CREATE_NO_WINDOW',0),start_new_session=os.name!='nt'
+        )
+        self.stdout:Queue[bytes|None]=Queue()
+        self.stderr:Queue[bytes|None]=Queue()
+        for pipe,queue in ((self.process.stdout,self.stdout),(self.process.stderr,self.stderr)):
+            Thread(target=pump,args=(pipe,queue),name='shell-pipe',daemon=True).start()
+        self.commands=0
+        self.send(dialect.setup())
+
+    def is_alive(self)->bool:
+        return self.process.poll() is None
+
+    def send(self,text:str):
+        if text:
+            self.process.stdin.write(text.encode('utf-8'))
+            self.process.stdin.flush()
+
+    def read_frame(self,queue:Queue,token:bytes,deadline:float)->tuple[str,bytes|None]:
+        '''Collects lines up to the token, returns them and what follows the token, None when the shell exited first.'''
+        lines=[]
+        while True:
+            remaining=deadline-perf_counter()
+            if remaining<=0:
+                raise TimeoutError('Command execution timed out')
+            try:
+                line=queue.get(timeout=remaining)
+            except Empty:
+                raise TimeoutError('Command execution timed out')
+            if line is None:
+                return b''.join(lines).decode('utf-8',errors='ignore'),None
+            index=line.find(token)
+            if index<0:
+                lines.append(line)
+                continue
+            # Output without a final newline shares its last line with the token
+            lines.append(line[:index])
+            return b''.join(lines).decode('utf-8',errors='ignore'),line[index+len(token):].strip()
+
+    def run(self,command:str,timeout:float)->ShellResult:
+        token=f'__frame_{secrets.token_hex(8)}__'
+        deadline=perf_counter()+timeout
+        self.commands+=1
+        try:
+            self.send(self.dialect.frame(command,token))
+        except OSError as ex:
+            raise ConnectionError(f'Shell session exited: {ex}')
+        stdout,trailer=self.read_frame(self.stdout,token.encode('ascii'),deadline)
+        stderr,_=self.read_frame(self.stderr,token.encode('ascii'),deadline)
+        if trailer is None:
+            # The command ended the shell (exit), its code is the one of the process
+            try:
+                exit_code=self.process.wait(timeout=max(deadline-perf_counter(),0.1))
+            except subprocess.TimeoutExpired:
+                raise TimeoutError('Command execution timed out')
+        else:
+            try:
+                exit_code=int(trailer)
+            except ValueError:
+                exit_code=1
+        return ShellResult(stdout=stdout,stderr=stderr,exit_code=exit_code)
+
+    def close(self,kill:bool=False,timeout:float=5.0):
+        '''
+        Ends the shell by closing its stdin, the programs its commands started keep running. With kill, as after a
+        command that timed out, the shell is killed with everything it started, a hung command would otherwise keep running.
+        '''
+        if kill and self.is_alive():
+            try:
+                if os.name=='nt':
+                    subprocess.run(['taskkill','/F','/T','/PID',str(self.process.pid)],capture_output=True,timeout=5,creationflags=getattr(subprocess,'CREATE_NO_WINDOW',0))
+                else:
+                    os.killpg(self.process.pid,signal.SIGKILL)
+            except (OSError,subprocess.TimeoutExpired) as ex:
+                print(f"Error: {ex}",file=sys.stderr)
+        try:
+            # The pipe threads close stdout and stderr once they are drained
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            # Only the shell itself, it is stuck and not running a command
+            self.process.kill()
+            try:
+                self.process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                pass
+
+class ShellPool:
+    '''
+    Long lived shell sessions handed out one command at a time, so commands skip the start up of the shell. A command
+    that runs past its timeout has its session killed and replaced. In stateless mode every command gets a session no
+    command ran in before, the next one is started in the background when a command finishes.
+    '''
+    def __init__(self,dialect:ShellDialect,size:int=2,timeout:float=25.0,stateless:bool=False,cwd:str|None=None):
+        self.dialect=dialect
+        self.size=size
+        self.timeout=timeout
+        self.stateless=stateless
+        self.cwd=cwd
+        self.idle:list[ShellSession]=[]
+        self.sessions=0
+        self.condition=Condition()
+        self.is_closed=False
+        self.recycled=0
+
+    def start(self):
+        '''Starts a session ahead of the first command.'''
+        self.prestart()
+
+    def prestart(self):
+        with self.condition:
+            if self.is_closed or self.idle or self.sessions>=self.size:
+                return None
+            self.sessions+=1
+        try:
+            session=ShellSession(self.dialect,cwd=self.cwd)
+        except Exception as ex:
+            print(f"Error: {ex}",file=sys.stderr)
+            with self.condition:
+                self.sessions-=1
+                self.condition.notify()
+            return None
+        self.release(session,keep=True)
+
+    def acquire(self)->ShellSession:
+        with self.condition:
+            while True:
+                if self.is_closed:
+                    raise RuntimeError('Shell pool is closed')
+                while self.idle:
+                    session=self.idle.pop()
+                    if session.is_alive():
+                        return session
+                    self.sessions-=1
+                    session.close()
+                if self.sessions<self.size:
+                    self.sessions+=1
+                    break
+                self.condition.wait()
+        try:
+            return ShellSession(self.dialect,cwd=self.cwd)
+        except Exception:
+            with self.condition:
+                self.sessions-=1
+                self.condition.notify()
+            raise
+
+    def release(self,session:ShellSession,keep:bool,kill:bool=False):
+        with self.condition:
+            keep=keep and not self.is_closed and session.is_alive()
+            if keep:
+                self.idle.append(session)
+            else:
+                self.sessions-=1
+            self.condition.notify()
+        if not keep:
+            session.close(kill=kill)
+
+    def run(self,command:str,timeout:float|None=None)->ShellResult:
+        for attempt in range(2):
+            session=self.acquire()
+            keep,kill=False,False
+            try:
+                result=session.run(command,timeout=timeout or self.timeout)
+                keep=not self.stateless
+                return result
+            except TimeoutError as ex:
+                kill=True
+                with self.condition:
+                    self.recycled+=1
+                return ShellResult(stdout='',stderr=str(ex),exit_code=1,is_timed_out=True)
+            except ConnectionError:
+                # The session died while idle, the command never reached it
+                if attempt:
+                    raise
+            finally:
+                self.release(session,keep=keep,kill=kill)
+                if not keep and not self.is_closed:
+                    # The replacement starts while the caller handles the result
+                    Thread(target=self.prestart,name='shell-prestart',daemon=True).start()
+
+    def close(self):
+        with self.condition:
+            self.is_closed=True
+            idle,self.idle=self.idle,[]
+            self.sessions-=len(idle)
+            self.condition.notify_all()
+        for session in idle:
+            session.close()
@@ -0,0 +1,83 @@
+from src.desktop.views import FrameDelta, Size
+from PIL.Image import Image
+import numpy as np
+
+def hash_tiles(image:Image,tile_size:int,multipliers:np.ndarray)->np.ndarray:
+    '''
+    Hashes every tile of the frame into one 64 bit value. The tile is read as 64 bit words and summed with a random
+    odd multiplier per word, the products wrap around, which makes collisions between different tiles unlikely.
+    '''
+    frame=np.asarray(image.convert('RGB'))
+    height,width,_=frame.shape
+    rows,columns=-(-height//tile_size),-(-width//tile_size)
+    padded=np.zeros((rows*tile_size,columns*tile_size,3),dtype=np.uint8)
+    padded[:height,:width]=frame
+    tiles=padded.reshape(rows,tile_size,columns,tile_size*3).swapaxes(1,2)
+    words=np.ascontiguousarray(tiles).view(np.uint64).reshape(rows,columns,-1)
+    return words@multipliers
+
+def dirty_rects(mask:np.ndarray,tile_size:int,width:int,height:int)->list[tuple[int,int,int,int]]:
+    '''Merges the dirty tiles into rectangles: runs within a tile row, stacked while the run below spans the same columns.'''
+    rects:list[list[int]]=[]
+    open_rects:dict[tuple[int,int],list[int]]={}
+    for row in range(mask.shape[0]):
+        columns=np.flatnonzero(mask[row])
+        runs=[]
+        if columns.size:
+            breaks=np.flatnonzero(np.diff(columns)>1)
+            starts=np.concatenate(([columns[0]],columns[breaks+1]))
+            ends=np.concatenate((columns[breaks],[columns[-1]]))
+            runs=list(zip(starts.tolist(),ends.tolist()))
+        next_rects={}
+        for run in runs:
+            rect=open_rects.get(run)
+            if rect is None:
+                rect=[run[0],row,run[1],row]
+                rects.append(rect)
+            rect[3]=row
+            next_rects[run]=rect
+        open_rects=next_rects
+    return [
+        (left*tile_size,top*tile_size,min((right+1)*tile_size,width),min((bottom+1)*tile_size,height))
+        for left,top,right,bottom in rects
+    ]
+
+class TileDiffer:
+    '''
+    Keeps the tile hashes of the last frame and reports which parts of the next frame changed. A keyframe is sent when
+    asked for, when the frame size or capture area changed, after keyframe_interval deltas, or when most tiles changed.
+    '''
+    def __init__(self,tile_size:int=64,keyframe_interval:int=10,max_dirty_ratio:float=0.5,seed:int=0):
+        if (tile_size*3)%8:
+            raise ValueError('Tile size must make a whole number of 64 bit words per tile row')
+        self.tile_size=tile_size
+        self.keyframe_interval=keyframe_interval
+        self.max_dirty_ratio=max_dirty_ratio
+        words=tile_size*tile_size*3//8
+        self.multipliers=np.random.default_rng(seed).integers(0,2**63,size=words,dtype=np.uint64)*np.uint64(2)+np.uint64(1)
+        self.hashes:np.ndarray|None=None
+        self.area=None
+        self.sequence=0
+
+    def reset(self):
+        self.hashes=None
+
+    def diff(self,image:Image,keyframe:bool=False,area:tuple|None=None)->FrameDelta:
+        hashes=hash_tiles(image,self.tile_size,self.multipliers)
+        previous,self.hashes=self.hashes,hashes
+        size=Size(width=image.width,height=image.height)
+        total_tiles=hashes.size
+        is_keyframe=(
+            keyframe or previous is None or previous.shape!=hashes.shape or area!=self.area
+            or self.sequence>=self.keyframe_interval
+        )
+        self.area=area
+        if not is_keyframe:
+            mask=hashes!=previous
+            changed_tiles=int(mask.sum())
+            if changed_tiles<=total_tiles*self.max_dirty_ratio:
+                self.sequence+=1
+                rects=dirty_rects(mask,self.tile_size,image.width,image.height)
+                return FrameDelta(is_keyframe=False,sequence=self.sequence,size=size,rects=rects,changed_tiles=changed_tiles,total_tiles=total_tiles)
+        self.sequence=0
+        return FrameDelta(is_keyframe=True,sequence=0,size=size,rects=[(0,0,image.width,image.height)],changed_tiles=total_tiles,total_tiles=total_tiles)
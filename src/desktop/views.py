@@ -1,7 +1,7 @@
 from src.tree.views import TreeState
-from typing import Optional
-from dataclasses import dataclass
-from tabulate import tabulate
+from typing import Optional, Any
+from dataclasses import dataclass,field
+from src.tree.serializer import markdown_table, columns
 from enum import Enum
 
 class Browser(Enum):
@@ -23,9 +23,10 @@ class App:
     status:Status
     size:'Size'
     handle: int
+    exe: str=''
     
     def to_row(self):
-        return [self.name, self.depth, self.status.value, self.size.width, self.size.height, self.handle]
+        return [self.name, self.depth, self.status.value, self.size.width, self.size.height, self.handle, self.exe]
 
 @dataclass
 class Size:
@@ -41,16 +42,143 @@ class DesktopState:
     active_app:Optional[App]
     screenshot:bytes|None
     tree_state:TreeState
+    version:int=0
+    screenshot_format:str='png'
+    screenshot_delta:Optional['FrameDelta']=None
+    screenshot_tiles:list[bytes]=field(default_factory=list)
+    screenshot_stats:Optional['ScreenshotStats']=None
 
     def active_app_to_string(self):
         if self.active_app is None:
             return 'No active app found'
-        headers = ["Name", "Depth", "Status", "Width", "Height", "Handle"]
-        return tabulate([self.active_app.to_row()], headers=headers, tablefmt="github")
+        headers = ["Name", "Depth", "Status", "Width", "Height", "Handle", "Executable"]
+        return markdown_table(headers, [self.active_app.to_row()])
+
+    def apps_to_columns(self)->dict[str,list]:
+        keys = ["name", "depth", "status", "width", "height", "handle", "exe"]
+        return columns(keys, [app.to_row() for app in self.apps])
+
+    def to_columns(self)->dict:
+        keys = ["name", "depth", "status", "width", "height", "handle", "exe"]
+        return {
+            'version': self.version,
+            'active_app': dict(zip(keys, self.active_app.to_row())) if self.active_app else None,
+            'apps': self.apps_to_columns(),
+            **self.tree_state.to_columns()
+        }
 
     def apps_to_string(self):
         if not self.apps:
             return 'No apps running in background'
-        headers = ["Name", "Depth", "Status", "Width", "Height", "Handle"]
+        headers = ["Name", "Depth", "Status", "Width", "Height", "Handle", "Executable"]
         rows = [app.to_row() for app in self.apps]
-        return tabulate(rows, headers=headers, tablefmt="github")
\ No newline at end of file
+        return markdown_table(headers, rows)
+
+@dataclass
+class PoolStats:
+    size:int
+    queue_depth:int
+    max_queue_depth:int
+    running:int
+    submitted:int
+    completed:int
+    failed:int
+    mean_wait:float
+    p95_wait:float
+    mean_run:float
+    p95_run:float
+
+    @property
+    def is_saturated(self)->bool:
+        return self.running>=self.size and self.queue_depth>0
+
+    def to_string(self):
+        return f'Workers: {self.running}/{self.size} busy, Queue: {self.queue_depth} (max {self.max_queue_depth}), Wait: {self.mean_wait*1000:.1f}ms (p95 {self.p95_wait*1000:.1f}ms), Run: {self.mean_run*1000:.1f}ms (p95 {self.p95_run*1000:.1f}ms)'
+
+@dataclass(frozen=True)
+class ProcessInfo:
+    pid:int
+    create_time:float
+    name:str
+    path:str
+    is_browser:bool
+
+@dataclass
+class ProcessCacheStats:
+    entries:int
+    hits:int
+    misses:int
+    reused_pids:int
+    failures:int
+
+    @property
+    def hit_rate(self)->float:
+        lookups=self.hits+self.misses
+        return self.hits/lookups if lookups else 0.0
+
+    def to_string(self):
+        return f'Processes: {self.entries} cached, Hits: {self.hits}/{self.hits+self.misses} ({self.hit_rate:.0%}), Reused PIDs: {self.reused_pids}, Failures: {self.failures}'
+
+@dataclass
+class WaitResult:
+    is_met:bool
+    elapsed:float
+    polls:int
+    value:Any=None
+
+    def to_string(self,condition:str)->str:
+        if self.is_met:
+            return f'{condition} after {self.elapsed:.2f} seconds ({self.polls} checks).'
+        return f'Gave up waiting for {condition.lower()} after {self.elapsed:.2f} seconds ({self.polls} checks).'
+
+@dataclass(frozen=True)
+class KeyEvent:
+    code:int # UTF-16 code unit of a unicode event, virtual key code otherwise
+    is_unicode:bool=True
+    is_up:bool=False
+
+@dataclass(frozen=True)
+class PointerEvent:
+    x:int # Absolute coordinates normalized to 0-65535 over the virtual screen
+    y:int
+    flags:int
+    data:int=0
+
+@dataclass
+class ShellResult:
+    stdout:str
+    stderr:str
+    exit_code:int
+    is_timed_out:bool=False
+
+@dataclass
+class ScreenshotStats:
+    capture_time:float=0.0
+    scale_time:float=0.0
+    annotate_time:float=0.0
+    encode_time:float=0.0
+    captured_size:Size|None=None
+    scaled_size:Size|None=None
+    encoded_bytes:int=0
+
+    def to_string(self):
+        captured=self.captured_size.to_string() if self.captured_size else '-'
+        scaled=self.scaled_size.to_string() if self.scaled_size else '-'
+        return f'Capture: {self.capture_time*1000:.1f}ms {captured}, Scale: {self.scale_time*1000:.1f}ms {scaled}, Annotate: {self.annotate_time*1000:.1f}ms, Encode: {self.encode_time*1000:.1f}ms {self.encoded_bytes} bytes'
+
+@dataclass
+class FrameDelta:
+    is_keyframe:bool
+    sequence:int
+    size:Size
+    rects:list[tuple[int,int,int,int]]
+    changed_tiles:int
+    total_tiles:int
+
+    def to_string(self):
+        if self.is_keyframe:
+            return f'Keyframe of {self.size.width}x{self.size.height}.'
+        if not self.rects:
+            return f'Delta {self.sequence} since the keyframe: no changes.'
+        regions=', '.join(f'({left},{top},{right-left},{bottom-top})' for left,top,right,bottom in self.rects)
+        return f'Delta {self.sequence} since the keyframe: {self.changed_tiles}/{self.total_tiles} tiles changed, images follow for the regions (x,y,width,height) {regions}.'
@@ -0,0 +1,98 @@
+from src.desktop.views import WaitResult
+from uiautomation import GetForegroundWindow
+from PIL.Image import Image
+from time import sleep, perf_counter
+from typing import Any, Callable
+import win32event
+import win32api
+import win32gui
+import win32con
+
+Check=Callable[[],Any]
+
+def wait_until(check:Check,timeout:float,interval:float=0.02,max_interval:float=0.25,backoff:float=1.5)->WaitResult:
+    '''
+    Polls the check until it returns a truthy value or the timeout passes. The pause between two polls starts at
+    interval and grows by backoff up to max_interval, so a condition that holds quickly costs one short pause.
+    '''
+    start=perf_counter()
+    polls=0
+    while True:
+        polls+=1
+        value=check()
+        elapsed=perf_counter()-start
+        if value:
+            return WaitResult(is_met=True,elapsed=elapsed,polls=polls,value=value)
+        if elapsed>=timeout:
+            return WaitResult(is_met=False,elapsed=elapsed,polls=polls)
+        sleep(min(interval,timeout-elapsed))
+        interval=min(interval*backoff,max_interval)
+
+def foreground_changed(handle:int)->Check:
+    '''Holds once another window than the given one is in the foreground, the value is its handle.'''
+    def check()->int:
+        foreground=GetForegroundWindow()
+        return foreground if foreground and foreground!=handle else 0
+    return check
+
+def foreground_is(handle:int)->Check:
+    return lambda: GetForegroundWindow()==handle
+
+def get_window_titles()->dict[str,int]:
+    '''Titles of the visible top level windows and their handle, the first window wins a shared title.'''
+    windows={}
+    def collect(handle:int,_)->bool:
+        if win32gui.IsWindowVisible(handle):
+            title=win32gui.GetWindowText(handle)
+            if title:
+                windows.setdefault(title,handle)
+        return True
+    win32gui.EnumWindows(collect,None)
+    return windows
+
+def window_appears(name:str,score_cutoff:int=60)->Check:
+    '''Holds once a visible window title matches the name as is_app_running matches it, the value is its handle.'''
+    from src.desktop.matcher import NameMatcher
+    matcher=NameMatcher()
+    def check()->int:
+        windows=get_window_titles()
+        matcher.update(windows)
+        match=matcher.extract_one(name,score_cutoff=score_cutoff)
+        return windows[match[0]] if match is not None else 0
+    return check
+
+def input_idle(pid:int)->Check:
+    '''
+    Holds once the process waits for user input with none pending. Processes without a message queue, and the ones
+    that can not be opened, count as idle.
+    '''
+    try:
+        process=win32api.OpenProcess(win32con.PROCESS_QUERY_INFORMATION|win32con.SYNCHRONIZE,False,pid)
+    except Exception:
+        return lambda: True
+    def check()->bool:
+        try:
+            return win32event.WaitForInputIdle(process,0)!=win32event.WAIT_TIMEOUT
+        except Exception:
+            return True
+    return check
+
+def region_settled(grab:Callable[[],Image],frames:int=2,tolerance:float=1.0,size:int=96)->Check:
+    '''
+    Holds once the grabbed region stayed the same over the given number of consecutive grabs. Frames are compared
+    downscaled in grey, a mean difference within the tolerance (out of 255) counts as the same, which lets a blinking
+    caret through.
+    '''
+    import numpy as np
+    state={'previous':None,'stable':0}
+    def check()->bool:
+        image=grab().convert('L')
+        image.thumbnail((size,size))
+        frame=np.asarray(image,dtype=np.int16)
+        previous,state['previous']=state['previous'],frame
+        if previous is not None and previous.shape==frame.shape and np.abs(frame-previous).mean()<=tolerance:
+            state['stable']+=1
+        else:
+            state['stable']=0
+        return state['stable']>=frames-1
+    return check
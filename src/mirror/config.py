@@ -0,0 +1,29 @@
+# Upper bound on how many ancestors are resolved for an event raised on an element that is not mirrored yet
+MAX_ANCESTOR_LOOKUPS=32
+
+# Pending events above this count are dropped in favour of re-walking the affected apps
+MAX_PENDING_EVENTS=5000
+
+# Seconds and received events after which the mirrored apps are walked again in full, so a missed event can not keep
+# the mirror stale (None for no limit)
+RESYNC_INTERVAL=30.0
+RESYNC_EVENTS=2000
+
+# Properties that change how an element is classified by the tree traversal
+WATCHED_PROPERTY_IDS=[
+    30001, # BoundingRectangle
+    30005, # Name
+    30010, # IsEnabled
+    30022, # IsOffscreen
+    30045, # Value.Value
+    30093, # LegacyIAccessible.Value
+    30053, # Scroll.HorizontalScrollPercent
+    30055, # Scroll.VerticalScrollPercent
+]
+
+# Properties that move every element below the one raising them, their events rebuild the whole subtree
+SUBTREE_PROPERTY_IDS=frozenset([
+    30001, # BoundingRectangle
+    30053, # Scroll.HorizontalScrollPercent
+    30055, # Scroll.VerticalScrollPercent
+])
@@ -0,0 +1,357 @@
+from src.tree.views import TraversalResult, TraversalNode, TraversalBudget
+from src.mirror.config import MAX_ANCESTOR_LOOKUPS, MAX_PENDING_EVENTS, SUBTREE_PROPERTY_IDS, RESYNC_INTERVAL, RESYNC_EVENTS
+from src.tree.config import THREAD_MAX_RETRIES
+from src.mirror.views import EventType, UIEvent, MirrorStats
+from typing import Any, Callable, Iterable, TYPE_CHECKING
+from concurrent.futures import Executor
+from time import perf_counter
+from threading import Lock
+import sys
+
+if TYPE_CHECKING:
+    from src.tree.service import Tree
+
+class EventSource:
+    '''
+    Delivers accessibility events to a subscriber. The mirror asks the source to watch the app windows it mirrors,
+    subclasses hook these calls up to a real event provider.
+    '''
+    def __init__(self):
+        self.callback:Callable[[UIEvent],None]|None=None
+
+    def subscribe(self,callback:Callable[[UIEvent],None]):
+        self.callback=callback
+
+    def emit(self,event:UIEvent):
+        if self.callback is not None:
+            self.callback(event)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def watch(self,element:Any):
+        pass
+
+    def unwatch(self,element:Any):
+        pass
+
+class ScriptedEventSource(EventSource):
+    '''Replays a prepared sequence of events, used to drive the mirror without a live desktop.'''
+    def __init__(self):
+        super().__init__()
+        self.watched:list[Any]=[]
+
+    def watch(self,element:Any):
+        self.watched.append(element)
+
+    def unwatch(self,element:Any):
+        if element in self.watched:
+            self.watched.remove(element)
+
+    def play(self,events:Iterable[UIEvent]):
+        for event in events:
+            self.emit(event)
+
+class TreeMirror:
+    '''
+    Long-lived copy of the traversal results of the walked apps. Every element keeps the nodes it produced on its own,
+    so events only re-walk the subtree (structure changes) or the element (property and focus changes) they point at.
+    Every resync_interval seconds or resync_events events the apps are walked again in full, which bounds how long an
+    event that never arrived leaves the mirror wrong.
+    '''
+    def __init__(self,source:EventSource,resync_interval:float|None=RESYNC_INTERVAL,resync_events:int|None=RESYNC_EVENTS):
+        self.tree:'Tree|None'=None
+        self.budget:TraversalBudget|None=None
+        self.executor:Executor|None=None
+        self.partial_roots:set[TraversalNode]=set()
+        self.source=source
+        self.source.subscribe(self.on_event)
+        self.roots:dict[tuple[int,...],TraversalNode]={}
+        self.nodes:dict[tuple[int,...],TraversalNode]={}
+        self.pending:list[UIEvent]=[]
+        self.focused:TraversalNode|None=None
+        self.stats=MirrorStats()
+        self.resync_interval=resync_interval
+        self.resync_events=resync_events
+        self.synced_at=perf_counter()
+        self.synced_events=0
+        self.is_running=False
+        self.pending_lock=Lock()
+        self.lock=Lock()
+
+    def start(self):
+        self.source.start()
+        self.is_running=True
+
+    def stop(self):
+        self.is_running=False
+        with self.lock:
+            for root in self.roots.values():
+                self.source.unwatch(root.element)
+            self.roots.clear()
+            self.nodes.clear()
+            self.focused=None
+        self.source.stop()
+
+    def on_event(self,event:UIEvent):
+        with self.pending_lock:
+            self.stats.events_received+=1
+            self.synced_events+=1
+            self.pending.append(event)
+
+    def is_resync_due(self)->bool:
+        if not self.roots:
+            return False
+        if self.resync_interval is not None and perf_counter()-self.synced_at>=self.resync_interval:
+            return True
+        return self.resync_events is not None and self.synced_events>=self.resync_events
+
+    def get_nodes(self,tree:'Tree',apps:list[Any],budget:TraversalBudget,executor:Executor|None=None):
+        with self.lock:
+            # Elements are walked and patched by the tree, within the budget and on the pool of the calling snapshot
+            self.tree=tree
+            self.budget=budget
+            self.executor=executor
+            with self.pending_lock:
+                events,self.pending=self.pending,[]
+            if len(events)>MAX_PENDING_EVENTS:
+                # Patching would cost more than walking the apps again
+                self.stats.events_ignored+=len(events)
+                self.drop_roots(list(self.roots))
+                events=[]
+            elif self.is_resync_due():
+                self.stats.resyncs+=1
+                self.stats.events_coalesced+=len(events)
+                self.drop_roots(list(self.roots))
+                events=[]
+            if not self.roots:
+                # Every app is walked afresh below
+                with self.pending_lock:
+                    self.synced_at,self.synced_events=perf_counter(),len(self.pending)
+            roots:dict[tuple[int,...],TraversalNode]={}
+            fresh_roots=set()
+            ordered_roots:list[tuple[tuple[int,...],TraversalNode]]=[]
+            self.partial_roots=set()
+            runtime_ids=[]
+            for app in apps:
+                try:
+                    runtime_ids.append(self.tree.get_runtime_id(app))
+                except Exception as ex:
+                    # Without its id the app cannot be found again, it is walked for this snapshot only
+                    print(f"Error: {ex}",file=sys.stderr)
+                    runtime_ids.append(None)
+            walked_roots=self.walk_apps([app for app,runtime_id in zip(apps,runtime_ids) if runtime_id not in self.roots])
+            for app,runtime_id in zip(apps,runtime_ids):
+                root=self.roots.get(runtime_id) if runtime_id is not None else None
+                if root is None:
+                    root=walked_roots.pop(0)
+                    if root is None:
+                        continue
+                    self.stats.apps_walked+=1
+                    if runtime_id is not None and not root.is_truncated:
+                        self.index(root)
+                        self.source.watch(app)
+                    fresh_roots.add(root)
+                ordered_roots.append((runtime_id,root))
+                if root.is_truncated or runtime_id is None:
+                    # Used for this snapshot only, the app is walked again next time
+                    continue
+                roots[runtime_id]=root
+            self.drop_roots([runtime_id for runtime_id in self.roots if runtime_id not in roots])
+            self.roots=roots
+            self.apply_events(events,fresh_roots)
+            interactive_nodes,informative_nodes,scrollable_nodes=[],[],[]
+            for runtime_id,root in ordered_roots:
+                if runtime_id is not None and not root.is_truncated:
+                    # Roots are replaced when a structure change reaches the app window itself
+                    root=self.roots.get(runtime_id)
+                if root is None:
+                    continue
+                result=TraversalResult()
+                root.collect(result)
+                element_nodes,text_nodes,scroll_nodes=result.to_tuple()
+                interactive_nodes.extend(element_nodes)
+                informative_nodes.extend(text_nodes)
+                scrollable_nodes.extend(scroll_nodes)
+            self.drop_roots([runtime_id for runtime_id,root in self.roots.items() if root in self.partial_roots])
+            return interactive_nodes,informative_nodes,scrollable_nodes
+
+    def walk_apps(self,apps:list[Any])->list[TraversalNode|None]:
+        '''Walks the apps side by side on the executor, as the tree walks them without a mirror.'''
+        if self.executor is None or len(apps)<2:
+            return [self.walk_app(app) for app in apps]
+        futures=[self.executor.submit(self.walk_app,app) for app in apps]
+        return [future.result() for future in futures]
+
+    def walk_app(self,app:Any)->TraversalNode|None:
+        '''Walks the app window, retrying a failed walk like the tree does. Returns None once the app is given up.'''
+        for attempt in range(1,THREAD_MAX_RETRIES+1):
+            started_at=perf_counter()
+            try:
+                root=self.tree.get_mirror_node(app,self.tree.get_context(app),budget=self.budget,executor=self.executor)
+                break
+            except Exception as ex:
+                is_retried=attempt<THREAD_MAX_RETRIES
+                self.budget.record_failure(self.get_app_name(app),ex,perf_counter()-started_at,is_retried=is_retried)
+                print(f"Error in processing node {self.get_app_name(app)}, retry attempt {attempt}\nError: {ex}",file=sys.stderr)
+        else:
+            print(f"Task failed completely for {self.get_app_name(app)} after {THREAD_MAX_RETRIES} retries",file=sys.stderr)
+            return None
+        return root
+
+    def get_app_name(self,app:Any)->str:
+        try:
+            return self.tree.get_app_name(app)
+        except Exception:
+            return ''
+
+    def drop_roots(self,runtime_ids:list[tuple[int,...]]):
+        for runtime_id in runtime_ids:
+            root=self.roots.pop(runtime_id)
+            self.unindex(root)
+            self.source.unwatch(root.element)
+
+    def index(self,node:TraversalNode):
+        for mirror_node in node.walk():
+            if mirror_node.runtime_id is None:
+                try:
+                    mirror_node.runtime_id=self.tree.get_runtime_id(mirror_node.element)
+                except Exception:
+                    continue
+            self.nodes[mirror_node.runtime_id]=mirror_node
+
+    def unindex(self,node:TraversalNode):
+        for mirror_node in node.walk():
+            if self.nodes.get(mirror_node.runtime_id) is mirror_node:
+                del self.nodes[mirror_node.runtime_id]
+            if self.focused is mirror_node:
+                self.focused=None
+
+    def locate(self,event:UIEvent)->tuple[TraversalNode|None,bool]:
+        '''Finds the mirrored node of the event. The flag is True when only an ancestor of the element is mirrored.'''
+        node=self.nodes.get(event.runtime_id)
+        if node is not None:
+            return node,False
+        element=event.element
+        for _ in range(MAX_ANCESTOR_LOOKUPS):
+            if element is None:
+                break
+            try:
+                element=self.tree.get_parent(element)
+                if element is None:
+                    break
+                node=self.nodes.get(self.tree.get_runtime_id(element))
+            except Exception:
+                break
+            if node is not None:
+                return node,True
+        return None,False
+
+    def get_root(self,node:TraversalNode)->TraversalNode:
+        while node.parent is not None:
+            node=node.parent
+        return node
+
+    def get_depth(self,node:TraversalNode)->int:
+        depth=0
+        while node.parent is not None:
+            node=node.parent
+            depth+=1
+        return depth
+
+    def apply_events(self,events:list[UIEvent],fresh_roots:set[TraversalNode]):
+        structure_nodes:dict[TraversalNode,None]={}
+        revisit_nodes:dict[TraversalNode,None]={}
+        for event in events:
+            node,is_ancestor=self.locate(event)
+            if node is None or self.get_root(node) not in self.roots.values():
+                self.stats.events_ignored+=1
+                continue
+            if self.get_root(node) in fresh_roots:
+                # The app was walked after the event was raised
+                self.stats.events_coalesced+=1
+                continue
+            if event.type==EventType.STRUCTURE_CHANGED or is_ancestor:
+                structure_nodes[node]=None
+            elif event.type==EventType.PROPERTY_CHANGED and event.property_id in SUBTREE_PROPERTY_IDS:
+                # A move, resize or scroll shifts the boxes of every element below, not only this one
+                structure_nodes[node]=None
+            elif event.type==EventType.PROPERTY_CHANGED:
+                revisit_nodes[node]=None
+                if node.parent is not None and node.parent.context.is_dom:
+                    # The dom corrections of the parent depend on its first child
+                    revisit_nodes[node.parent]=None
+            elif event.type==EventType.FOCUS_CHANGED:
+                if self.focused is not None:
+                    revisit_nodes[self.focused]=None
+                revisit_nodes[node]=None
+                self.focused=node
+        rebuilt_nodes:set[TraversalNode]=set()
+        # Shallow subtrees first so that nested changes are covered by a single rebuild
+        for node in sorted(structure_nodes,key=self.get_depth):
+            if node.has_ancestor_in(rebuilt_nodes):
+                self.stats.events_coalesced+=1
+                continue
+            self.rebuild(node)
+            rebuilt_nodes.add(node)
+        for node in revisit_nodes:
+            if node in rebuilt_nodes or node.has_ancestor_in(rebuilt_nodes):
+                self.stats.events_coalesced+=1
+                continue
+            if self.revisit(node):
+                rebuilt_nodes.add(node)
+
+    def rebuild(self,node:TraversalNode)->TraversalNode|None:
+        parent=node.parent
+        context,reset=node.context,node.reset
+        try:
+            if parent is not None:
+                context,reset=self.tree.get_child_context(node.element,parent.context)
+            new_node=self.tree.get_mirror_node(node.element,context,reset,budget=self.budget,executor=self.executor)
+        except Exception as ex:
+            # The element is gone, its siblings will be reported by the structure event of the parent
+            print(f"Error: {ex}",file=sys.stderr)
+            new_node=None
+        self.unindex(node)
+        if new_node is not None and new_node.is_truncated:
+            # A partial subtree cannot be patched later, the whole app is walked again next time
+            self.partial_roots.add(self.get_root(node))
+        if parent is None:
+            if new_node is None:
+                self.roots.pop(node.runtime_id,None)
+                self.source.unwatch(node.element)
+            else:
+                new_node.runtime_id=node.runtime_id
+                self.roots[node.runtime_id]=new_node
+        else:
+            position=parent.children.index(node)
+            if new_node is None:
+                parent.children.pop(position)
+            else:
+                new_node.parent=parent
+                parent.children[position]=new_node
+        if new_node is not None:
+            self.index(new_node)
+            self.stats.nodes_rebuilt+=sum(1 for _ in new_node.walk())
+        self.stats.subtrees_rebuilt+=1
+        return new_node
+
+    def revisit(self,node:TraversalNode)->bool:
+        '''Classifies the element again. Returns True when its subtree had to be rebuilt instead.'''
+        result=TraversalResult()
+        try:
+            node.element=self.tree.refresh(node.element,node.context)
+            is_visited=self.tree.visit_node(node.element,node.context,result)
+        except Exception:
+            self.rebuild(node)
+            return True
+        if is_visited==node.is_pruned:
+            # The element moved on or off screen so its children appear or vanish
+            self.rebuild(node)
+            return True
+        node.result=result
+        self.stats.nodes_revisited+=1
+        return False
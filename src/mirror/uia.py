@@ -0,0 +1,144 @@
+from uiautomation import Control, TreeScope
+from src.mirror.views import EventType, UIEvent
+from src.mirror.config import WATCHED_PROPERTY_IDS
+from src.mirror.service import EventSource
+from concurrent.futures import Future
+from threading import Thread
+from queue import Queue
+import comtypes.client
+import comtypes
+import sys
+
+class UIAutomationEventSource(EventSource):
+    '''
+    Forwards the structure, property and focus events raised by UI Automation for the watched app windows. Handlers
+    are added and removed on one thread of its own in the multithreaded apartment, where UI Automation delivers events
+    on its own threads. The worker threads are single threaded apartments without a message loop, events for handlers
+    added there are not reliably delivered.
+    '''
+    def __init__(self,start_timeout:float=10.0):
+        super().__init__()
+        self.automation=None
+        self.handlers={}
+        self.focus_handler=None
+        self.start_timeout=start_timeout
+        self.calls:Queue[tuple|None]=Queue()
+        self.thread:Thread|None=None
+
+    def start(self):
+        started=Future()
+        self.thread=Thread(target=self.run,args=(started,),name='uia-events',daemon=True)
+        self.thread.start()
+        try:
+            started.result(timeout=self.start_timeout)
+        except Exception:
+            self.stop()
+            raise
+
+    def stop(self):
+        if self.thread is None:
+            return None
+        thread,self.thread=self.thread,None
+        self.calls.put(None)
+        thread.join(timeout=self.start_timeout)
+
+    def run(self,started:Future):
+        comtypes.CoInitializeEx(comtypes.COINIT_MULTITHREADED)
+        try:
+            try:
+                self.connect()
+            except Exception as ex:
+                started.set_exception(ex)
+                return None
+            started.set_result(None)
+            while (call:=self.calls.get()) is not None:
+                fn,args,future=call
+                try:
+                    future.set_result(fn(*args))
+                except Exception as ex:
+                    future.set_exception(ex)
+            self.remove_handlers()
+        finally:
+            self.automation=None
+            comtypes.CoUninitialize()
+
+    def call(self,fn,*args):
+        '''Runs the function on the event thread and returns its result.'''
+        if self.thread is None:
+            return None
+        future=Future()
+        self.calls.put((fn,args,future))
+        return future.result()
+
+    def connect(self):
+        '''Creates the UI Automation client of this thread and starts forwarding focus changes.'''
+        core=comtypes.client.GetModule('UIAutomationCore.dll')
+        self.automation=comtypes.client.CreateObject(core.CUIAutomation,interface=core.IUIAutomation)
+        source=self
+
+        class StructureChangedHandler(comtypes.COMObject):
+            _com_interfaces_=[core.IUIAutomationStructureChangedEventHandler]
+            def HandleStructureChangedEvent(self,sender,change_type,runtime_id):
+                source.forward(EventType.STRUCTURE_CHANGED,sender)
+
+        class PropertyChangedHandler(comtypes.COMObject):
+            _com_interfaces_=[core.IUIAutomationPropertyChangedEventHandler]
+            def HandlePropertyChangedEvent(self,sender,property_id,new_value):
+                source.forward(EventType.PROPERTY_CHANGED,sender,property_id)
+
+        class FocusChangedHandler(comtypes.COMObject):
+            _com_interfaces_=[core.IUIAutomationFocusChangedEventHandler]
+            def HandleFocusChangedEvent(self,sender):
+                source.forward(EventType.FOCUS_CHANGED,sender)
+
+        self.structure_handler_type=StructureChangedHandler
+        self.property_handler_type=PropertyChangedHandler
+        self.focus_handler=FocusChangedHandler()
+        self.automation.AddFocusChangedEventHandler(None,self.focus_handler)
+
+    def remove_handlers(self):
+        try:
+            self.automation.RemoveAllEventHandlers()
+        except Exception as ex:
+            print(f"Error: {ex}",file=sys.stderr)
+        self.handlers.clear()
+        self.focus_handler=None
+
+    def forward(self,event_type:EventType,sender,property_id:int|None=None):
+        try:
+            element=Control.CreateControlFromElement(sender)
+            if element is None:
+                return None
+            self.emit(UIEvent(type=event_type,runtime_id=tuple(element.GetRuntimeId()),element=element,property_id=property_id))
+        except Exception:
+            # The sender can already be gone when the event is delivered
+            return None
+
+    def watch(self,element:Control):
+        self.call(self.add_handlers,element)
+
+    def unwatch(self,element:Control):
+        self.call(self.remove_element_handlers,element)
+
+    def add_handlers(self,element:Control):
+        key=tuple(element.GetRuntimeId())
+        structure_handler=self.structure_handler_type()
+        property_handler=self.property_handler_type()
+        self.automation.AddStructureChangedEventHandler(element.Element,TreeScope.Subtree,None,structure_handler)
+        self.automation.AddPropertyChangedEventHandler(element.Element,TreeScope.Subtree,None,property_handler,WATCHED_PROPERTY_IDS)
+        self.handlers[key]=(element,structure_handler,property_handler)
+
+    def remove_element_handlers(self,element:Control):
+        try:
+            key=tuple(element.GetRuntimeId())
+        except Exception:
+            return None
+        entry=self.handlers.pop(key,None)
+        if entry is None:
+            return None
+        element,structure_handler,property_handler=entry
+        try:
+            self.automation.RemoveStructureChangedEventHandler(element.Element,structure_handler)
+            self.automation.RemovePropertyChangedEventHandler(element.Element,property_handler)
+        except Exception as ex:
+            print(f"Error: {ex}",file=sys.stderr)
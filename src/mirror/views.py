@@ -0,0 +1,26 @@
+from dataclasses import dataclass,field
+from typing import Any
+from enum import Enum
+
+class EventType(Enum):
+    STRUCTURE_CHANGED='StructureChanged'
+    PROPERTY_CHANGED='PropertyChanged'
+    FOCUS_CHANGED='FocusChanged'
+
+@dataclass
+class UIEvent:
+    type:EventType
+    runtime_id:tuple[int,...]
+    element:Any=None
+    property_id:int|None=None
+
+@dataclass
+class MirrorStats:
+    events_received:int=0
+    events_coalesced:int=0
+    events_ignored:int=0
+    subtrees_rebuilt:int=0
+    nodes_rebuilt:int=0
+    nodes_revisited:int=0
+    apps_walked:int=0
+    resyncs:int=0
@@ -0,0 +1,118 @@
+from PIL import Image, ImageFont, ImageDraw
+from functools import lru_cache
+import colorsys
+
+LABEL_PADDING = 2
+
+@lru_cache(maxsize=8)
+def get_font(size:int)->ImageFont.FreeTypeFont|ImageFont.ImageFont:
+    try:
+        return ImageFont.truetype('arial.ttf', size)
+    except IOError:
+        return ImageFont.load_default()
+
+@lru_cache(maxsize=8)
+def get_glyph_widths(size:int)->dict[str,float]:
+    '''Advance widths of the digits, labels are element indices so these cover almost every label.'''
+    font=get_font(size)
+    return {digit:font.getlength(digit) for digit in '0123456789'}
+
+@lru_cache(maxsize=8)
+def get_glyph_masks(size:int)->dict[str,Image.Image]:
+    '''Rendered digits, rasterizing every label through the font costs far more than pasting these.'''
+    font=get_font(size)
+    masks={}
+    for digit,width in get_glyph_widths(size).items():
+        mask=Image.new('L',(int(width+0.5) or 1,size+LABEL_PADDING))
+        ImageDraw.Draw(mask).text((0,0),digit,fill=255,font=font)
+        masks[digit]=mask
+    return masks
+
+def get_label_width(label:str,size:int)->int:
+    widths=get_glyph_widths(size)
+    try:
+        width=sum(widths[character] for character in label)
+    except KeyError:
+        width=get_font(size).getlength(label)
+    return int(width+0.5)+2*LABEL_PADDING
+
+@lru_cache(maxsize=1024)
+def get_color(index:int)->tuple[int,int,int]:
+    '''Stable color per label, the hue walks by the golden ratio so neighbouring labels stay apart.'''
+    hue=(index*0.618033988749895)%1.0
+    red,green,blue=colorsys.hsv_to_rgb(hue,0.9,0.8)
+    return (int(red*255),int(green*255),int(blue*255))
+
+class LabelLayout:
+    '''
+    Places one label per box, trying a few spots around the box corner and keeping the first one that does not
+    cover an already placed label. Placed labels are kept in a coarse grid so every check only looks at neighbours.
+    '''
+    def __init__(self,width:int,height:int,cell_size:int=64):
+        self.width=width
+        self.height=height
+        self.cell_size=cell_size
+        self.cells:dict[tuple[int,int],list[tuple[int,int,int,int]]]={}
+
+    def clamp(self,left:int,top:int,width:int,height:int)->tuple[int,int,int,int]:
+        left=min(max(left,0),max(self.width-width,0))
+        top=min(max(top,0),max(self.height-height,0))
+        return (left,top,left+width,top+height)
+
+    def cells_of(self,rect:tuple[int,int,int,int]):
+        size=self.cell_size
+        left,top,right,bottom=rect
+        for column in range(left//size,(right-1)//size+1):
+            for row in range(top//size,(bottom-1)//size+1):
+                yield (column,row)
+
+    def collides(self,rect:tuple[int,int,int,int])->bool:
+        left,top,right,bottom=rect
+        for cell in self.cells_of(rect):
+            for other_left,other_top,other_right,other_bottom in self.cells.get(cell,()):
+                if left<other_right and other_left<right and top<other_bottom and other_top<bottom:
+                    return True
+        return False
+
+    def place(self,box:tuple[int,int,int,int],width:int,height:int)->tuple[int,int,int,int]:
+        left,top,right,bottom=box
+        candidates=(
+            (right-width,top-height),  # above, right aligned
+            (left,top-height),         # above, left aligned
+            (right-width,top),         # inside, top right corner
+            (right-width,bottom),      # below, right aligned
+            (left,bottom),             # below, left aligned
+            (right,top),               # right of the box
+            (left-width,top),          # left of the box
+        )
+        rects=[self.clamp(x,y,width,height) for x,y in candidates]
+        rect=next((rect for rect in rects if not self.collides(rect)),rects[0])
+        for cell in self.cells_of(rect):
+            self.cells.setdefault(cell,[]).append(rect)
+        return rect
+
+def annotate(image:Image.Image,boxes:list[tuple[int,int,int,int]],labels:list[int]|None=None,font_size:int=12)->Image.Image:
+    '''Draws the boxes with their label (the index by default) onto the image, boxes first and all the labels on top.'''
+    font=get_font(font_size)
+    label_height=font_size+2*LABEL_PADDING
+    layout=LabelLayout(image.width,image.height)
+    labels=range(len(boxes)) if labels is None else labels
+    placed_labels=[]
+    for label,box in zip(labels,boxes):
+        text=str(label)
+        placed_labels.append((text,layout.place(box,get_label_width(text,font_size),label_height),get_color(label)))
+    draw=ImageDraw.Draw(image)
+    for label,box in zip(labels,boxes):
+        draw.rectangle(box,outline=get_color(label),width=2)
+    widths,masks=get_glyph_widths(font_size),get_glyph_masks(font_size)
+    for text,rect,color in placed_labels:
+        draw.rectangle(rect,fill=color)
+        x,y=rect[0]+LABEL_PADDING,rect[1]+LABEL_PADDING
+        if not text.isdigit():
+            draw.text((x,y),text,fill=(255,255,255),font=font)
+            continue
+        for digit in text:
+            mask=masks[digit]
+            image.paste((255,255,255),(int(x+0.5),y,int(x+0.5)+mask.width,y+mask.height),mask)
+            x+=widths[digit]
+    return image
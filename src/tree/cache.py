@@ -0,0 +1,219 @@
+from uiautomation import Control, PropertyId, ControlTypeNames, Rect, TreeScope
+from uiautomation.uiautomation import _AutomationClient
+from threading import Lock
+from typing import Any
+
+PREFETCH_PROPERTY_IDS=[
+    PropertyId.RuntimeIdProperty,
+    PropertyId.ControlTypeProperty,
+    PropertyId.LocalizedControlTypeProperty,
+    PropertyId.NameProperty,
+    PropertyId.ClassNameProperty,
+    PropertyId.AcceleratorKeyProperty,
+    PropertyId.BoundingRectangleProperty,
+    PropertyId.IsOffscreenProperty,
+    PropertyId.IsControlElementProperty,
+    PropertyId.IsEnabledProperty,
+    PropertyId.IsKeyboardFocusableProperty,
+    PropertyId.HasKeyboardFocusProperty,
+    PropertyId.ProcessIdProperty,
+    PropertyId.NativeWindowHandleProperty,
+    PropertyId.IsScrollPatternAvailableProperty,
+    PropertyId.ScrollHorizontallyScrollableProperty,
+    PropertyId.ScrollVerticallyScrollableProperty,
+    PropertyId.ScrollHorizontalScrollPercentProperty,
+    PropertyId.ScrollVerticalScrollPercentProperty,
+    PropertyId.IsLegacyIAccessiblePatternAvailableProperty,
+    PropertyId.LegacyIAccessibleValueProperty,
+    PropertyId.LegacyIAccessibleDefaultActionProperty,
+]
+
+class PropertyCounter:
+    '''Counts the cross-process reads issued while walking the tree.'''
+    def __init__(self):
+        self.value=0
+        self.lock=Lock()
+
+    def add(self,count:int=1):
+        with self.lock:
+            self.value+=count
+
+class CountingControl:
+    '''Wraps a live control, or one of its patterns, and counts every property read and method call on it.'''
+    __slots__=('target','counter')
+
+    def __init__(self,target:Any,counter:PropertyCounter):
+        self.target=target
+        self.counter=counter
+
+    def __getattr__(self,name:str):
+        value=getattr(self.target,name)
+        if callable(value):
+            def call(*args,**kwargs):
+                self.counter.add()
+                return self.wrap(value(*args,**kwargs))
+            return call
+        self.counter.add()
+        return self.wrap(value)
+
+    def wrap(self,value:Any):
+        if isinstance(value,list):
+            return [self.wrap(item) for item in value]
+        if isinstance(value,Control) or type(value).__name__.endswith('Pattern'):
+            return CountingControl(value,self.counter)
+        return value
+
+class CachedScrollPattern:
+    __slots__=('HorizontallyScrollable','VerticallyScrollable','HorizontalScrollPercent','VerticalScrollPercent')
+
+    def __init__(self,horizontally_scrollable:bool,vertically_scrollable:bool,horizontal_scroll_percent:float,vertical_scroll_percent:float):
+        self.HorizontallyScrollable=horizontally_scrollable
+        self.VerticallyScrollable=vertically_scrollable
+        self.HorizontalScrollPercent=horizontal_scroll_percent
+        self.VerticalScrollPercent=vertical_scroll_percent
+
+class CachedLegacyIAccessiblePattern:
+    __slots__=('Value','DefaultAction')
+
+    def __init__(self,value:str,default_action:str):
+        self.Value=value
+        self.DefaultAction=default_action
+
+class CachedControl:
+    '''
+    Read-only view of an element whose properties, pattern properties and children were fetched by a single cache request.
+    Exposes the subset of the Control API used by the tree traversal.
+    '''
+    def __init__(self,element:Any,counter:PropertyCounter,parent:'CachedControl|None'=None,is_subtree_cached:bool=True):
+        self.Element=element
+        self.counter=counter
+        self.parent=parent
+        self.is_subtree_cached=is_subtree_cached
+        self.children:list['CachedControl']|None=None
+
+    def get(self,property_id:int,default:Any=None)->Any:
+        try:
+            value=self.Element.GetCachedPropertyValue(property_id)
+        except Exception:
+            return default
+        # Unsupported properties come back as the reserved COM object instead of a value
+        if value is None or not isinstance(value,(str,int,float,bool,tuple)):
+            return default
+        return value
+
+    @property
+    def ControlType(self)->int:
+        return self.get(PropertyId.ControlTypeProperty,0)
+
+    @property
+    def ControlTypeName(self)->str:
+        return ControlTypeNames.get(self.ControlType,'Control')
+
+    @property
+    def LocalizedControlType(self)->str:
+        return self.get(PropertyId.LocalizedControlTypeProperty,'')
+
+    @property
+    def Name(self)->str:
+        return self.get(PropertyId.NameProperty,'')
+
+    @property
+    def ClassName(self)->str:
+        return self.get(PropertyId.ClassNameProperty,'')
+
+    @property
+    def AcceleratorKey(self)->str:
+        return self.get(PropertyId.AcceleratorKeyProperty,'')
+
+    @property
+    def BoundingRectangle(self)->Rect:
+        rect=self.Element.CachedBoundingRectangle
+        return Rect(rect.left,rect.top,rect.right,rect.bottom)
+
+    @property
+    def IsOffscreen(self)->bool:
+        return bool(self.get(PropertyId.IsOffscreenProperty,False))
+
+    @property
+    def IsControlElement(self)->bool:
+        return bool(self.get(PropertyId.IsControlElementProperty,False))
+
+    @property
+    def IsEnabled(self)->bool:
+        return bool(self.get(PropertyId.IsEnabledProperty,False))
+
+    @property
+    def IsKeyboardFocusable(self)->bool:
+        return bool(self.get(PropertyId.IsKeyboardFocusableProperty,False))
+
+    @property
+    def HasKeyboardFocus(self)->bool:
+        return bool(self.get(PropertyId.HasKeyboardFocusProperty,False))
+
+    @property
+    def ProcessId(self)->int:
+        return self.get(PropertyId.ProcessIdProperty,0)
+
+    @property
+    def NativeWindowHandle(self)->int:
+        return self.get(PropertyId.NativeWindowHandleProperty,0)
+
+    def GetRuntimeId(self)->list[int]:
+        return list(self.get(PropertyId.RuntimeIdProperty,()))
+
+    def GetScrollPattern(self)->CachedScrollPattern|None:
+        if not self.get(PropertyId.IsScrollPatternAvailableProperty,False):
+            return None
+        return CachedScrollPattern(
+            horizontally_scrollable=bool(self.get(PropertyId.ScrollHorizontallyScrollableProperty,False)),
+            vertically_scrollable=bool(self.get(PropertyId.ScrollVerticallyScrollableProperty,False)),
+            horizontal_scroll_percent=self.get(PropertyId.ScrollHorizontalScrollPercentProperty,0),
+            vertical_scroll_percent=self.get(PropertyId.ScrollVerticalScrollPercentProperty,0)
+        )
+
+    def GetLegacyIAccessiblePattern(self)->CachedLegacyIAccessiblePattern|None:
+        if not self.get(PropertyId.IsLegacyIAccessiblePatternAvailableProperty,False):
+            return None
+        return CachedLegacyIAccessiblePattern(
+            value=self.get(PropertyId.LegacyIAccessibleValueProperty),
+            default_action=self.get(PropertyId.LegacyIAccessibleDefaultActionProperty,'')
+        )
+
+    def GetChildren(self)->list['CachedControl']:
+        if self.children is None:
+            self.children=[]
+            try:
+                elements=self.Element.GetCachedChildren()
+            except Exception:
+                elements=None
+            if elements is not None:
+                self.children=[CachedControl(elements.GetElement(index),self.counter,parent=self,is_subtree_cached=self.is_subtree_cached) for index in range(elements.Length)]
+        return self.children
+
+    def GetFirstChildControl(self)->'CachedControl|None':
+        children=self.GetChildren()
+        return children[0] if children else None
+
+    def GetParentControl(self)->Control|None:
+        if self.parent is not None:
+            return self.parent
+        # The parent is outside of the prefetched subtree
+        self.counter.add()
+        return Control.CreateControlFromElement(self.Element).GetParentControl()
+
+    def GetLiveControl(self)->Control:
+        return Control.CreateControlFromElement(self.Element)
+
+def prefetch(node:Control|CachedControl,counter:PropertyCounter,scope:int=TreeScope.Subtree)->CachedControl:
+    '''Fetches the properties the traversal needs for the node and the given scope below it in one request.'''
+    automation=_AutomationClient.instance().IUIAutomation
+    cache_request=automation.CreateCacheRequest()
+    for property_id in PREFETCH_PROPERTY_IDS:
+        cache_request.AddProperty(property_id)
+    cache_request.TreeScope=scope
+    # Same view of the tree as GetChildren
+    cache_request.TreeFilter=automation.RawViewCondition
+    counter.add()
+    element=node.Element.BuildUpdatedCache(cache_request)
+    parent=node.parent if isinstance(node,CachedControl) else None
+    return CachedControl(element,counter,parent=parent,is_subtree_cached=scope==TreeScope.Subtree)
@@ -0,0 +1,172 @@
+from src.tree.config import INTERACTIVE_CONTROL_TYPE_NAMES, INFORMATIVE_CONTROL_TYPE_NAMES, DEFAULT_ACTIONS, SCROLLABLE_CONTROL_TYPE_NAMES, FOCUSABLE_CONTROL_TYPE_NAMES, OFFSCREEN_CONTROL_TYPE_NAMES, OFFSCREEN_CLASS_NAMES
+from uiautomation import Control, ControlType, ControlTypeNames
+from typing import Callable
+from enum import Enum
+
+class NodeKind(Enum):
+    SKIPPED='skipped'
+    NONE='none'
+    SCROLLABLE='scrollable'
+    INTERACTIVE='interactive'
+    INFORMATIVE='informative'
+
+Rule=Callable[[Control],NodeKind]
+Predicate=Callable[[Control],bool]
+
+class Classifier:
+    '''
+    Decides what a node is from rules compiled once per control type, for desktop apps and for browsers.
+    A compiled rule only reads the properties and patterns its control type needs, and skips the checks that are
+    settled by the control type alone. Rules for in house apps can be added with register.
+    '''
+    def __init__(
+        self,
+        interactive_names:set[str]=INTERACTIVE_CONTROL_TYPE_NAMES,
+        informative_names:set[str]=INFORMATIVE_CONTROL_TYPE_NAMES,
+        scrollable_names:set[str]|None=SCROLLABLE_CONTROL_TYPE_NAMES,
+        focusable_names:set[str]=FOCUSABLE_CONTROL_TYPE_NAMES,
+        default_actions:set[str]=DEFAULT_ACTIONS
+    ):
+        self.interactive_names=frozenset(interactive_names)
+        self.informative_names=frozenset(informative_names)
+        # None lets every control type expose a scroll pattern
+        self.scrollable_names=None if scrollable_names is None else frozenset(scrollable_names)
+        self.focusable_names=frozenset(focusable_names)
+        self.default_actions=frozenset(default_actions)
+        self.rules:dict[tuple[int,bool],Rule]={}
+        # Control types unknown to uiautomation are checked for every pattern
+        self.fallback_rules={is_browser:self.compile('Control',is_browser,can_scroll=True) for is_browser in (False,True)}
+        for control_type in ControlTypeNames:
+            self.compile_control_type(control_type)
+
+    def compile_control_type(self,control_type:int):
+        name=ControlTypeNames.get(control_type,'Control')
+        for is_browser in (False,True):
+            self.rules[(control_type,is_browser)]=self.compile(name,is_browser)
+
+    def register(self,control_type:str|int,rule:Rule,is_browser:bool|None=None):
+        '''Replaces the rule of a control type, for desktop apps, browsers or both (None).'''
+        if isinstance(control_type,str):
+            control_type=getattr(ControlType,control_type)
+        for browser in ((False,True) if is_browser is None else (is_browser,)):
+            self.rules[(control_type,browser)]=rule
+
+    def classify(self,node:Control,is_browser:bool)->NodeKind:
+        rule=self.rules.get((node.ControlType,is_browser))
+        if rule is None:
+            rule=self.fallback_rules[is_browser]
+        return rule(node)
+
+    def compile(self,name:str,is_browser:bool,can_scroll:bool|None=None)->Rule:
+        is_skipped=self.compile_skipped(name)
+        is_scrollable=self.compile_scrollable(name,can_scroll)
+        is_interactive=self.compile_interactive(name,is_browser)
+        is_informative=self.compile_informative(name)
+        def rule(node:Control)->NodeKind:
+            if is_skipped is not None and is_skipped(node):
+                return NodeKind.SKIPPED
+            if is_scrollable is not None and is_scrollable(node):
+                return NodeKind.SCROLLABLE
+            if is_interactive is not None and is_interactive(node):
+                return NodeKind.INTERACTIVE
+            if is_informative is not None and is_informative(node):
+                return NodeKind.INFORMATIVE
+            return NodeKind.NONE
+        return rule
+
+    def compile_skipped(self,name:str)->Predicate|None:
+        if name in OFFSCREEN_CONTROL_TYPE_NAMES:
+            return None
+        return lambda node: node.IsOffscreen and node.ClassName not in OFFSCREEN_CLASS_NAMES
+
+    def compile_scrollable(self,name:str,can_scroll:bool|None=None)->Predicate|None:
+        if can_scroll is None:
+            can_scroll=self.scrollable_names is None or name in self.scrollable_names
+        if not can_scroll:
+            return None
+        def is_scrollable(node:Control)->bool:
+            try:
+                scroll_pattern=node.GetScrollPattern()
+                return scroll_pattern.VerticallyScrollable or scroll_pattern.HorizontallyScrollable
+            except Exception:
+                return False
+        return is_scrollable
+
+    def compile_focusable(self,name:str)->Predicate|None:
+        '''None when the control type alone makes the node keyboard focusable.'''
+        if name in self.focusable_names:
+            return None
+        def is_focusable(node:Control)->bool:
+            try:
+                return node.IsKeyboardFocusable
+            except Exception:
+                return False
+        return is_focusable
+
+    def compile_visible(self,name:str)->Predicate:
+        is_offscreen_allowed=name=='EditControl'
+        def is_visible(node:Control)->bool:
+            is_control=node.IsControlElement
+            box=node.BoundingRectangle
+            if box.isempty():
+                return False
+            return box.width()*box.height()>0 and (is_offscreen_allowed or not node.IsOffscreen) and is_control
+        return is_visible
+
+    def compile_image(self,name:str)->Predicate|None:
+        '''None when the control type can not be an image.'''
+        if name!='ImageControl':
+            return None
+        return lambda node: node.LocalizedControlType=='graphic' or not node.IsKeyboardFocusable
+
+    def compile_interactive(self,name:str,is_browser:bool)->Predicate|None:
+        is_focusable=self.compile_focusable(name)
+        is_visible=self.compile_visible(name)
+        is_image=self.compile_image(name)
+        # The first branch whose guard holds decides, a None guard always holds
+        branches:list[tuple[Predicate|None,Predicate]]=[]
+        if is_browser and name in ('DataItemControl','ListItemControl') and is_focusable is not None:
+            branches.append((lambda node: not is_focusable(node),lambda node: False))
+        if not is_browser and name=='ImageControl':
+            branches.append((is_focusable,lambda node: True))
+        if name in self.interactive_names:
+            if is_image is None or is_focusable is None:
+                branches.append((None,lambda node: is_visible(node) and is_enabled(node)))
+            else:
+                branches.append((None,lambda node: is_visible(node) and is_enabled(node) and (not is_image(node) or is_focusable(node))))
+        elif is_browser and name=='GroupControl':
+            default_actions=self.default_actions
+            def is_actionable(node:Control)->bool:
+                if node.GetLegacyIAccessiblePattern().DefaultAction.title() in default_actions:
+                    return True
+                return is_focusable is None or is_focusable(node)
+            branches.append((None,lambda node: is_visible(node) and is_enabled(node) and is_actionable(node)))
+        if not branches:
+            return None
+        def is_interactive(node:Control)->bool:
+            try:
+                for guard,outcome in branches:
+                    if guard is None or guard(node):
+                        return outcome(node)
+            except Exception:
+                return False
+            return False
+        return is_interactive
+
+    def compile_informative(self,name:str)->Predicate|None:
+        if name not in self.informative_names:
+            return None
+        is_visible=self.compile_visible(name)
+        is_image=self.compile_image(name)
+        def is_informative(node:Control)->bool:
+            try:
+                return is_visible(node) and is_enabled(node) and not (is_image is not None and is_image(node))
+            except Exception:
+                return False
+        return is_informative
+
+def is_enabled(node:Control)->bool:
+    try:
+        return node.IsEnabled
+    except Exception:
+        return False
@@ -14,4 +14,40 @@ INFORMATIVE_CONTROL_TYPE_NAMES=set([
     'TextControl','ImageControl'
 ])
 
-THREAD_MAX_RETRIES = 3
\ No newline at end of file
+# Control types asked for a scroll pattern, None asks every node. A set only pays off without property prefetch and
+# misses the scrollable elements of the types left out
+SCROLLABLE_CONTROL_TYPE_NAMES=None
+
+# Control types that take keyboard focus without asking the element
+FOCUSABLE_CONTROL_TYPE_NAMES=set([
+    'EditControl','ButtonControl','CheckBoxControl','RadioButtonControl','TabItemControl'
+])
+
+# Offscreen nodes are skipped with their subtree, except for these control types and class names
+OFFSCREEN_CONTROL_TYPE_NAMES=set([
+    'EditControl','TitleBarControl'
+])
+
+OFFSCREEN_CLASS_NAMES=set([
+    'Popup','Windows.UI.Core.CoreComponentInputSource'
+])
+
+THREAD_MAX_RETRIES = 3
+
+# Keep a live mirror of the walked apps that is patched from UI Automation events instead of walking them on every call
+ENABLE_TREE_MIRROR = True
+
+
+# Fetch the properties of a whole app in one cache request instead of reading them element by element
+ENABLE_PROPERTY_PREFETCH = True
+
+# Limits of a single tree walk, once spent the walk returns what it has collected so far (None for no limit)
+TRAVERSAL_TIME_BUDGET = 5.0
+TRAVERSAL_NODE_BUDGET = 20000
+
+# Pool workers that help walking the panes of a single app window (0 walks every app on one thread)
+SUBTREE_WORKERS = 4
+
+# Cell size in pixels of the grid over the snapshot boxes, and how many cells a box may cover before it is checked on every lookup
+SPATIAL_INDEX_CELL_SIZE = 64
+SPATIAL_INDEX_MAX_CELLS = 256
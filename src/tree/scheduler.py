@@ -0,0 +1,71 @@
+from concurrent.futures import Executor
+from typing import Callable, Generic, TypeVar
+from threading import Condition
+from collections import deque
+
+T=TypeVar('T')
+
+class SubtreeScheduler(Generic[T]):
+    '''
+    Runs work items on the calling thread and on idle pool workers. The calling thread takes the newest item,
+    helpers steal the oldest one, and items may push further items while they run. The calling thread keeps working
+    until every item is done, so it never blocks on a pool that is busy with other apps.
+    '''
+    def __init__(self,run:Callable[[T],None],executor:Executor|None=None,max_helpers:int=0):
+        self.run=run
+        self.executor=executor
+        self.max_helpers=max_helpers if executor is not None else 0
+        self.items:deque[T]=deque()
+        self.condition=Condition()
+        self.pending=0
+        self.helpers=0
+        self.error:Exception|None=None
+
+    def push(self,item:T):
+        with self.condition:
+            self.items.append(item)
+            self.pending+=1
+            spawn_helper=self.helpers<self.max_helpers
+            if spawn_helper:
+                self.helpers+=1
+            self.condition.notify_all()
+        if spawn_helper:
+            self.executor.submit(self.help)
+
+    def help(self):
+        while True:
+            with self.condition:
+                if not self.items or self.error is not None:
+                    self.helpers-=1
+                    return None
+                item=self.items.popleft()
+            self.execute(item)
+
+    def execute(self,item:T):
+        try:
+            self.run(item)
+        except Exception as ex:
+            with self.condition:
+                if self.error is None:
+                    self.error=ex
+        finally:
+            with self.condition:
+                self.pending-=1
+                self.condition.notify_all()
+
+    def join(self):
+        while True:
+            with self.condition:
+                if self.error is not None and self.items:
+                    # Drop the remaining items, the failure is raised once the running ones are done
+                    self.pending-=len(self.items)
+                    self.items.clear()
+                if self.pending==0:
+                    break
+                if not self.items:
+                    self.condition.wait()
+                    continue
+                item=self.items.pop()
+            self.execute(item)
+        if self.error is not None:
+            raise self.error
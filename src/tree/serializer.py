@@ -0,0 +1,41 @@
+from typing import Any,Iterable
+from io import StringIO
+import json
+
+def format_cell(value:Any)->str:
+    if value is None:
+        return ''
+    if isinstance(value,float):
+        return format(value,'g')
+    text=value if isinstance(value,str) else str(value)
+    if '|' in text or '\n' in text:
+        text=text.replace('|','\\|').replace('\r','').replace('\n',' ')
+    return text
+
+def markdown_table(headers:list[str],rows:Iterable[list])->str:
+    '''
+    Writes a GitHub markdown table in a single pass. Unlike tabulate the columns are not padded to a common width,
+    which would need every cell to be measured before the first row could be written.
+    '''
+    buffer=StringIO()
+    write=buffer.write
+    write('| ')
+    write(' | '.join(headers))
+    write(' |\n|')
+    write('|'.join('---' for _ in headers))
+    write('|')
+    for row in rows:
+        write('\n| ')
+        write(' | '.join([format_cell(value) for value in row]))
+        write(' |')
+    return buffer.getvalue()
+
+def columns(keys:list[str],rows:Iterable[list])->dict[str,list]:
+    '''Turns rows into one array per column.'''
+    values=list(zip(*rows))
+    if not values:
+        return {key:[] for key in keys}
+    return {key:list(column) for key,column in zip(keys,values)}
+
+def to_json(document:dict)->str:
+    return json.dumps(document,separators=(',',':'),ensure_ascii=False)
@@ -1,13 +1,18 @@
-from src.tree.config import INTERACTIVE_CONTROL_TYPE_NAMES,INFORMATIVE_CONTROL_TYPE_NAMES, DEFAULT_ACTIONS, THREAD_MAX_RETRIES
-from src.tree.views import TreeElementNode, TextElementNode, ScrollElementNode, Center, BoundingBox, TreeState
-from uiautomation import GetRootControl,Control,ImageControl,ScrollPattern,WindowControl
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.tree.config import INTERACTIVE_CONTROL_TYPE_NAMES, FOCUSABLE_CONTROL_TYPE_NAMES, THREAD_MAX_RETRIES, ENABLE_PROPERTY_PREFETCH, TRAVERSAL_TIME_BUDGET, TRAVERSAL_NODE_BUDGET, SUBTREE_WORKERS
+from src.tree.classifier import NodeKind
+from src.tree.cache import CachedControl, CountingControl, PropertyCounter, prefetch
+from src.tree.views import ElementRecord, TextRecord, ScrollRecord, ElementTable, TextTable, ScrollTable, TreeState, TraversalContext, TraversalResult, TraversalNode, TraversalBudget
+from uiautomation import GetRootControl,Control,ScrollPattern,TreeScope
+from concurrent.futures import Executor, as_completed
+from src.tree.scheduler import SubtreeScheduler
 from src.tree.utils import random_point_within_bounding_box
 from src.desktop.config import AVOIDED_APPS, EXCLUDED_APPS
-from PIL import Image, ImageFont, ImageDraw
+from src.tree.annotation import annotate
+from PIL import Image
+from dataclasses import replace
 from typing import TYPE_CHECKING
-from time import sleep
-import random
+from time import perf_counter
+import sys
 
 if TYPE_CHECKING:
     from src.desktop.service import Desktop
@@ -16,15 +21,25 @@ class Tree:
     def __init__(self,desktop:'Desktop'):
         self.desktop=desktop
         self.screen_size=self.desktop.get_screen_size()
+        self.classifier=self.desktop.classifier
+        self.counter=PropertyCounter()
 
-    def get_state(self)->TreeState:
-        sleep(0.1)
+    def get_state(self,time_budget:float|None=TRAVERSAL_TIME_BUDGET,node_budget:int|None=TRAVERSAL_NODE_BUDGET)->TreeState:
         # Get the root control of the desktop
         root=GetRootControl()
-        interactive_nodes,informative_nodes,scrollable_nodes=self.get_appwise_nodes(node=root)
-        return TreeState(interactive_nodes=interactive_nodes,informative_nodes=informative_nodes,scrollable_nodes=scrollable_nodes)
+        budget=TraversalBudget.from_limits(time_budget=time_budget,node_budget=node_budget)
+        interactive_nodes,informative_nodes,scrollable_nodes=self.get_appwise_nodes(node=root,budget=budget)
+        return TreeState(
+            interactive_nodes=ElementTable(interactive_nodes),
+            informative_nodes=TextTable(informative_nodes),
+            scrollable_nodes=ScrollTable(scrollable_nodes),
+            property_reads=self.counter.value,
+            is_truncated=budget.is_truncated,
+            skipped_subtrees=budget.skipped_subtrees,
+            app_stats=list(budget.app_stats.values())
+        )
 
-    def get_appwise_nodes(self,node:Control) -> tuple[list[TreeElementNode],list[TextElementNode],list[ScrollElementNode]]:
+    def get_apps(self,node:Control)->list[Control]:
         apps:list[Control]=[]
         found_foreground_app=False
         # EXCLUDED_APPS.discard('Progman')
@@ -35,15 +50,28 @@ class Tree:
                 if not found_foreground_app:
                     apps.append(app)
                     found_foreground_app=True
+        return apps
 
-        interactive_nodes, informative_nodes, scrollable_nodes = [], [], []
+    def get_appwise_nodes(self,node:Control,budget:TraversalBudget|None=None) -> tuple[list[ElementRecord],list[TextRecord],list[ScrollRecord]]:
+        budget=budget or TraversalBudget()
+        apps=self.get_apps(node)
+        tree_mirror=self.desktop.tree_mirror
+        if tree_mirror is not None and tree_mirror.is_running:
+            # The apps and subtrees the mirror walks afresh go through the same pool as a full walk
+            with self.desktop.get_executor() as executor:
+                return tree_mirror.get_nodes(self,apps,budget,executor)
 
-        with ThreadPoolExecutor() as executor:
+        interactive_nodes, informative_nodes, scrollable_nodes = [], [], []
+        with self.desktop.get_executor() as executor:
             retry_counts = {app: 0 for app in apps}
-            future_to_app = {executor.submit(self.get_nodes, app, self.desktop.is_app_browser(app)): app for app in apps}
+            # Looked up once per app, retries walk the same process
+            is_browser = {app: self.desktop.is_app_browser(app) for app in apps}
+            future_to_app = {executor.submit(self.get_nodes, app, is_browser[app], budget, executor): app for app in apps}
+            submitted_at = {future: perf_counter() for future in future_to_app}
             while future_to_app:  # keep running until no pending futures
                 for future in as_completed(list(future_to_app)):
                     app = future_to_app.pop(future)  # remove completed future
+                    started_at = submitted_at.pop(future)
                     try:
                         result = future.result()
                         if result:
@@ -52,327 +80,346 @@ class Tree:
                             informative_nodes.extend(text_nodes)
                             scrollable_nodes.extend(scroll_nodes)
                     except Exception as e:
+                        # Failures inside the walk are retried per subtree, these happened before it started
                         retry_counts[app] += 1
                         print(f"Error in processing node {app.Name}, retry attempt {retry_counts[app]}\nError: {e}")
+                        budget.record_failure(app.Name, e, perf_counter()-started_at, is_retried=retry_counts[app] < THREAD_MAX_RETRIES)
                         if retry_counts[app] < THREAD_MAX_RETRIES:
-                            new_future = executor.submit(self.get_nodes, app, self.desktop.is_app_browser(app))
+                            new_future = executor.submit(self.get_nodes, app, is_browser[app], budget, executor)
                             future_to_app[new_future] = app
+                            submitted_at[new_future] = perf_counter()
                         else:
                             print(f"Task failed completely for {app.Name} after {THREAD_MAX_RETRIES} retries")
         return interactive_nodes,informative_nodes,scrollable_nodes
 
-    def get_nodes(self, node: Control, is_browser=False) -> tuple[list[TreeElementNode],list[TextElementNode],list[ScrollElementNode]]:
-        
-        def is_element_visible(node:Control,threshold:int=0):
-            is_control=node.IsControlElement
-            box=node.BoundingRectangle
-            if box.isempty():
-                return False
-            width=box.width()
-            height=box.height()
-            area=width*height
-            is_offscreen=(not node.IsOffscreen) or node.ControlTypeName in ['EditControl']
-            return area > threshold and is_offscreen and is_control
-    
-        def is_element_enabled(node:Control):
+
+    def get_app_name(self,node:Control)->str:
+        match node.ClassName:
+            case "Progman":
+                return "Desktop"
+            case 'Shell_TrayWnd'|'Shell_SecondaryTrayWnd':
+                return "Taskbar"
+            case 'Microsoft.UI.Content.PopupWindowSiteBridge':
+                return "Context Menu"
+            case _:
+                return node.Name.strip()
+
+    def get_context(self,node:Control,is_browser:bool|None=None)->TraversalContext:
+        if is_browser is None:
+            is_browser=self.desktop.is_app_browser(node)
+        return TraversalContext(app_name=self.get_app_name(node),is_browser=is_browser)
+
+    def get_nodes(self, node: Control, is_browser=False, budget:TraversalBudget|None=None, executor:Executor|None=None) -> tuple[list[ElementRecord],list[TextRecord],list[ScrollRecord]]:
+        budget=budget or TraversalBudget()
+        if budget.is_exhausted():
+            budget.skip(1)
+            return [],[],[]
+        context=self.get_context(node,is_browser=is_browser)
+        root=self.get_mirror_node(node,context,budget=budget,executor=executor)
+        result=TraversalResult()
+        root.collect(result)
+        return result.to_tuple()
+
+    def get_traversal_root(self,node:Control|CachedControl,scope:int=TreeScope.Subtree)->CachedControl|CountingControl:
+        if ENABLE_PROPERTY_PREFETCH:
+            # One request for the whole subtree, the traversal then reads from the local cache
+            return prefetch(node,self.counter,scope=scope)
+        return CountingControl(node.target if isinstance(node,CountingControl) else node,self.counter)
+
+    def get_subtree_element(self,node:CachedControl|CountingControl,refresh:bool=False)->CachedControl|CountingControl:
+        if isinstance(node,CachedControl) and (refresh or not node.is_subtree_cached):
+            return prefetch(node,self.counter)
+        return node
+
+    def refresh(self,node:Control|CachedControl,context:TraversalContext)->Control|CachedControl:
+        '''Fetches the current properties of an element that was walked before.'''
+        if not isinstance(node,CachedControl):
+            return node
+        # The dom corrections look down the chain of first children
+        return prefetch(node,self.counter,scope=TreeScope.Subtree if context.is_dom else TreeScope.Element)
+
+    def tree_traversal(self,node:Control,context:TraversalContext,budget:TraversalBudget,reset:str|None=None)->TraversalNode:
+        '''
+        Walks the subtree with an explicit stack and keeps the nodes produced by every element apart, collect() puts them
+        back into document order. Under a bounded budget the focused and on-screen children are walked first and the
+        walk stops once the budget is spent, leaving the pending subtrees empty.
+        '''
+        root=TraversalNode(element=node,context=context,reset=reset)
+        self.walk(root,budget)
+        return root
+
+    def parallel_traversal(self,node:Control,context:TraversalContext,budget:TraversalBudget,executor:Executor,reset:str|None=None)->TraversalNode:
+        '''
+        Walks every pane below the app window, and every browser render host that is not fetched yet, as a work item
+        of its own on the pool. Each item fills its own TraversalNode, so collect() still merges them in document order.
+        '''
+        # Only the window and its children are fetched here, every pane fetches its own subtree
+        root=TraversalNode(element=self.get_traversal_root(node,scope=TreeScope.Element|TreeScope.Children),context=context,reset=reset)
+        scheduler=SubtreeScheduler(run=lambda item:self.walk(item,budget,scheduler),executor=executor,max_helpers=SUBTREE_WORKERS)
+        scheduler.push(root)
+        scheduler.join()
+        root.is_truncated=any(item.is_truncated for item in root.walk())
+        return root
+
+    def walk(self,root:TraversalNode,budget:TraversalBudget,scheduler:SubtreeScheduler|None=None):
+        stack=[root]
+        while stack:
+            if budget.is_exhausted():
+                budget.skip(len(stack))
+                root.is_truncated=True
+                break
+            current=stack.pop()
+            budget.spend()
+            started_at=perf_counter()
             try:
-                return node.IsEnabled
-            except Exception:
-                return False
-            
-        def is_default_action(node:Control):
+                if current.attempts or (current is root and root.parent is not None):
+                    # A split off subtree is fetched by its own item, a retried one is fetched again
+                    current.element=self.get_subtree_element(current.element,refresh=current.attempts>0)
+                current.is_pruned=not self.visit_node(current.element,current.context,current.result)
+                children=[]
+                if not current.is_pruned:
+                    for child in self.get_children(current.element,current.context):
+                        child_context,child_reset=self.get_child_context(child,current.context)
+                        children.append(TraversalNode(element=child,context=child_context,reset=child_reset))
+            except Exception as ex:
+                if self.recover(current,budget,ex,perf_counter()-started_at):
+                    stack.append(current)
+                continue
+            # Children are attached once the element succeeded, a failure above only costs this element
+            pending=[]
+            for child_node in children:
+                current.add_child(child_node)
+                if scheduler is not None and self.is_split_point(current,child_node):
+                    scheduler.push(child_node)
+                else:
+                    pending.append(child_node)
+            pending.reverse()
+            if budget.is_bounded:
+                # The stack pops from the end, so the preferred children go last
+                pending.sort(key=self.get_priority)
+            stack.extend(pending)
+
+    def recover(self,node:TraversalNode,budget:TraversalBudget,error:Exception,wasted_time:float)->bool:
+        '''Resets a failed element so that only its own subtree is walked again. Returns False once it is given up.'''
+        node.result=TraversalResult()
+        node.children.clear()
+        node.is_pruned=False
+        node.attempts+=1
+        is_retried=node.attempts<THREAD_MAX_RETRIES
+        budget.record_failure(node.context.app_name,error,wasted_time,is_retried=is_retried)
+        if not is_retried:
+            # Not stdout, which carries the MCP stream on the stdio transport
+            print(f"Skipped a subtree of {node.context.app_name} after {THREAD_MAX_RETRIES} attempts\nError: {error}",file=sys.stderr)
+        return is_retried
+
+    def is_split_point(self,node:TraversalNode,child:TraversalNode)->bool:
+        if node.parent is None:
+            return True
+        if child.context.is_dom and not node.context.is_dom:
+            # Splitting a render host only pays off while it still has to be fetched
+            return not (isinstance(child.element,CachedControl) and child.element.is_subtree_cached)
+        return False
+
+    def get_priority(self,node:TraversalNode)->tuple[bool,bool]:
+        try:
+            return (bool(node.element.HasKeyboardFocus),not node.element.IsOffscreen)
+        except Exception:
+            return (False,False)
+
+    def get_children(self,node:Control,context:TraversalContext)->list[Control]:
+        children=node.GetChildren()
+        return [child for child in children if not context.is_browser and child.ControlTypeName=='WindowControl'] or children
+
+    def get_child_context(self,child:Control,context:TraversalContext)->tuple[TraversalContext,str|None]:
+        '''Returns the context of the child subtree and which collected nodes have to be discarded before entering it.'''
+        if context.is_browser and child.ClassName == "Chrome_RenderWidgetHostHWND":
+            # enter DOM subtree
+            return replace(context,is_dom=True),None
+        elif child.ControlTypeName=='WindowControl':
+            reset=None
+            if not (self.is_keyboard_focusable(child) or child.IsOffscreen):
+                if context.is_dom:
+                    bounding_box=child.BoundingRectangle
+                    if bounding_box.width() > 0.6*self.screen_size.width:
+                        # Because this window element covers the majority of the screen
+                        reset='dom'
+                else:
+                    reset='interactive'
+            # enter dialog subtree
+            return replace(context,is_dialog=True),reset
+        else:
+            # normal non-dialog children
+            return context,None
+
+    def visit_node(self,node:Control,context:TraversalContext,result:TraversalResult)->bool:
+        '''Classifies a single node into the result. Returns False when the subtree below it has to be skipped.'''
+        kind=self.classifier.classify(node,context.is_browser)
+        # Offscreen nodes are skipped along with their subtree
+        if kind is NodeKind.SKIPPED:
+            return False
+        app_name=context.app_name
+        if kind is NodeKind.SCROLLABLE:
+            scroll_pattern:ScrollPattern=node.GetScrollPattern()
+            box = node.BoundingRectangle
+            # Get the center
+            x,y=random_point_within_bounding_box(node=node,scale_factor=0.8)
+            result.scrollable_nodes.append(ScrollRecord(
+                name=node.Name.strip() or node.LocalizedControlType.capitalize() or "''",
+                control_type=node.LocalizedControlType.title(),
+                app_name=app_name,
+                left=box.left,
+                top=box.top,
+                right=box.right,
+                bottom=box.bottom,
+                x=x,
+                y=y,
+                horizontal_scrollable=scroll_pattern.HorizontallyScrollable,
+                horizontal_scroll_percent=scroll_pattern.HorizontalScrollPercent if scroll_pattern.HorizontallyScrollable else 0,
+                vertical_scrollable=scroll_pattern.VerticallyScrollable,
+                vertical_scroll_percent=scroll_pattern.VerticalScrollPercent if scroll_pattern.VerticallyScrollable else 0,
+                is_focused=node.HasKeyboardFocus
+            ))
+        elif kind is NodeKind.INTERACTIVE:
             legacy_pattern=node.GetLegacyIAccessiblePattern()
-            default_action=legacy_pattern.DefaultAction.title()
-            if default_action in DEFAULT_ACTIONS:
+            value=legacy_pattern.Value.strip() if legacy_pattern.Value is not None else ""
+            name=node.Name.strip()
+            box = node.BoundingRectangle
+            tree_node=ElementRecord(
+                    name=name,
+                    control_type=node.LocalizedControlType.title(),
+                    value=value,
+                    shortcut=node.AcceleratorKey,
+                    left=box.left,
+                    top=box.top,
+                    right=box.right,
+                    bottom=box.bottom,
+                    x=box.xcenter(),
+                    y=box.ycenter(),
+                    app_name=app_name
+                )
+            if context.is_browser and context.is_dom:
+                result.dom_interactive_nodes.append(tree_node)
+                self.dom_correction(node,app_name,result.dom_interactive_nodes)
+            else:
+                result.interactive_nodes.append(tree_node)
+        elif kind is NodeKind.INFORMATIVE:
+            result.informative_nodes.append(TextRecord(
+                name=node.Name.strip() or "''",
+                app_name=app_name
+            ))
+        return True
+
+    def get_mirror_node(self,node:Control|CachedControl,context:TraversalContext,reset:str|None=None,budget:TraversalBudget|None=None,executor:Executor|None=None)->TraversalNode:
+        '''Walks the subtree into a TraversalNode, its panes in parallel on the executor when there is one.'''
+        budget=budget or TraversalBudget()
+        if executor is not None and SUBTREE_WORKERS>0:
+            return self.parallel_traversal(node,context,budget,executor,reset)
+        return self.tree_traversal(self.get_traversal_root(node),context,budget,reset)
+
+    def get_runtime_id(self,node:Control)->tuple[int,...]:
+        return tuple(node.GetRuntimeId())
+
+    def get_parent(self,node:Control)->Control|None:
+        return node.GetParentControl()
+
+    def is_keyboard_focusable(self,node:Control):
+        try:
+            if node.ControlTypeName in FOCUSABLE_CONTROL_TYPE_NAMES:
                 return True
+            return node.IsKeyboardFocusable
+        except Exception:
             return False
         
-        def is_element_image(node:Control):
-            if isinstance(node,ImageControl):
-                if node.LocalizedControlType=='graphic' or not node.IsKeyboardFocusable:
-                    return True
-            return False
-        
-        def is_element_text(node:Control):
-            try:
-                if node.ControlTypeName in INFORMATIVE_CONTROL_TYPE_NAMES:
-                    if is_element_visible(node) and is_element_enabled(node) and not is_element_image(node):
-                        return True
-            except Exception:
+    def element_has_child_element(self,node:Control,control_type:str,child_control_type:str):
+        if node.LocalizedControlType==control_type:
+            first_child=node.GetFirstChildControl()
+            if first_child is None:
                 return False
-            return False
+            return first_child.LocalizedControlType==child_control_type
         
-        def is_element_scrollable(node:Control):
-            try:
-                scroll_pattern:ScrollPattern=node.GetScrollPattern()
-                return scroll_pattern.VerticallyScrollable or scroll_pattern.HorizontallyScrollable
-            except Exception:
-                return False
-            
-        def is_keyboard_focusable(node:Control):
-            try:
-                if node.ControlTypeName in set(['EditControl','ButtonControl','CheckBoxControl','RadioButtonControl','TabItemControl']):
-                    return True
-                return node.IsKeyboardFocusable
-            except Exception:
-                return False
-            
-        def element_has_child_element(node:Control,control_type:str,child_control_type:str):
-            if node.LocalizedControlType==control_type:
-                first_child=node.GetFirstChildControl()
-                if first_child is None:
-                    return False
-                return first_child.LocalizedControlType==child_control_type
-            
-        def group_has_no_name(node:Control):
-            try:
-                if node.ControlTypeName=='GroupControl':
-                    if not node.Name.strip():
-                        return True
-                return False
-            except Exception:
-                return False
-            
-        def is_element_interactive(node:Control):
-            try:
-                if is_browser and node.ControlTypeName in set(['DataItemControl','ListItemControl']) and not is_keyboard_focusable(node):
-                    return False
-                elif not is_browser and node.ControlTypeName=="ImageControl" and is_keyboard_focusable(node):
+    def group_has_no_name(self,node:Control):
+        try:
+            if node.ControlTypeName=='GroupControl':
+                if not node.Name.strip():
                     return True
-                elif node.ControlTypeName in INTERACTIVE_CONTROL_TYPE_NAMES:
-                    return is_element_visible(node) and is_element_enabled(node) and (not is_element_image(node) or is_keyboard_focusable(node))
-                elif is_browser and node.ControlTypeName=='GroupControl':
-                    return is_element_visible(node) and is_element_enabled(node) and (is_default_action(node) or is_keyboard_focusable(node))
-                # elif node.ControlTypeName=='GroupControl' and not is_browser:
-                #     if is_element_visible and is_element_enabled(node) and is_default_action(node):
-                #         return True
-            except Exception:
-                return False
+            return False
+        except Exception:
             return False
         
-        def dom_correction(node:Control):
-            if element_has_child_element(node,'list item','link') or element_has_child_element(node,'item','link'):
-                dom_interactive_nodes.pop()
-                return None
-            elif node.ControlTypeName=='GroupControl':
-                dom_interactive_nodes.pop()
-                if is_keyboard_focusable(node):
-                    child=node
-                    try:
-                        while child.GetFirstChildControl() is not None:
-                            if child.ControlTypeName in INTERACTIVE_CONTROL_TYPE_NAMES:
-                                return None
-                            child=child.GetFirstChildControl()
-                    except Exception:
-                        return None
-                    if child.ControlTypeName!='TextControl':
-                        return None
-                    box = node.BoundingRectangle
-                    legacy_pattern=node.GetLegacyIAccessiblePattern()
-                    value=legacy_pattern.Value
-                    x,y=box.xcenter(),box.ycenter()
-                    center = Center(x=x,y=y)
-                    dom_interactive_nodes.append(TreeElementNode(
-                        name=child.Name.strip(),
-                        control_type=node.LocalizedControlType,
-                        value=value,
-                        shortcut=node.AcceleratorKey,
-                        bounding_box=BoundingBox(
-                            left=box.left,
-                            top=box.top,
-                            right=box.right,
-                            bottom=box.bottom,
-                            width=box.width(),
-                            height=box.height()
-                        ),
-                        center=center,
-                        app_name=app_name
-                    ))
-            elif element_has_child_element(node,'link','heading'):
-                dom_interactive_nodes.pop()
-                node=node.GetFirstChildControl()
-                control_type='link'
+    def dom_correction(self,node:Control,app_name:str,dom_interactive_nodes:list[ElementRecord]):
+        if self.element_has_child_element(node,'list item','link') or self.element_has_child_element(node,'item','link'):
+            dom_interactive_nodes.pop()
+            return None
+        elif node.ControlTypeName=='GroupControl':
+            dom_interactive_nodes.pop()
+            if self.is_keyboard_focusable(node):
+                child=node
+                try:
+                    while child.GetFirstChildControl() is not None:
+                        if child.ControlTypeName in INTERACTIVE_CONTROL_TYPE_NAMES:
+                            return None
+                        child=child.GetFirstChildControl()
+                except Exception:
+                    return None
+                if child.ControlTypeName!='TextControl':
+                    return None
                 box = node.BoundingRectangle
                 legacy_pattern=node.GetLegacyIAccessiblePattern()
                 value=legacy_pattern.Value
-                x,y=box.xcenter(),box.ycenter()
-                center = Center(x=x,y=y)
-                dom_interactive_nodes.append(TreeElementNode(
-                    name=node.Name.strip(),
-                    control_type=control_type,
-                    value=node.Name.strip(),
+                dom_interactive_nodes.append(ElementRecord(
+                    name=child.Name.strip(),
+                    control_type=node.LocalizedControlType,
+                    value=value,
                     shortcut=node.AcceleratorKey,
-                    bounding_box=BoundingBox(
-                        left=box.left,
-                        top=box.top,
-                        right=box.right,
-                        bottom=box.bottom,
-                        width=box.width(),
-                        height=box.height()
-                    ),
-                    center=center,
+                    left=box.left,
+                    top=box.top,
+                    right=box.right,
+                    bottom=box.bottom,
+                    x=box.xcenter(),
+                    y=box.ycenter(),
                     app_name=app_name
                 ))
-            
-        def tree_traversal(node: Control,is_dom=False,is_dialog=False):
-            # Checks to skip the nodes that are not interactive
-            if node.IsOffscreen and (node.ControlTypeName not in set(["EditControl","TitleBarControl"])) and node.ClassName not in set(["Popup","Windows.UI.Core.CoreComponentInputSource"]):
-                return None
-            
-            if is_element_scrollable(node):
-                scroll_pattern:ScrollPattern=node.GetScrollPattern()
-                box = node.BoundingRectangle
-                # Get the center
-                x,y=random_point_within_bounding_box(node=node,scale_factor=0.8)
-                center = Center(x=x,y=y)
-                scrollable_nodes.append(ScrollElementNode(
-                    name=node.Name.strip() or node.LocalizedControlType.capitalize() or "''",
-                    app_name=app_name,
-                    control_type=node.LocalizedControlType.title(),
-                    bounding_box=BoundingBox(
-                        left=box.left,
-                        top=box.top,
-                        right=box.right,
-                        bottom=box.bottom,
-                        width=box.width(),
-                        height=box.height()
-                    ),
-                    center=center,
-                    horizontal_scrollable=scroll_pattern.HorizontallyScrollable,
-                    horizontal_scroll_percent=scroll_pattern.HorizontalScrollPercent if scroll_pattern.HorizontallyScrollable else 0,
-                    vertical_scrollable=scroll_pattern.VerticallyScrollable,
-                    vertical_scroll_percent=scroll_pattern.VerticalScrollPercent if scroll_pattern.VerticallyScrollable else 0,
-                    is_focused=node.HasKeyboardFocus
-                ))
-            elif is_element_interactive(node):
-                legacy_pattern=node.GetLegacyIAccessiblePattern()
-                value=legacy_pattern.Value.strip() if legacy_pattern.Value is not None else ""
-                name=node.Name.strip()
-                box = node.BoundingRectangle
-                x,y=box.xcenter(),box.ycenter()
-                center = Center(x=x,y=y)
-                tree_node=TreeElementNode(
-                        name=name,
-                        control_type=node.LocalizedControlType.title(),
-                        value=value,
-                        shortcut=node.AcceleratorKey,
-                        bounding_box=BoundingBox(
-                            left=box.left,
-                            top=box.top,
-                            right=box.right,
-                            bottom=box.bottom,
-                            width=box.width(),
-                            height=box.height()
-                        ),
-                        center=center,
-                        app_name=app_name
-                    )
-                if is_browser and is_dom:
-                    dom_interactive_nodes.append(tree_node)
-                    dom_correction(node=node)
-                else:
-                    interactive_nodes.append(tree_node)
-            elif is_element_text(node):
-                informative_nodes.append(TextElementNode(
-                    name=node.Name.strip() or "''",
-                    app_name=app_name
-                ))
-            
-            children=list(filter(lambda x: not is_browser and isinstance(x,WindowControl),node.GetChildren())) or node.GetChildren()
-            # Recursively check all children
-            for child in children:
-                if is_browser and child.ClassName == "Chrome_RenderWidgetHostHWND":
-                    # enter DOM subtree
-                    tree_traversal(child, is_dom=True, is_dialog=is_dialog)
-                elif isinstance(child,WindowControl):
-                    if not (is_keyboard_focusable(child) or child.IsOffscreen):
-                        if is_dom:
-                            bounding_box=child.BoundingRectangle
-                            if bounding_box.width() > 0.6*self.screen_size.width:
-                                # Because this window element covers the majority of the screen
-                                dom_interactive_nodes.clear()
-                        else:
-                            interactive_nodes.clear()
-                    # enter dialog subtree
-                    tree_traversal(child, is_dom=is_dom, is_dialog=True)
-                else:
-                    # normal non-dialog children
-                    tree_traversal(child, is_dom=is_dom, is_dialog=is_dialog)
-
-        interactive_nodes, dom_interactive_nodes, informative_nodes, scrollable_nodes = [], [], [],[]
-        app_name=node.Name.strip()
-        match node.ClassName:
-            case "Progman":
-                app_name="Desktop"
-            case 'Shell_TrayWnd'|'Shell_SecondaryTrayWnd':
-                app_name="Taskbar"
-            case 'Microsoft.UI.Content.PopupWindowSiteBridge':
-                app_name="Context Menu"
-            case _:
-                pass
-        tree_traversal(node,is_dom=False,is_dialog=False)
-        interactive_nodes.extend(dom_interactive_nodes)
-        return (interactive_nodes,informative_nodes,scrollable_nodes)
+        elif self.element_has_child_element(node,'link','heading'):
+            dom_interactive_nodes.pop()
+            node=node.GetFirstChildControl()
+            control_type='link'
+            box = node.BoundingRectangle
+            legacy_pattern=node.GetLegacyIAccessiblePattern()
+            value=legacy_pattern.Value
+            dom_interactive_nodes.append(ElementRecord(
+                name=node.Name.strip(),
+                control_type=control_type,
+                value=node.Name.strip(),
+                shortcut=node.AcceleratorKey,
+                left=box.left,
+                top=box.top,
+                right=box.right,
+                bottom=box.bottom,
+                x=box.xcenter(),
+                y=box.ycenter(),
+                app_name=app_name
+            ))
     
-    def get_random_color(self):
-        return "#{:06x}".format(random.randint(0, 0xFFFFFF))
-
-    def annotated_screenshot(self, nodes: list[TreeElementNode],scale:float=0.7) -> Image.Image:
-        screenshot = self.desktop.get_screenshot(scale=scale)
-        sleep(0.10)
-        # Add padding
-        padding = 20
-        width = screenshot.width + (2 * padding)
-        height = screenshot.height + (2 * padding)
-        padded_screenshot = Image.new("RGB", (width, height), color=(255, 255, 255))
-        padded_screenshot.paste(screenshot, (padding, padding))
-
-        draw = ImageDraw.Draw(padded_screenshot)
-        font_size = 12
-        try:
-            font = ImageFont.truetype('arial.ttf', font_size)
-        except IOError:
-            font = ImageFont.load_default()
-
-        def get_random_color():
-            return "#{:06x}".format(random.randint(0, 0xFFFFFF))
-
-        def draw_annotation(label, node: TreeElementNode):
-            box = node.bounding_box
-            color = get_random_color()
-
-            # Scale and pad the bounding box also clip the bounding box
-            adjusted_box = (
-                int(box.left * scale) + padding,
-                int(box.top * scale) + padding,
-                int(box.right * scale) + padding,
-                int(box.bottom * scale) + padding
-            )
-            # Draw bounding box
-            draw.rectangle(adjusted_box, outline=color, width=2)
-
-            # Label dimensions
-            label_width = draw.textlength(str(label), font=font)
-            label_height = font_size
-            left, top, right, bottom = adjusted_box
-
-            # Label position above bounding box
-            label_x1 = right - label_width
-            label_y1 = top - label_height - 4
-            label_x2 = label_x1 + label_width
-            label_y2 = label_y1 + label_height + 4
-
-            # Draw label background and text
-            draw.rectangle([(label_x1, label_y1), (label_x2, label_y2)], fill=color)
-            draw.text((label_x1 + 2, label_y1 + 2), str(label), fill=(255, 255, 255), font=font)
-
-        # Draw annotations in parallel
-        with ThreadPoolExecutor() as executor:
-            executor.map(draw_annotation, range(len(nodes)), nodes)
-        return padded_screenshot
+    def annotated_screenshot(self, nodes: ElementTable,scale:float=0.7,bbox:tuple[int,int,int,int]|None=None) -> Image.Image:
+        screenshot = self.desktop.get_screenshot(scale=scale,bbox=bbox)
+        start = perf_counter()
+        # Boxes are moved into the captured rectangle, the ones outside of it are left out but keep their labels
+        left, top, right, bottom = bbox if bbox is not None else (0, 0, None, None)
+        boxes = nodes.boxes
+        scaled_boxes, labels = [], []
+        for label in range(len(nodes)):
+            box_left, box_top, box_right, box_bottom = boxes[4 * label:4 * label + 4]
+            if bbox is not None and not (box_left < right and left < box_right and box_top < bottom and top < box_bottom):
+                continue
+            scaled_boxes.append((int((box_left - left) * scale), int((box_top - top) * scale), int((box_right - left) * scale), int((box_bottom - top) * scale)))
+            labels.append(label)
+        annotated_screenshot = annotate(screenshot, scaled_boxes, labels)
+        self.desktop.screenshot_stats.annotate_time = perf_counter() - start
+        return annotated_screenshot
     
-    def get_annotated_image_data(self)->tuple[Image.Image,list[TreeElementNode],list[ScrollElementNode]]:
+    def get_annotated_image_data(self)->tuple[Image.Image,ElementTable,ScrollTable]:
         node=GetRootControl()
-        nodes,_,scroll_nodes=self.get_appwise_nodes(node=node)
+        element_records,_,scroll_records=self.get_appwise_nodes(node=node)
+        nodes,scroll_nodes=ElementTable(element_records),ScrollTable(scroll_records)
         screenshot=self.annotated_screenshot(nodes=nodes,scale=1.0)
         return screenshot,nodes,scroll_nodes
\ No newline at end of file
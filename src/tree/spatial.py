@@ -0,0 +1,88 @@
+from typing import TYPE_CHECKING
+from array import array
+
+if TYPE_CHECKING:
+    from src.tree.views import NodeTable, NodeRow
+
+class SpatialIndex:
+    '''
+    Uniform grid over the bounding boxes of a snapshot. Every box is bucketed into the cells it covers, boxes that
+    would cover too many cells (windows, documents) are kept aside and checked on every query instead.
+    '''
+    def __init__(self,cell_size:int=64,max_cells:int=256):
+        self.cell_size=cell_size
+        self.max_cells=max_cells
+        self.cells:dict[tuple[int,int],list[int]]={}
+        self.oversized:list[int]=[]
+        self.boxes=array('i')
+        self.entries:list[tuple['NodeTable',int]]=[]
+
+    @classmethod
+    def from_tables(cls,*tables:'NodeTable',cell_size:int=64,max_cells:int=256)->'SpatialIndex':
+        index=cls(cell_size=cell_size,max_cells=max_cells)
+        for table in tables:
+            boxes=table.boxes
+            for position in range(len(table)):
+                left,top,right,bottom=boxes[4*position:4*position+4]
+                index.insert(table,position,left,top,right,bottom)
+        return index
+
+    def insert(self,table:'NodeTable',position:int,left:int,top:int,right:int,bottom:int):
+        if right<=left or bottom<=top:
+            return None
+        entry=len(self.entries)
+        self.entries.append((table,position))
+        self.boxes.extend((left,top,right,bottom))
+        size=self.cell_size
+        columns=range(left//size,(right-1)//size+1)
+        rows=range(top//size,(bottom-1)//size+1)
+        if len(columns)*len(rows)>self.max_cells:
+            self.oversized.append(entry)
+            return None
+        for column in columns:
+            for row in rows:
+                self.cells.setdefault((column,row),[]).append(entry)
+
+    def __len__(self)->int:
+        return len(self.entries)
+
+    def row(self,entry:int)->'NodeRow':
+        table,position=self.entries[entry]
+        return table.row_type(table,position)
+
+    def element_at(self,x:int,y:int)->'NodeRow|None':
+        '''Returns the smallest element containing the point, the later one in document order on a tie.'''
+        size=self.cell_size
+        boxes=self.boxes
+        best,best_area=None,None
+        for candidates in (self.cells.get((x//size,y//size),()),self.oversized):
+            for entry in candidates:
+                left,top,right,bottom=boxes[4*entry:4*entry+4]
+                if not (left<=x<right and top<=y<bottom):
+                    continue
+                area=(right-left)*(bottom-top)
+                if best is None or area<best_area or (area==best_area and entry>best):
+                    best,best_area=entry,area
+        return None if best is None else self.row(best)
+
+    def elements_in(self,left:int,top:int,right:int,bottom:int)->list['NodeRow']:
+        '''Returns the elements intersecting the rectangle in document order.'''
+        size=self.cell_size
+        boxes=self.boxes
+        candidates=set(self.oversized)
+        columns=range(left//size,(right-1)//size+1)
+        rows=range(top//size,(bottom-1)//size+1)
+        if len(columns)*len(rows)>len(self.cells):
+            for cell,entries in self.cells.items():
+                if cell[0] in columns and cell[1] in rows:
+                    candidates.update(entries)
+        else:
+            for column in columns:
+                for row in rows:
+                    candidates.update(self.cells.get((column,row),()))
+        matches=[]
+        for entry in sorted(candidates):
+            box_left,box_top,box_right,box_bottom=boxes[4*entry:4*entry+4]
+            if box_left<right and left<box_right and box_top<bottom and top<box_bottom:
+                matches.append(self.row(entry))
+        return matches
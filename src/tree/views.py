@@ -1,25 +1,65 @@
+from src.tree.config import SPATIAL_INDEX_CELL_SIZE, SPATIAL_INDEX_MAX_CELLS
+from src.tree.spatial import SpatialIndex
+from abc import ABC, abstractmethod
 from dataclasses import dataclass,field
-from tabulate import tabulate
+from functools import cached_property
+from typing import Any,Iterable,NamedTuple,Optional
+from array import array
+from threading import Lock
+from time import perf_counter
+from src.tree.serializer import markdown_table
 
 @dataclass
 class TreeState:
-    interactive_nodes:list['TreeElementNode']=field(default_factory=list)
-    informative_nodes:list['TextElementNode']=field(default_factory=list)
-    scrollable_nodes:list['ScrollElementNode']=field(default_factory=list)
+    interactive_nodes:'ElementTable'=field(default_factory=lambda:ElementTable())
+    informative_nodes:'TextTable'=field(default_factory=lambda:TextTable())
+    scrollable_nodes:'ScrollTable'=field(default_factory=lambda:ScrollTable())
+    property_reads:int=0
+    is_truncated:bool=False
+    skipped_subtrees:int=0
+    app_stats:list['AppTraversalStats']=field(default_factory=list)
+    captured_at:float=field(default_factory=perf_counter)
+
+    @cached_property
+    def spatial_index(self)->SpatialIndex:
+        return SpatialIndex.from_tables(self.interactive_nodes,self.scrollable_nodes,cell_size=SPATIAL_INDEX_CELL_SIZE,max_cells=SPATIAL_INDEX_MAX_CELLS)
+
+    def element_at(self,x:int,y:int)->Optional['NodeRow']:
+        return self.spatial_index.element_at(x,y)
+
+    def elements_in(self,left:int,top:int,right:int,bottom:int)->list['NodeRow']:
+        return self.spatial_index.elements_in(left,top,right,bottom)
+
+    def diff(self,previous:'TreeState')->'TreeStateDelta':
+        return TreeStateDelta(
+            interactive=self.interactive_nodes.diff(previous.interactive_nodes),
+            informative=self.informative_nodes.diff(previous.informative_nodes),
+            scrollable=self.scrollable_nodes.diff(previous.scrollable_nodes,len(self.interactive_nodes),len(previous.interactive_nodes)),
+            base_index=len(self.interactive_nodes)
+        )
+
+    def to_columns(self)->dict[str,Any]:
+        return {
+            'interactive':self.interactive_nodes.to_columns(),
+            'informative':self.informative_nodes.to_columns(),
+            'scrollable':self.scrollable_nodes.to_columns(base_index=len(self.interactive_nodes)),
+            'is_truncated':self.is_truncated,
+            'skipped_subtrees':self.skipped_subtrees
+        }
 
     def interactive_elements_to_string(self) -> str:
         if not self.interactive_nodes:
             return "No interactive elements"
         headers = ["Label", "App Name", "ControlType", "Name", "Value", "Shortcut", "Coordinates"]
         rows = [node.to_row(idx) for idx, node in enumerate(self.interactive_nodes)]
-        return tabulate(rows, headers=headers, tablefmt="github")
+        return markdown_table(headers, rows)
 
     def informative_elements_to_string(self) -> str:
         if not self.informative_nodes:
             return "No informative elements"
         headers = ["App Name", "Name"]
         rows = [node.to_row() for node in self.informative_nodes]
-        return tabulate(rows, headers=headers, tablefmt="github")
+        return markdown_table(headers, rows)
 
     def scrollable_elements_to_string(self) -> str:
         if not self.scrollable_nodes:
@@ -30,9 +70,80 @@ class TreeState:
         ]
         base_index = len(self.interactive_nodes)
         rows = [node.to_row(idx, base_index) for idx, node in enumerate(self.scrollable_nodes)]
-        return tabulate(rows, headers=headers, tablefmt="github")
+        return markdown_table(headers, rows)
     
 @dataclass
+class NodeDelta:
+    table:'NodeTable'
+    previous_table:'NodeTable'
+    added:list['NodeRow']=field(default_factory=list)
+    removed:list['NodeRow']=field(default_factory=list)
+    changed:list['NodeRow']=field(default_factory=list)
+    relabeled:list['NodeRow']=field(default_factory=list)
+
+    def __len__(self)->int:
+        return len(self.added)+len(self.removed)+len(self.changed)+len(self.relabeled)
+
+    def to_columns(self,base_index:int=0)->dict[str,dict[str,list]]:
+        removed=self.previous_table.to_columns([node.index for node in self.removed])
+        # Labels of removed elements belong to the earlier snapshot
+        removed.pop('label',None)
+        return {
+            'added':self.table.to_columns([node.index for node in self.added],base_index),
+            'changed':self.table.to_columns([node.index for node in self.changed],base_index),
+            'relabeled':self.table.to_columns([node.index for node in self.relabeled],base_index),
+            'removed':removed
+        }
+
+@dataclass
+class TreeStateDelta:
+    interactive:NodeDelta
+    informative:NodeDelta
+    scrollable:NodeDelta
+    base_index:int
+
+    def __len__(self)->int:
+        return len(self.interactive)+len(self.informative)+len(self.scrollable)
+
+    def to_columns(self)->dict[str,Any]:
+        return {
+            'interactive':self.interactive.to_columns(),
+            'informative':self.informative.to_columns(),
+            'scrollable':self.scrollable.to_columns(self.base_index)
+        }
+
+    def interactive_elements_to_string(self) -> str:
+        if not self.interactive:
+            return "No changes"
+        headers = ["Change", "Label", "App Name", "ControlType", "Name", "Value", "Shortcut", "Coordinates"]
+        rows = [['Added', *node.to_row(node.index)] for node in self.interactive.added]
+        rows += [['Changed', *node.to_row(node.index)] for node in self.interactive.changed]
+        rows += [['Relabeled', *node.to_row(node.index)] for node in self.interactive.relabeled]
+        rows += [['Removed', '', *node.to_row(node.index)[1:]] for node in self.interactive.removed]
+        return markdown_table(headers, rows)
+
+    def informative_elements_to_string(self) -> str:
+        if not self.informative:
+            return "No changes"
+        headers = ["Change", "App Name", "Name"]
+        rows = [['Added', *node.to_row()] for node in self.informative.added]
+        rows += [['Removed', *node.to_row()] for node in self.informative.removed]
+        return markdown_table(headers, rows)
+
+    def scrollable_elements_to_string(self) -> str:
+        if not self.scrollable:
+            return "No changes"
+        headers = [
+            "Change", "Label", "App Name", "ControlType", "Name", "Coordinates",
+            "Horizontal Scrollable", "Horizontal Scroll Percent(%)", "Vertical Scrollable", "Vertical Scroll Percent(%)", "IsFocused"
+        ]
+        rows = [['Added', *node.to_row(node.index, self.base_index)] for node in self.scrollable.added]
+        rows += [['Changed', *node.to_row(node.index, self.base_index)] for node in self.scrollable.changed]
+        rows += [['Relabeled', *node.to_row(node.index, self.base_index)] for node in self.scrollable.relabeled]
+        rows += [['Removed', '', *node.to_row(node.index, self.base_index)[1:]] for node in self.scrollable.removed]
+        return markdown_table(headers, rows)
+
+@dataclass(slots=True)
 class BoundingBox:
     left:int
     top:int
@@ -53,7 +164,7 @@ class BoundingBox:
         x2,y2=self.left+self.width,self.top+self.height
         return x1,y1,x2,y2
 
-@dataclass
+@dataclass(slots=True)
 class Center:
     x:int
     y:int
@@ -61,41 +172,346 @@ class Center:
     def to_string(self)->str:
         return f'({self.x},{self.y})'
 
-@dataclass
-class TreeElementNode:
-    name: str
-    control_type: str
+class ElementRecord(NamedTuple):
+    name:str
+    control_type:str
     value:str
-    shortcut: str
-    bounding_box: BoundingBox
-    center: Center
-    app_name: str
+    shortcut:str
+    left:int
+    top:int
+    right:int
+    bottom:int
+    x:int
+    y:int
+    app_name:str
+
+class TextRecord(NamedTuple):
+    name:str
+    app_name:str
+
+class ScrollRecord(NamedTuple):
+    name:str
+    control_type:str
+    app_name:str
+    left:int
+    top:int
+    right:int
+    bottom:int
+    x:int
+    y:int
+    horizontal_scrollable:bool
+    horizontal_scroll_percent:float
+    vertical_scrollable:bool
+    vertical_scroll_percent:float
+    is_focused:bool
+
+class NodeTable(ABC):
+    '''
+    Columnar storage for the nodes of one kind in a snapshot. Coordinates and flags live in typed arrays, app and
+    control type names are interned once per table, and indexing returns a lightweight row view instead of an object per node.
+    '''
+    row_type:type
+    record_type:type
+    # Whether the rows are numbered, the labels then shift with every row added or removed before them
+    is_labeled:bool=True
+
+    def __init__(self,records:Iterable[tuple]=()):
+        self.strings:list[str]=[]
+        self.string_ids:dict[str,int]={}
+        self.names:list[str]=[]
+        self.app_names=array('I')
+        for record in records:
+            self.append(record)
+
+    def intern(self,value:str)->int:
+        string_id=self.string_ids.get(value)
+        if string_id is None:
+            string_id=len(self.strings)
+            self.strings.append(value)
+            self.string_ids[value]=string_id
+        return string_id
+
+    @abstractmethod
+    def append(self,record:tuple):
+        pass
+
+    @abstractmethod
+    def record(self,index:int)->tuple:
+        pass
+
+    @abstractmethod
+    def to_columns(self,positions:list[int]|None=None,base_index:int=0)->dict[str,list]:
+        '''Returns one array per column for the given rows (all by default), labels start at base_index.'''
+        pass
+
+    def extend(self,records:Iterable[tuple]):
+        if isinstance(records,NodeTable):
+            records=[records.record(index) for index in range(len(records))]
+        for record in records:
+            self.append(record)
+
+    def __len__(self)->int:
+        return len(self.names)
+
+    def __getitem__(self,index:int|slice):
+        if isinstance(index,slice):
+            return [self.row_type(self,position) for position in range(*index.indices(len(self)))]
+        if index<0:
+            index+=len(self)
+        if not 0<=index<len(self):
+            raise IndexError('node index out of range')
+        return self.row_type(self,index)
+
+    def __iter__(self):
+        row_type=self.row_type
+        return (row_type(self,index) for index in range(len(self)))
+
+    def identities(self)->Iterable[tuple[tuple,'NodeRow']]:
+        '''Yields the rows keyed by identity, repeated identities are told apart by their occurrence.'''
+        occurrences:dict[tuple,int]={}
+        for row in self:
+            identity=row.identity()
+            occurrence=occurrences.get(identity,0)
+            occurrences[identity]=occurrence+1
+            yield (identity,occurrence),row
+
+    def diff(self,previous:'NodeTable',base_index:int=0,previous_base_index:int=0)->'NodeDelta':
+        '''Labels start at base_index in this table and at previous_base_index in the previous one.'''
+        previous_rows=dict(previous.identities())
+        delta=NodeDelta(table=self,previous_table=previous)
+        for key,row in self.identities():
+            previous_row=previous_rows.pop(key,None)
+            if previous_row is None:
+                delta.added.append(row)
+            elif previous_row.state()!=row.state():
+                delta.changed.append(row)
+            elif self.is_labeled and base_index+row.index!=previous_base_index+previous_row.index:
+                # Unchanged but under another label, which the client and the screenshot would otherwise disagree on
+                delta.relabeled.append(row)
+        delta.removed.extend(previous_rows.values())
+        return delta
+
+class ElementTable(NodeTable):
+    def __init__(self,records:Iterable[ElementRecord]=()):
+        self.control_types=array('I')
+        self.values:list[str]=[]
+        self.shortcuts:list[str]=[]
+        self.boxes=array('i')
+        self.centers=array('i')
+        super().__init__(records)
+
+    def append(self,record:ElementRecord):
+        self.names.append(record.name)
+        self.control_types.append(self.intern(record.control_type))
+        self.values.append(record.value)
+        self.shortcuts.append(record.shortcut)
+        self.boxes.extend((record.left,record.top,record.right,record.bottom))
+        self.centers.extend((record.x,record.y))
+        self.app_names.append(self.intern(record.app_name))
+
+    def record(self,index:int)->ElementRecord:
+        left,top,right,bottom=self.boxes[4*index:4*index+4]
+        return ElementRecord(
+            name=self.names[index],
+            control_type=self.strings[self.control_types[index]],
+            value=self.values[index],
+            shortcut=self.shortcuts[index],
+            left=left,top=top,right=right,bottom=bottom,
+            x=self.centers[2*index],y=self.centers[2*index+1],
+            app_name=self.strings[self.app_names[index]]
+        )
+
+    def to_columns(self,positions:list[int]|None=None,base_index:int=0)->dict[str,list]:
+        positions=range(len(self)) if positions is None else positions
+        strings,centers=self.strings,self.centers
+        return {
+            'label':[base_index+position for position in positions],
+            'app_name':[strings[self.app_names[position]] for position in positions],
+            'control_type':[strings[self.control_types[position]] for position in positions],
+            'name':[self.names[position] for position in positions],
+            'value':[self.values[position] for position in positions],
+            'shortcut':[self.shortcuts[position] for position in positions],
+            'x':[centers[2*position] for position in positions],
+            'y':[centers[2*position+1] for position in positions]
+        }
+
+class TextTable(NodeTable):
+    is_labeled=False
+
+    def append(self,record:TextRecord):
+        self.names.append(record.name)
+        self.app_names.append(self.intern(record.app_name))
+
+    def record(self,index:int)->TextRecord:
+        return TextRecord(name=self.names[index],app_name=self.strings[self.app_names[index]])
+
+    def to_columns(self,positions:list[int]|None=None,base_index:int=0)->dict[str,list]:
+        positions=range(len(self)) if positions is None else positions
+        strings=self.strings
+        return {
+            'app_name':[strings[self.app_names[position]] for position in positions],
+            'name':[self.names[position] for position in positions]
+        }
+
+class ScrollTable(NodeTable):
+    HORIZONTAL_SCROLLABLE=1
+    VERTICAL_SCROLLABLE=2
+    FOCUSED=4
+
+    def __init__(self,records:Iterable[ScrollRecord]=()):
+        self.control_types=array('I')
+        self.boxes=array('i')
+        self.centers=array('i')
+        self.flags=array('B')
+        self.scroll_percents=array('d')
+        super().__init__(records)
+
+    def append(self,record:ScrollRecord):
+        self.names.append(record.name)
+        self.control_types.append(self.intern(record.control_type))
+        self.app_names.append(self.intern(record.app_name))
+        self.boxes.extend((record.left,record.top,record.right,record.bottom))
+        self.centers.extend((record.x,record.y))
+        self.flags.append(
+            (self.HORIZONTAL_SCROLLABLE if record.horizontal_scrollable else 0)|
+            (self.VERTICAL_SCROLLABLE if record.vertical_scrollable else 0)|
+            (self.FOCUSED if record.is_focused else 0)
+        )
+        self.scroll_percents.extend((record.horizontal_scroll_percent,record.vertical_scroll_percent))
+
+    def record(self,index:int)->ScrollRecord:
+        left,top,right,bottom=self.boxes[4*index:4*index+4]
+        flags=self.flags[index]
+        return ScrollRecord(
+            name=self.names[index],
+            control_type=self.strings[self.control_types[index]],
+            app_name=self.strings[self.app_names[index]],
+            left=left,top=top,right=right,bottom=bottom,
+            x=self.centers[2*index],y=self.centers[2*index+1],
+            horizontal_scrollable=bool(flags&self.HORIZONTAL_SCROLLABLE),
+            horizontal_scroll_percent=self.scroll_percents[2*index],
+            vertical_scrollable=bool(flags&self.VERTICAL_SCROLLABLE),
+            vertical_scroll_percent=self.scroll_percents[2*index+1],
+            is_focused=bool(flags&self.FOCUSED)
+        )
+
+    def to_columns(self,positions:list[int]|None=None,base_index:int=0)->dict[str,list]:
+        positions=range(len(self)) if positions is None else positions
+        strings,centers,flags,scroll_percents=self.strings,self.centers,self.flags,self.scroll_percents
+        return {
+            'label':[base_index+position for position in positions],
+            'app_name':[strings[self.app_names[position]] for position in positions],
+            'control_type':[strings[self.control_types[position]] for position in positions],
+            'name':[self.names[position] for position in positions],
+            'x':[centers[2*position] for position in positions],
+            'y':[centers[2*position+1] for position in positions],
+            'horizontal_scrollable':[bool(flags[position]&self.HORIZONTAL_SCROLLABLE) for position in positions],
+            'horizontal_scroll_percent':[scroll_percents[2*position] for position in positions],
+            'vertical_scrollable':[bool(flags[position]&self.VERTICAL_SCROLLABLE) for position in positions],
+            'vertical_scroll_percent':[scroll_percents[2*position+1] for position in positions],
+            'is_focused':[bool(flags[position]&self.FOCUSED) for position in positions]
+        }
+
+class NodeRow:
+    __slots__=('table','index')
+
+    def __init__(self,table:NodeTable,index:int):
+        self.table=table
+        self.index=index
+
+    @property
+    def name(self)->str:
+        return self.table.names[self.index]
+
+    @property
+    def app_name(self)->str:
+        return self.table.strings[self.table.app_names[self.index]]
+
+    @property
+    def control_type(self)->str:
+        return self.table.strings[self.table.control_types[self.index]]
+
+    @property
+    def bounding_box(self)->BoundingBox:
+        left,top,right,bottom=self.table.boxes[4*self.index:4*self.index+4]
+        return BoundingBox(left=left,top=top,right=right,bottom=bottom,width=right-left,height=bottom-top)
+
+    @property
+    def center(self)->Center:
+        return Center(x=self.table.centers[2*self.index],y=self.table.centers[2*self.index+1])
+
+    def to_record(self)->tuple:
+        return self.table.record(self.index)
+
+    def identity(self)->tuple:
+        '''What makes the element the same one across snapshots.'''
+        return (self.app_name,self.control_type,self.name,*self.table.boxes[4*self.index:4*self.index+4])
+
+    def state(self)->tuple:
+        '''What may change on the same element between snapshots.'''
+        return ()
+
+    def __eq__(self,other)->bool:
+        return isinstance(other,NodeRow) and self.to_record()==other.to_record()
+
+    def __repr__(self)->str:
+        return repr(self.to_record())
+
+class TreeElementNode(NodeRow):
+    __slots__=()
+
+    @property
+    def value(self)->str:
+        return self.table.values[self.index]
+
+    @property
+    def shortcut(self)->str:
+        return self.table.shortcuts[self.index]
+
+    def state(self)->tuple:
+        return (self.value,self.shortcut)
 
     def to_row(self, index: int):
-        return [index, self.app_name, self.control_type, self.name, self.value, self.shortcut, self.center.to_string()]
+        table,position=self.table,self.index
+        strings=table.strings
+        center=f'({table.centers[2*position]},{table.centers[2*position+1]})'
+        return [index, strings[table.app_names[position]], strings[table.control_types[position]], table.names[position], table.values[position], table.shortcuts[position], center]
 
+class TextElementNode(NodeRow):
+    __slots__=()
 
-@dataclass
-class TextElementNode:
-    name: str
-    app_name: str
+    def identity(self)->tuple:
+        return (self.app_name,self.name)
 
     def to_row(self):
         return [self.app_name, self.name]
 
+class ScrollElementNode(NodeRow):
+    __slots__=()
 
-@dataclass
-class ScrollElementNode:
-    name: str
-    control_type: str
-    app_name: str
-    bounding_box: BoundingBox
-    center: Center
-    horizontal_scrollable: bool
-    horizontal_scroll_percent: float
-    vertical_scrollable: bool
-    vertical_scroll_percent: float
-    is_focused: bool
+    @property
+    def horizontal_scrollable(self)->bool:
+        return bool(self.table.flags[self.index]&ScrollTable.HORIZONTAL_SCROLLABLE)
+
+    @property
+    def horizontal_scroll_percent(self)->float:
+        return self.table.scroll_percents[2*self.index]
+
+    @property
+    def vertical_scrollable(self)->bool:
+        return bool(self.table.flags[self.index]&ScrollTable.VERTICAL_SCROLLABLE)
+
+    @property
+    def vertical_scroll_percent(self)->float:
+        return self.table.scroll_percents[2*self.index+1]
+
+    @property
+    def is_focused(self)->bool:
+        return bool(self.table.flags[self.index]&ScrollTable.FOCUSED)
+
+    def state(self)->tuple:
+        # The center is a random point inside the box, it is left out
+        return (self.table.flags[self.index],self.horizontal_scroll_percent,self.vertical_scroll_percent)
 
     def to_row(self, index: int, base_index: int):
         return [
@@ -110,3 +526,131 @@ class ScrollElementNode:
             self.vertical_scroll_percent,
             self.is_focused
         ]
+
+ElementTable.row_type=TreeElementNode
+TextTable.row_type=TextElementNode
+ScrollTable.row_type=ScrollElementNode
+
+@dataclass
+class TraversalContext:
+    app_name: str
+    is_browser: bool=False
+    is_dom: bool=False
+    is_dialog: bool=False
+
+@dataclass
+class TraversalResult:
+    interactive_nodes:list[ElementRecord]=field(default_factory=list)
+    dom_interactive_nodes:list[ElementRecord]=field(default_factory=list)
+    informative_nodes:list[TextRecord]=field(default_factory=list)
+    scrollable_nodes:list[ScrollRecord]=field(default_factory=list)
+
+    def extend(self,other:'TraversalResult'):
+        self.interactive_nodes.extend(other.interactive_nodes)
+        self.dom_interactive_nodes.extend(other.dom_interactive_nodes)
+        self.informative_nodes.extend(other.informative_nodes)
+        self.scrollable_nodes.extend(other.scrollable_nodes)
+
+    def reset(self,reset:str|None):
+        match reset:
+            case 'interactive':
+                self.interactive_nodes.clear()
+            case 'dom':
+                self.dom_interactive_nodes.clear()
+            case _:
+                pass
+
+    def to_tuple(self)->tuple[list[ElementRecord],list[TextRecord],list[ScrollRecord]]:
+        return (self.interactive_nodes+self.dom_interactive_nodes,self.informative_nodes,self.scrollable_nodes)
+
+@dataclass(eq=False)
+class TraversalNode:
+    element:Any
+    context:TraversalContext
+    result:TraversalResult=field(default_factory=TraversalResult)
+    reset:str|None=None
+    is_pruned:bool=False
+    is_truncated:bool=False
+    attempts:int=0
+    runtime_id:tuple[int,...]|None=None
+    parent:Optional['TraversalNode']=field(default=None,repr=False)
+    children:list['TraversalNode']=field(default_factory=list)
+
+    def add_child(self,child:'TraversalNode'):
+        child.parent=self
+        self.children.append(child)
+
+    def walk(self):
+        stack=[self]
+        while stack:
+            node=stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def has_ancestor_in(self,nodes:set['TraversalNode'])->bool:
+        node=self.parent
+        while node is not None:
+            if node in nodes:
+                return True
+            node=node.parent
+        return False
+
+    def collect(self,result:TraversalResult):
+        '''Replays the per element results in document order, applying the resets on the way.'''
+        stack=[self]
+        while stack:
+            node=stack.pop()
+            result.reset(node.reset)
+            result.extend(node.result)
+            stack.extend(reversed(node.children))
+
+@dataclass
+class TraversalBudget:
+    deadline:float|None=None
+    max_nodes:int|None=None
+    visited_nodes:int=0
+    skipped_subtrees:int=0
+    is_truncated:bool=False
+    app_stats:dict[str,'AppTraversalStats']=field(default_factory=dict)
+    lock:Lock=field(default_factory=Lock,repr=False)
+
+    @classmethod
+    def from_limits(cls,time_budget:float|None=None,node_budget:int|None=None)->'TraversalBudget':
+        deadline=perf_counter()+time_budget if time_budget is not None else None
+        return cls(deadline=deadline,max_nodes=node_budget)
+
+    @property
+    def is_bounded(self)->bool:
+        return self.deadline is not None or self.max_nodes is not None
+
+    def is_exhausted(self)->bool:
+        if self.max_nodes is not None and self.visited_nodes>=self.max_nodes:
+            return True
+        return self.deadline is not None and perf_counter()>=self.deadline
+
+    def spend(self):
+        with self.lock:
+            self.visited_nodes+=1
+
+    def skip(self,subtrees:int):
+        with self.lock:
+            self.skipped_subtrees+=subtrees
+            self.is_truncated=True
+
+    def record_failure(self,app_name:str,error:Exception,wasted_time:float,is_retried:bool):
+        with self.lock:
+            app_stats=self.app_stats.setdefault(app_name,AppTraversalStats(app_name=app_name))
+            app_stats.wasted_time+=wasted_time
+            if is_retried:
+                app_stats.retries+=1
+            else:
+                app_stats.failed_subtrees+=1
+                app_stats.errors.append(f'{type(error).__name__}: {error}')
+
+@dataclass
+class AppTraversalStats:
+    app_name:str
+    retries:int=0
+    failed_subtrees:int=0
+    wasted_time:float=0.0
+    errors:list[str]=field(default_factory=list)
@@ -0,0 +1,181 @@
+from src.web.views import CacheEntry, ScrapeResult, ScrapePage
+from collections import OrderedDict
+from threading import Lock
+from time import time
+import hashlib
+import json
+import sys
+import os
+
+class MemoryCache:
+    '''Converted pages by URL, the least recently used one is dropped past max_entries.'''
+    def __init__(self,max_entries:int=64):
+        self.max_entries=max_entries
+        self.entries:OrderedDict[str,CacheEntry]=OrderedDict()
+
+    def get(self,url:str)->CacheEntry|None:
+        entry=self.entries.get(url)
+        if entry is not None:
+            self.entries.move_to_end(url)
+        return entry
+
+    def put(self,entry:CacheEntry):
+        self.entries[entry.url]=entry
+        self.entries.move_to_end(entry.url)
+        while len(self.entries)>self.max_entries:
+            self.entries.popitem(last=False)
+
+    def remove(self,url:str):
+        self.entries.pop(url,None)
+
+class DiskCache:
+    '''
+    Converted pages as one JSON file per URL in a folder. The sizes of the files are read once and kept up to date, a
+    write that takes the folder past max_bytes removes the files least recently used, going by their modification time,
+    which a read refreshes.
+    '''
+    def __init__(self,directory:str,max_bytes:int=64*1024*1024):
+        self.directory=directory
+        self.max_bytes=max_bytes
+        self.sizes:dict[str,tuple[int,float]]|None=None
+        self.total=0
+        self.lock=Lock()
+
+    def get_path(self,url:str)->str:
+        return os.path.join(self.directory,f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json")
+
+    def load_sizes(self):
+        if self.sizes is not None:
+            return None
+        self.sizes={}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.json') and entry.is_file():
+                        stat=entry.stat()
+                        self.sizes[entry.path]=(stat.st_size,stat.st_mtime)
+        except OSError:
+            pass
+        self.total=sum(size for size,_ in self.sizes.values())
+
+    def get(self,url:str)->CacheEntry|None:
+        path=self.get_path(url)
+        try:
+            with open(path,encoding='utf-8') as file:
+                data=json.load(file)
+            entry=CacheEntry(**data)
+        except FileNotFoundError:
+            return None
+        except (OSError,ValueError,TypeError) as ex:
+            print(f"Error: {ex}",file=sys.stderr)
+            return None
+        if entry.url!=url:
+            return None
+        try:
+            os.utime(path)
+            with self.lock:
+                if self.sizes is not None and path in self.sizes:
+                    self.sizes[path]=(self.sizes[path][0],os.path.getmtime(path))
+        except OSError:
+            pass
+        return entry
+
+    def put(self,entry:CacheEntry):
+        path=self.get_path(entry.url)
+        data=json.dumps(entry.to_dict(),ensure_ascii=False).encode('utf-8')
+        if len(data)>self.max_bytes:
+            return None
+        with self.lock:
+            self.load_sizes()
+            try:
+                os.makedirs(self.directory,exist_ok=True)
+                temporary_path=f'{path}.tmp'
+                with open(temporary_path,'wb') as file:
+                    file.write(data)
+                os.replace(temporary_path,path)
+            except OSError as ex:
+                print(f"Error: {ex}",file=sys.stderr)
+                return None
+            previous,_=self.sizes.get(path,(0,0.0))
+            self.sizes[path]=(len(data),os.path.getmtime(path))
+            self.total+=len(data)-previous
+            self.evict(keep=path)
+
+    def evict(self,keep:str):
+        if self.total<=self.max_bytes:
+            return None
+        for path,(size,_) in sorted(self.sizes.items(),key=lambda item: item[1][1]):
+            if self.total<=self.max_bytes:
+                break
+            if path==keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as ex:
+                print(f"Error: {ex}",file=sys.stderr)
+                continue
+            del self.sizes[path]
+            self.total-=size
+
+    def remove(self,url:str):
+        path=self.get_path(url)
+        with self.lock:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            if self.sizes is not None and path in self.sizes:
+                self.total-=self.sizes.pop(path)[0]
+
+def split_pages(markdown:str,size:int)->list[str]:
+    '''Cuts the markdown into pages of at most size characters, at a paragraph break where there is one, else a line.'''
+    pages,start=[],0
+    while len(markdown)-start>size:
+        end=start+size
+        cut=markdown.rfind('\n\n',start,end)
+        if cut>start:
+            cut+=2
+        else:
+            cut=markdown.rfind('\n',start,end)
+            cut=cut+1 if cut>start else end
+        pages.append(markdown[start:cut])
+        start=cut
+    pages.append(markdown[start:])
+    return pages
+
+class PageCache:
+    '''
+    Scraped pages split into pages of markdown, under a short key made from the URL and the markdown, so the same
+    content gets the same key. A page set is dropped ttl seconds after it was last read or past max_entries.
+    '''
+    def __init__(self,page_size:int=20000,ttl:float=600.0,max_entries:int=32):
+        self.page_size=page_size
+        self.ttl=ttl
+        self.max_entries=max_entries
+        self.entries:OrderedDict[str,tuple[ScrapeResult,list[str],float]]=OrderedDict()
+
+    def add(self,result:ScrapeResult)->ScrapePage:
+        '''Splits the result and returns its first page.'''
+        key=hashlib.sha256(f'{result.url}\n{result.markdown}'.encode('utf-8')).hexdigest()[:12]
+        if key not in self.entries:
+            self.entries[key]=(result,split_pages(result.markdown,self.page_size),time())
+        return self.get(key,1)
+
+    def get(self,key:str,page:int)->ScrapePage|None:
+        now=time()
+        # Expired page sets are dropped on the way
+        for expired in [stale for stale,(_,_,used_at) in self.entries.items() if now-used_at>self.ttl]:
+            del self.entries[expired]
+        entry=self.entries.get(key)
+        if entry is None:
+            return None
+        result,pages,_=entry
+        if not 1<=page<=len(pages):
+            raise ValueError(f'Page {page} does not exist, the webpage has {len(pages)} pages.')
+        self.entries[key]=(result,pages,now)
+        self.entries.move_to_end(key)
+        while len(self.entries)>self.max_entries:
+            self.entries.popitem(last=False)
+        return ScrapePage(url=result.url,markdown=pages[page-1],page=page,pages=len(pages),key=key,is_truncated=result.is_truncated)
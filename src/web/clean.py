@@ -0,0 +1,125 @@
+from html.parser import HTMLParser
+from html import escape
+
+# Elements dropped with everything inside them, and the roles that mark an element as one of them
+SKIPPED_TAGS=frozenset(['script','style','noscript','template','svg','canvas','iframe','object','nav','aside'])
+SKIPPED_ROLES=frozenset(['navigation','complementary','search'])
+
+# Page chrome, dropped unless it is inside the main content, where it holds the heading of an article
+CHROME_TAGS=frozenset(['header','footer'])
+CHROME_ROLES=frozenset(['banner','contentinfo'])
+CONTENT_TAGS=frozenset(['main','article'])
+
+# Elements that never have an end tag, each is kept or dropped on its own
+VOID_TAGS=frozenset(['area','base','br','col','embed','hr','img','input','keygen','link','meta','param','source','track','wbr'])
+
+# Elements whose end tag may be left out, by the start tags that end them then, the end tag of a parent ends them too
+BLOCK_TAGS=frozenset([
+    'address','article','aside','blockquote','details','dialog','div','dl','fieldset','figcaption','figure','footer','form',
+    'h1','h2','h3','h4','h5','h6','header','hgroup','hr','main','menu','nav','ol','p','pre','section','table','ul'
+])
+OPTIONAL_END_TAGS={
+    'p':BLOCK_TAGS|{'li','dt','dd'},'li':frozenset(['li']),'dt':frozenset(['dt','dd']),'dd':frozenset(['dt','dd']),
+    'option':frozenset(['option','optgroup']),'optgroup':frozenset(['optgroup']),'rt':frozenset(['rt','rp']),'rp':frozenset(['rt','rp']),
+    'thead':frozenset(['tbody','tfoot']),'tbody':frozenset(['tbody','tfoot']),'tfoot':frozenset(),'tr':frozenset(['tr','tbody','tfoot','thead']),
+    'td':frozenset(['td','th','tr','tbody','tfoot','thead']),'th':frozenset(['td','th','tr','tbody','tfoot','thead']),'colgroup':frozenset()
+}
+
+class BoilerplateStripper(HTMLParser):
+    '''
+    Fed a page in pieces as it downloads, keeps the HTML of its content and drops scripts, styles, navigation, page
+    headers and footers, hidden elements and comments on the way, so the page is never held or parsed whole.
+    '''
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts:list[str]=[]
+        self.chunks:list[str]=[]
+        self.skipped_tag:str|None=None
+        self.skipped_depth=0
+        self.skipped_open:list[str]=[]
+        self.content_depth=0
+
+    def is_skipped(self,tag:str,attrs:list[tuple[str,str|None]])->bool:
+        if tag in SKIPPED_TAGS:
+            return True
+        attributes=dict(attrs)
+        if 'hidden' in attributes or attributes.get('aria-hidden')=='true' or attributes.get('role') in SKIPPED_ROLES:
+            return True
+        if self.content_depth:
+            return False
+        return tag in CHROME_TAGS or attributes.get('role') in CHROME_ROLES
+
+    def handle_starttag(self,tag:str,attrs:list[tuple[str,str|None]]):
+        if tag in VOID_TAGS:
+            return self.handle_startendtag(tag,attrs)
+        if self.skipped_tag in OPTIONAL_END_TAGS:
+            if self.is_skip_ended_by(tag):
+                self.end_skip()
+            else:
+                self.skipped_open.append(tag)
+                return None
+        elif self.skipped_tag is not None:
+            # Only the nesting of the skipped element matters until it is closed
+            self.skipped_depth+=tag==self.skipped_tag
+            return None
+        if self.is_skipped(tag,attrs):
+            self.skipped_tag,self.skipped_depth=tag,1
+            return None
+        self.content_depth+=tag in CONTENT_TAGS
+        self.parts.append(self.get_starttag_text())
+
+    def handle_startendtag(self,tag:str,attrs:list[tuple[str,str|None]]):
+        if self.skipped_tag is None and not self.is_skipped(tag,attrs):
+            self.parts.append(self.get_starttag_text())
+
+    def is_skip_ended_by(self,tag:str)->bool:
+        '''
+        Whether the start tag ends the skipped element whose end tag may be left out. A p ends at any block, the others
+        at a sibling, unless an element opened within them is still open that the tag does not end as well.
+        '''
+        if tag not in OPTIONAL_END_TAGS[self.skipped_tag]:
+            return False
+        return self.skipped_tag=='p' or all(tag in OPTIONAL_END_TAGS.get(open_tag,()) for open_tag in self.skipped_open)
+
+    def end_skip(self):
+        self.skipped_tag,self.skipped_depth=None,0
+        self.skipped_open.clear()
+
+    def handle_endtag(self,tag:str):
+        if self.skipped_tag in OPTIONAL_END_TAGS:
+            if tag in self.skipped_open:
+                # Elements opened within and left open end with the one closed
+                del self.skipped_open[len(self.skipped_open)-1-self.skipped_open[::-1].index(tag):]
+                return None
+            is_own=tag==self.skipped_tag
+            self.end_skip()
+            if is_own:
+                return None
+            # Otherwise it is the end tag of a parent, which ended the skipped element first and is handled as usual
+        elif self.skipped_tag is not None:
+            if tag==self.skipped_tag:
+                self.skipped_depth-=1
+                if not self.skipped_depth:
+                    self.end_skip()
+            return None
+        if tag in CONTENT_TAGS and self.content_depth:
+            self.content_depth-=1
+        self.parts.append(f'</{tag}>')
+
+    def handle_data(self,data:str):
+        if self.skipped_tag is None:
+            self.parts.append(escape(data,quote=False))
+
+    def feed(self,data:str):
+        super().feed(data)
+        # One string per piece fed, the small ones of every tag and text would take more memory than the page
+        if self.parts:
+            self.chunks.append(''.join(self.parts))
+            self.parts.clear()
+
+    def get_html(self)->str:
+        '''Ends the parse and returns the kept HTML.'''
+        self.close()
+        html=''.join(self.chunks)+''.join(self.parts)
+        self.chunks,self.parts=[],[]
+        return html
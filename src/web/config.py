@@ -0,0 +1,28 @@
+import os
+
+# Seconds a page may take to download, connections kept open in total and to one host, and seconds an idle one stays open
+SCRAPE_TIMEOUT=10.0
+SCRAPE_CONNECTIONS=16
+SCRAPE_CONNECTIONS_PER_HOST=4
+SCRAPE_KEEPALIVE=30.0
+
+# Pages whose markdown is kept in memory, least recently used ones are dropped first
+SCRAPE_MEMORY_ENTRIES=64
+
+# Folder of the on-disk markdown cache and the bytes it may take, least recently used pages are removed beyond that
+SCRAPE_CACHE_DIR=os.path.join(os.path.expanduser('~'),'.windows-mcp','scrape')
+SCRAPE_CACHE_MAX_BYTES=64*1024*1024
+
+# Seconds a cached page is served without asking the server, after that it is revalidated with ETag/Last-Modified
+SCRAPE_FRESH_FOR=60.0
+
+# Pages one Scrape-Tool call may fetch at once
+SCRAPE_MAX_URLS=8
+
+# Bytes of a page body that are read, the rest is left unread, and the size of the pieces it is read and parsed in
+SCRAPE_MAX_BYTES=2*1024*1024
+SCRAPE_CHUNK_SIZE=65536
+
+# Characters of markdown per page of a Scrape-Tool result, and seconds the other pages stay available to a cursor
+SCRAPE_PAGE_SIZE=20000
+SCRAPE_PAGE_TTL=600.0
@@ -0,0 +1,159 @@
+from src.web.views import CacheEntry, ScrapeResult, ScrapePage, ScrapeStats
+from src.web.cache import MemoryCache, DiskCache, PageCache
+from src.web.clean import BoilerplateStripper
+from typing import Callable
+from time import time
+import asyncio
+import codecs
+
+class WebFetcher:
+    '''
+    Fetches pages as markdown over one shared aiohttp session, whose connections are pooled and kept alive between
+    calls. Converted pages are kept in memory and on disk. A page younger than fresh_for is served from there, an older
+    one is revalidated with its ETag or Last-Modified and only downloaded and converted again when it changed.
+    Concurrent fetches of the same URL share one request. A body is stripped of its boilerplate while it streams in and
+    read up to max_bytes, the markdown is handed out in pages that stay available under a cursor for a while.
+    '''
+    def __init__(self,convert:Callable[[str],str],memory_entries:int=64,cache_dir:str|None=None,cache_max_bytes:int=64*1024*1024,
+                 fresh_for:float=60.0,timeout:float=10.0,connections:int=16,connections_per_host:int=4,keepalive:float=30.0,
+                 max_bytes:int=2*1024*1024,chunk_size:int=65536,page_size:int=20000,page_ttl:float=600.0):
+        self.convert=convert
+        self.memory=MemoryCache(max_entries=memory_entries)
+        self.disk=DiskCache(cache_dir,max_bytes=cache_max_bytes) if cache_dir is not None else None
+        self.fresh_for=fresh_for
+        self.timeout=timeout
+        self.connections=connections
+        self.connections_per_host=connections_per_host
+        self.keepalive=keepalive
+        self.session=None
+        self.max_bytes=max_bytes
+        self.chunk_size=chunk_size
+        self.pages=PageCache(page_size=page_size,ttl=page_ttl)
+        self.pending:dict[str,asyncio.Task]={}
+        self.stats=ScrapeStats()
+
+    def get_session(self):
+        '''The session is made on first use, inside the running loop, which keeps aiohttp out of the server start.'''
+        if self.session is None or self.session.closed:
+            import aiohttp
+            connector=aiohttp.TCPConnector(limit=self.connections,limit_per_host=self.connections_per_host,keepalive_timeout=self.keepalive)
+            self.session=aiohttp.ClientSession(connector=connector,timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            session,self.session=self.session,None
+            await session.close()
+
+    async def get_cached(self,url:str)->tuple[CacheEntry|None,str]:
+        entry=self.memory.get(url)
+        if entry is not None:
+            return entry,'memory'
+        if self.disk is not None:
+            entry=await asyncio.to_thread(self.disk.get,url)
+            if entry is not None:
+                self.memory.put(entry)
+                return entry,'disk'
+        return None,''
+
+    async def store(self,entry:CacheEntry):
+        self.memory.put(entry)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.put,entry)
+
+    async def forget(self,url:str):
+        self.memory.remove(url)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.remove,url)
+
+    async def fetch(self,url:str)->ScrapeResult:
+        task=self.pending.get(url)
+        if task is not None:
+            self.stats.coalesced+=1
+            return await asyncio.shield(task)
+        task=asyncio.ensure_future(self.load(url))
+        self.pending[url]=task
+        task.add_done_callback(lambda _: self.pending.pop(url,None))
+        return await asyncio.shield(task)
+
+    async def fetch_many(self,urls:list[str])->list[ScrapeResult|Exception]:
+        '''Fetches the pages side by side, a page that fails gives its exception in its place.'''
+        return await asyncio.gather(*(self.fetch(url) for url in urls),return_exceptions=True)
+
+    async def load(self,url:str)->ScrapeResult:
+        entry,source=await self.get_cached(url)
+        if entry is not None and time()-entry.fetched_at<self.fresh_for:
+            if source=='memory':
+                self.stats.memory_hits+=1
+            else:
+                self.stats.disk_hits+=1
+            return ScrapeResult(url=url,markdown=entry.markdown,status=200,source=source,is_truncated=entry.is_truncated)
+        headers={}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match']=entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since']=entry.last_modified
+        async with self.get_session().get(url,headers=headers) as response:
+            if response.status==304 and entry is not None:
+                self.stats.revalidations+=1
+                entry.fetched_at=0.0 if 'no-cache' in response.headers.get('Cache-Control','').lower() else time()
+                entry.etag=response.headers.get('ETag',entry.etag)
+                entry.last_modified=response.headers.get('Last-Modified',entry.last_modified)
+                await self.store(entry)
+                return ScrapeResult(url=url,markdown=entry.markdown,status=200,source='revalidated',is_truncated=entry.is_truncated)
+            html,is_truncated=await self.read_body(response)
+            status=response.status
+            etag=response.headers.get('ETag')
+            last_modified=response.headers.get('Last-Modified')
+            cache_control=response.headers.get('Cache-Control','').lower()
+        self.stats.downloads+=1
+        # Converting a large page takes long enough to stall the other tools on the loop
+        markdown=await asyncio.to_thread(self.convert,html)
+        if status==200 and 'no-store' not in cache_control:
+            # A no-cache page is kept but revalidated every time
+            fetched_at=0.0 if 'no-cache' in cache_control else time()
+            await self.store(CacheEntry(url=url,markdown=markdown,etag=etag,last_modified=last_modified,fetched_at=fetched_at,is_truncated=is_truncated))
+        elif entry is not None:
+            await self.forget(url)
+        return ScrapeResult(url=url,markdown=markdown,status=status,source='network',is_truncated=is_truncated)
+
+    async def read_body(self,response)->tuple[str,bool]:
+        '''
+        Streams the body through the boilerplate stripper and returns the HTML it kept, and whether the body was cut at
+        max_bytes. Each piece is decoded and parsed on a thread as it arrives.
+        '''
+        try:
+            decoder=codecs.getincrementaldecoder(response.charset or 'utf-8')(errors='replace')
+        except LookupError:
+            decoder=codecs.getincrementaldecoder('utf-8')(errors='replace')
+        stripper=BoilerplateStripper()
+        received,is_truncated=0,False
+        async for chunk in response.content.iter_chunked(self.chunk_size):
+            if received+len(chunk)>self.max_bytes:
+                chunk,is_truncated=chunk[:self.max_bytes-received],True
+            received+=len(chunk)
+            await asyncio.to_thread(stripper.feed,decoder.decode(chunk))
+            if is_truncated:
+                # The rest of the body is not read, the connection is closed instead of reused
+                response.close()
+                break
+        def finish()->str:
+            stripper.feed(decoder.decode(b'',final=True))
+            return stripper.get_html()
+        return await asyncio.to_thread(finish),is_truncated
+
+    def paginate(self,result:ScrapeResult)->ScrapePage:
+        '''The first page of the result, the others are kept for get_page.'''
+        return self.pages.add(result)
+
+    def get_page(self,cursor:str)->ScrapePage:
+        key,_,page=cursor.rpartition(':')
+        try:
+            page=int(page)
+        except ValueError:
+            raise ValueError(f'Invalid cursor {cursor!r}.')
+        result=self.pages.get(key,page)
+        if result is None:
+            raise ValueError(f'The cursor {cursor!r} expired, scrape the webpage again for its first page.')
+        return result
@@ -0,0 +1,60 @@
+from dataclasses import dataclass
+
+@dataclass
+class CacheEntry:
+    url:str
+    markdown:str
+    etag:str|None=None
+    last_modified:str|None=None
+    fetched_at:float=0.0 # When the server last confirmed the page, fresh or revalidated
+    is_truncated:bool=False
+
+    @property
+    def size(self)->int:
+        return len(self.markdown.encode('utf-8'))
+
+    def to_dict(self)->dict:
+        return {'url':self.url,'markdown':self.markdown,'etag':self.etag,'last_modified':self.last_modified,'fetched_at':self.fetched_at,'is_truncated':self.is_truncated}
+
+@dataclass
+class ScrapeResult:
+    url:str
+    markdown:str
+    status:int
+    source:str # 'network', 'revalidated', 'memory' or 'disk'
+    is_truncated:bool=False
+
+@dataclass
+class ScrapePage:
+    url:str
+    markdown:str
+    page:int
+    pages:int
+    key:str
+    is_truncated:bool=False
+
+    @property
+    def next_cursor(self)->str|None:
+        return f'{self.key}:{self.page+1}' if self.page<self.pages else None
+
+    def to_string(self)->str:
+        if self.pages==1:
+            content=f'Scraped the contents of the entire webpage:\n{self.markdown}'
+        else:
+            content=f'Scraped page {self.page} of {self.pages} of the webpage:\n{self.markdown}'
+        if self.next_cursor is not None:
+            content+=f'\n\nThe webpage continues, pass cursor="{self.next_cursor}" for page {self.page+1}.'
+        if self.is_truncated:
+            content+='\n\nThe webpage is larger than the download limit, only its beginning was read.'
+        return content
+
+@dataclass
+class ScrapeStats:
+    downloads:int=0
+    revalidations:int=0
+    memory_hits:int=0
+    disk_hits:int=0
+    coalesced:int=0
+
+    def to_string(self):
+        return f'Downloads: {self.downloads}, Revalidated: {self.revalidations}, Memory hits: {self.memory_hits}, Disk hits: {self.disk_hits}, Coalesced: {self.coalesced}'
@@ -0,0 +1,105 @@
+'''
+Compares the old Scrape-Tool path, the whole body read with requests and converted by markdownify, with the streamed
+one, stripped while it downloads, cut at SCRAPE_MAX_BYTES and handed out a page at a time, on a large synthetic page
+served from a local aiohttp server. Latency and peak memory are measured in separate runs, tracemalloc slows the parse
+down. Run from the repository root:
+
+    python -m tests.bench_scrape --megabytes 5 --repeat 3
+'''
+from src.web.config import SCRAPE_MAX_BYTES, SCRAPE_CHUNK_SIZE, SCRAPE_PAGE_SIZE
+from src.web.service import WebFetcher
+from statistics import median
+from time import perf_counter
+from threading import Thread, Event
+from aiohttp import web
+import tracemalloc
+import argparse
+import asyncio
+import requests
+
+BLOCK='''<header role="banner"><a href="/"><img src="/logo.png" alt="Logo"></a><nav><ul>{links}</ul></nav></header>
+<script>window.dataLayer=window.dataLayer||[];function track(){{dataLayer.push(arguments)}}track('view',{index});</script>
+<style>.article-{index}{{margin:0 auto;max-width:42rem}}.article-{index} p{{line-height:1.6}}</style>
+<aside><h3>Related</h3><ul>{links}</ul></aside>
+<article class="article-{index}"><h2>Section {index}</h2>{paragraphs}<img src="/figure-{index}.png" alt="Figure {index}"><br>
+<input type="hidden" name="token" value="{index}"><img src="/pixel.gif" hidden><p>Closing remark {index}.</p></article>
+<footer role="contentinfo"><p>Copyright</p><ul>{links}</ul></footer>
+'''
+
+def make_page(size:int)->bytes:
+    '''A page of about size bytes, made of blocks of navigation, scripts, styles, an article and a footer.'''
+    links=''.join(f'<li><a href="/page/{index}">Link {index}</a></li>' for index in range(20))
+    paragraphs=''.join(f'<p>Paragraph {index} of the article, with <b>bold</b> and <a href="/more">a link</a>. {"Lorem ipsum dolor sit amet. "*6}</p>' for index in range(8))
+    blocks,total,index=[],0,0
+    while total<size:
+        block=BLOCK.format(index=index,links=links,paragraphs=paragraphs)
+        blocks.append(block)
+        total+=len(block)
+        index+=1
+    return f'<!DOCTYPE html><html><head><title>Benchmark</title></head><body>{"".join(blocks)}</body></html>'.encode('utf-8')
+
+def to_markdown(html:str)->str:
+    from markdownify import markdownify
+    return markdownify(html=html)
+
+def scrape_whole(url:str)->str:
+    '''Scrape-Tool as it was: the body is read whole, converted whole and returned whole.'''
+    response=requests.get(url,timeout=60)
+    return f'Scraped the contents of the entire webpage:\n{to_markdown(response.text)}'
+
+def scrape_streamed(url:str)->str:
+    async def scrape()->str:
+        fetcher=WebFetcher(convert=to_markdown,timeout=60.0,max_bytes=SCRAPE_MAX_BYTES,chunk_size=SCRAPE_CHUNK_SIZE,page_size=SCRAPE_PAGE_SIZE)
+        try:
+            result=await fetcher.fetch(url)
+            return fetcher.paginate(result).to_string()
+        finally:
+            await fetcher.close()
+    return asyncio.run(scrape())
+
+def serve(page:bytes)->str:
+    '''Serves the page on a free local port from a thread of its own and returns its URL.'''
+    started,urls=Event(),[]
+    async def run():
+        async def handle(request):
+            return web.Response(body=page,content_type='text/html',charset='utf-8')
+        app=web.Application()
+        app.router.add_get('/',handle)
+        runner=web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner,'127.0.0.1',0).start()
+        urls.append(f'http://127.0.0.1:{runner.addresses[0][1]}/')
+        started.set()
+        await asyncio.Event().wait()
+    Thread(target=asyncio.run,args=(run(),),daemon=True).start()
+    started.wait()
+    return urls[0]
+
+def measure(scrape,url:str,repeat:int)->tuple[float,float,int]:
+    '''Median seconds of the runs, peak traced megabytes of one more run, and characters returned.'''
+    latencies=[]
+    for _ in range(repeat):
+        start=perf_counter()
+        content=scrape(url)
+        latencies.append(perf_counter()-start)
+    tracemalloc.start()
+    scrape(url)
+    _,peak=tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return median(latencies),peak/2**20,len(content)
+
+def main():
+    parser=argparse.ArgumentParser(description='Peak memory and latency of the whole and the streamed Scrape-Tool paths.')
+    parser.add_argument('--megabytes',type=float,default=5.0,help='size of the synthetic page')
+    parser.add_argument('--repeat',type=int,default=3,help='timed runs of each path, the median is reported')
+    args=parser.parse_args()
+    page=make_page(int(args.megabytes*2**20))
+    url=serve(page)
+    print(f'Page: {len(page)/2**20:.1f} MB, download limit {SCRAPE_MAX_BYTES/2**20:.1f} MB, page size {SCRAPE_PAGE_SIZE} characters')
+    print(f'{"Path":<10}{"Latency (s)":>14}{"Peak (MB)":>12}{"Returned (chars)":>20}')
+    for name,scrape in (('whole',scrape_whole),('streamed',scrape_streamed)):
+        latency,peak,returned=measure(scrape,url,args.repeat)
+        print(f'{name:<10}{latency:>14.2f}{peak:>12.1f}{returned:>20,}')
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,108 @@
+from contextlib import redirect_stderr, redirect_stdout
+from tempfile import TemporaryDirectory
+import unittest
+import io
+import os
+
+from src.desktop.catalog import StartMenuCatalog, parse_start_apps
+
+try:
+    from src.desktop.matcher import NameMatcher
+except ImportError:
+    NameMatcher=None
+
+FIXTURE='''"Name","AppID"
+"Notepad","Microsoft.Windows.Notepad"
+"Visual Studio Code","Microsoft.VisualStudioCode"
+"Calculator","Microsoft.WindowsCalculator_8wekyb3d8bbwe!App"
+"File Explorer","Microsoft.Windows.Explorer"
+'''
+
+class FixtureLoader:
+    '''Hands out the fixture as Get-StartApps would, and counts the times it was asked.'''
+    def __init__(self,text:str=FIXTURE):
+        self.text=text
+        self.calls=0
+
+    def __call__(self)->str:
+        self.calls+=1
+        if isinstance(self.text,Exception):
+            raise self.text
+        return self.text
+
+class StartMenuCatalogTest(unittest.TestCase):
+    def setUp(self):
+        self.directory=TemporaryDirectory()
+        self.cache_path=os.path.join(self.directory.name,'cache','start-menu.json')
+        self.shortcuts=os.path.join(self.directory.name,'Programs')
+        os.makedirs(self.shortcuts)
+        self.loader=FixtureLoader()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_catalog(self,ttl:float=3600.0)->StartMenuCatalog:
+        return StartMenuCatalog(loader=self.loader,cache_path=self.cache_path,ttl=ttl,directories=[self.shortcuts])
+
+    def wait(self,catalog:StartMenuCatalog):
+        if catalog.refresh_thread is not None:
+            catalog.refresh_thread.join(timeout=5)
+
+    def test_fixture_is_parsed_into_lower_cased_names(self):
+        apps=parse_start_apps(FIXTURE)
+        self.assertEqual(apps['visual studio code'],'Microsoft.VisualStudioCode')
+        self.assertEqual(len(apps),4)
+
+    def test_first_load_runs_the_loader_and_writes_the_cache(self):
+        catalog=self.make_catalog()
+        self.assertEqual(catalog.get_apps()['notepad'],'Microsoft.Windows.Notepad')
+        self.assertEqual(self.loader.calls,1)
+        self.assertTrue(os.path.exists(self.cache_path))
+
+    def test_restart_reads_the_cache_without_the_loader(self):
+        self.make_catalog().get_apps()
+        catalog=self.make_catalog()
+        catalog.start()
+        self.wait(catalog)
+        self.assertEqual(catalog.get_apps()['calculator'],'Microsoft.WindowsCalculator_8wekyb3d8bbwe!App')
+        self.assertEqual(self.loader.calls,1)
+
+    def test_stale_catalog_answers_and_refreshes_in_the_background(self):
+        catalog=self.make_catalog(ttl=0.0)
+        first=catalog.get_apps()
+        self.loader.text=FIXTURE+'"Paint","Microsoft.Paint"\n'
+        self.assertIs(catalog.get_apps(),first)
+        self.wait(catalog)
+        self.assertEqual(self.loader.calls,2)
+        self.assertIn('paint',catalog.get_apps())
+
+    def test_changed_shortcut_folder_makes_the_catalog_stale(self):
+        catalog=self.make_catalog()
+        catalog.get_apps()
+        self.assertFalse(catalog.is_stale())
+        os.makedirs(os.path.join(self.shortcuts,'Tools'))
+        self.assertTrue(catalog.is_stale())
+
+    def test_failed_load_keeps_the_catalog_and_reports_on_stderr(self):
+        catalog=self.make_catalog()
+        apps=catalog.get_apps()
+        stdout,stderr=io.StringIO(),io.StringIO()
+        for text in (RuntimeError('Get-StartApps failed'),'"Name","AppID"\n'):
+            with self.subTest(text=text):
+                self.loader.text=text
+                with redirect_stdout(stdout),redirect_stderr(stderr):
+                    self.assertIs(catalog.refresh(),apps)
+        self.assertEqual(stdout.getvalue(),'')
+        self.assertIn('Error: Get-StartApps failed',stderr.getvalue())
+
+    @unittest.skipIf(NameMatcher is None,'numpy or fuzzywuzzy is not installed')
+    def test_names_are_matched_against_the_catalog(self):
+        apps=self.make_catalog().get_apps()
+        matcher=NameMatcher(apps.keys())
+        name,score=matcher.extract_one('vs code',score_cutoff=70) or ('',0)
+        self.assertEqual(apps.get(name),'Microsoft.VisualStudioCode')
+        self.assertEqual(matcher.extract_one('notepad',score_cutoff=70),('notepad',100))
+        self.assertIsNone(matcher.extract_one('photoshop',score_cutoff=70))
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+from random import Random
+import unittest
+
+try:
+    from uiautomation import ControlTypeNames
+    from src.tree.classifier import Classifier, NodeKind
+    from src.tree.config import INTERACTIVE_CONTROL_TYPE_NAMES, INFORMATIVE_CONTROL_TYPE_NAMES, DEFAULT_ACTIONS
+except ImportError:
+    # uiautomation only installs on Windows
+    Classifier=None
+
+class FakeRect:
+    def __init__(self,width:int,height:int):
+        self.right,self.bottom=width,height
+
+    def width(self)->int:
+        return self.right
+
+    def height(self)->int:
+        return self.bottom
+
+    def isempty(self)->bool:
+        return self.right<=0 or self.bottom<=0
+
+class FakePattern:
+    def __init__(self,**properties):
+        self.__dict__.update(properties)
+
+class FakeControl:
+    '''Stands in for a uiautomation Control, a property set to an exception raises it when read.'''
+    def __init__(self,control_type:int,name:str,scroll_pattern:FakePattern|None,legacy_pattern:FakePattern,**properties):
+        self.ControlType=control_type
+        self.ControlTypeName=name
+        self.scroll_pattern=scroll_pattern
+        self.legacy_pattern=legacy_pattern
+        self.properties=properties
+        self.reads=[]
+
+    def __getattr__(self,name:str):
+        properties=self.__dict__['properties']
+        if name not in properties:
+            raise AttributeError(name)
+        self.__dict__['reads'].append(name)
+        value=properties[name]
+        if isinstance(value,Exception):
+            raise value
+        return value
+
+    def GetScrollPattern(self):
+        self.reads.append('ScrollPattern')
+        return self.scroll_pattern
+
+    def GetLegacyIAccessiblePattern(self):
+        self.reads.append('LegacyIAccessiblePattern')
+        return self.legacy_pattern
+
+def classify_reference(node,is_browser:bool)->'NodeKind':
+    '''The classification of tree_traversal before the rules were compiled, kept as the reference.'''
+    def is_element_visible(node):
+        is_control=node.IsControlElement
+        box=node.BoundingRectangle
+        if box.isempty():
+            return False
+        area=box.width()*box.height()
+        is_offscreen=(not node.IsOffscreen) or node.ControlTypeName in ['EditControl']
+        return area>0 and is_offscreen and is_control
+
+    def is_element_enabled(node):
+        try:
+            return node.IsEnabled
+        except Exception:
+            return False
+
+    def is_default_action(node):
+        return node.GetLegacyIAccessiblePattern().DefaultAction.title() in DEFAULT_ACTIONS
+
+    def is_element_image(node):
+        if node.ControlTypeName=='ImageControl':
+            if node.LocalizedControlType=='graphic' or not node.IsKeyboardFocusable:
+                return True
+        return False
+
+    def is_element_text(node):
+        try:
+            if node.ControlTypeName in INFORMATIVE_CONTROL_TYPE_NAMES:
+                if is_element_visible(node) and is_element_enabled(node) and not is_element_image(node):
+                    return True
+        except Exception:
+            return False
+        return False
+
+    def is_element_scrollable(node):
+        try:
+            scroll_pattern=node.GetScrollPattern()
+            return scroll_pattern.VerticallyScrollable or scroll_pattern.HorizontallyScrollable
+        except Exception:
+            return False
+
+    def is_keyboard_focusable(node):
+        try:
+            if node.ControlTypeName in set(['EditControl','ButtonControl','CheckBoxControl','RadioButtonControl','TabItemControl']):
+                return True
+            return node.IsKeyboardFocusable
+        except Exception:
+            return False
+
+    def is_element_interactive(node):
+        try:
+            if is_browser and node.ControlTypeName in set(['DataItemControl','ListItemControl']) and not is_keyboard_focusable(node):
+                return False
+            elif not is_browser and node.ControlTypeName=="ImageControl" and is_keyboard_focusable(node):
+                return True
+            elif node.ControlTypeName in INTERACTIVE_CONTROL_TYPE_NAMES:
+                return is_element_visible(node) and is_element_enabled(node) and (not is_element_image(node) or is_keyboard_focusable(node))
+            elif is_browser and node.ControlTypeName=='GroupControl':
+                return is_element_visible(node) and is_element_enabled(node) and (is_default_action(node) or is_keyboard_focusable(node))
+        except Exception:
+            return False
+        return False
+
+    if node.IsOffscreen and (node.ControlTypeName not in set(["EditControl","TitleBarControl"])) and node.ClassName not in set(["Popup","Windows.UI.Core.CoreComponentInputSource"]):
+        return NodeKind.SKIPPED
+    if is_element_scrollable(node):
+        return NodeKind.SCROLLABLE
+    if is_element_interactive(node):
+        return NodeKind.INTERACTIVE
+    if is_element_text(node):
+        return NodeKind.INFORMATIVE
+    return NodeKind.NONE
+
+def make_tree(random:Random,variants:int)->list[FakeControl]:
+    '''Nodes of every control type, and of one uiautomation does not know, with random properties.'''
+    control_types=list(ControlTypeNames.items())+[(99999,'Control')]
+    error=RuntimeError('element not available')
+    nodes=[]
+    for control_type,name in control_types:
+        for _ in range(variants):
+            scroll_pattern=random.choice([None,FakePattern(VerticallyScrollable=random.random()<0.5,HorizontallyScrollable=random.random()<0.3)])
+            nodes.append(FakeControl(
+                control_type,name,scroll_pattern,
+                FakePattern(DefaultAction=random.choice(['click','Press','open','','double click'])),
+                IsOffscreen=random.random()<0.2,
+                ClassName=random.choice(['','Popup','Windows.UI.Core.CoreComponentInputSource','Button']),
+                IsControlElement=random.random()<0.9,
+                BoundingRectangle=FakeRect(random.choice([0,10,200]),random.choice([0,10,40])),
+                IsEnabled=random.choice([True,True,False,error]),
+                IsKeyboardFocusable=random.choice([True,False,error]),
+                LocalizedControlType=random.choice(['graphic','image','button'])
+            ))
+    return nodes
+
+@unittest.skipIf(Classifier is None,'uiautomation is not installed')
+class ClassifierEquivalenceTest(unittest.TestCase):
+    def test_matches_reference_on_synthetic_tree(self):
+        classifier=Classifier()
+        for node in make_tree(Random(14),variants=60):
+            for is_browser in (False,True):
+                with self.subTest(control_type=node.ControlTypeName,is_browser=is_browser,properties=node.properties):
+                    self.assertEqual(classifier.classify(node,is_browser),classify_reference(node,is_browser))
+
+    def test_every_control_type_is_asked_for_a_scroll_pattern(self):
+        classifier=Classifier()
+        for node in make_tree(Random(0),variants=1):
+            node.properties['IsOffscreen']=False
+            classifier.classify(node,False)
+            self.assertIn('ScrollPattern',node.reads,node.ControlTypeName)
+
+    def test_restricted_scrollable_names_skip_the_pattern(self):
+        classifier=Classifier(scrollable_names={'PaneControl'})
+        for node in make_tree(Random(0),variants=1):
+            node.properties['IsOffscreen']=False
+            classifier.classify(node,False)
+            self.assertEqual('ScrollPattern' in node.reads,node.ControlTypeName in ('PaneControl','Control'),node.ControlTypeName)
+
+    def test_registered_rule_replaces_the_compiled_one(self):
+        classifier=Classifier()
+        classifier.register('PaneControl',lambda node: NodeKind.INFORMATIVE,is_browser=False)
+        node=next(node for node in make_tree(Random(1),variants=1) if node.ControlTypeName=='PaneControl')
+        self.assertIs(classifier.classify(node,False),NodeKind.INFORMATIVE)
+        self.assertIs(classifier.classify(node,True),classify_reference(node,True))
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+from src.web.clean import BoilerplateStripper, VOID_TAGS
+
+def strip(html:str,piece:int|None=None)->str:
+    stripper=BoilerplateStripper()
+    piece=piece or len(html) or 1
+    for index in range(0,len(html),piece):
+        stripper.feed(html[index:index+piece])
+    return stripper.get_html()
+
+class BoilerplateStripperTest(unittest.TestCase):
+    def test_scripts_styles_navigation_and_hidden_elements_are_dropped(self):
+        html=strip('<script>a()</script><style>p{}</style><nav><a>Home</a></nav><div hidden>x</div><div aria-hidden="true">y</div><div role="search">z</div><p>Kept</p><!-- comment -->')
+        self.assertEqual(html,'<p>Kept</p>')
+
+    def test_page_chrome_is_kept_inside_the_content(self):
+        html=strip('<header>Site</header><article><header><h1>Title</h1></header><p>Text</p></article><footer>Links</footer>')
+        self.assertEqual(html,'<article><header><h1>Title</h1></header><p>Text</p></article>')
+
+    def test_nested_skipped_elements_close_at_their_own_end(self):
+        self.assertEqual(strip('<aside><aside>a</aside>b</aside><p>Kept</p>'),'<p>Kept</p>')
+
+    def test_hidden_void_element_without_end_tag_drops_only_itself(self):
+        # A skipped void element used to leave the stripper skipping the rest of the page
+        for tag in sorted(VOID_TAGS):
+            with self.subTest(tag=tag):
+                self.assertEqual(strip(f'<p>Before</p><{tag} hidden><p>After</p>'),'<p>Before</p><p>After</p>')
+                self.assertEqual(strip(f'<p>Before</p><{tag} aria-hidden="true"/><p>After</p>'),'<p>Before</p><p>After</p>')
+
+    def test_skipped_element_without_its_optional_end_tag_ends_at_a_sibling(self):
+        # Skipping counted end tags, these never came and the rest of the page was dropped
+        cases={
+            '<ul><li hidden>x<li>Keep me</ul><p>After</p>':'<ul><li>Keep me</ul><p>After</p>',
+            '<p hidden>gone<div>Keep me</div><p>After</p>':'<div>Keep me</div><p>After</p>',
+            '<p aria-hidden="true">gone<b>bold<p>Kept':'<p>Kept',
+            '<dl><dt hidden>x<dd>Kept</dl>':'<dl><dd>Kept</dl>',
+            '<select><option hidden>x<option>Kept</select>':'<select><option>Kept</select>',
+            '<table><tr><td role="search">x<td>Kept</table>':'<table><tr><td>Kept</table>',
+            '<table><tr hidden><td>x<tr><td>Kept</table>':'<table><tr><td>Kept</table>'
+        }
+        for html,expected in cases.items():
+            with self.subTest(html=html):
+                self.assertEqual(strip(html),expected)
+
+    def test_skipped_element_without_its_optional_end_tag_ends_with_its_parent(self):
+        self.assertEqual(strip('<div><ul><li hidden>x</ul>After</div>'),'<div><ul></ul>After</div>')
+        self.assertEqual(strip('<div><p hidden>x</div><p>After</p>'),'<div></div><p>After</p>')
+
+    def test_nested_lists_inside_a_skipped_item_stay_skipped(self):
+        self.assertEqual(strip('<ul><li hidden>x<ul><li>a<li>b</ul>y<li>Kept</ul>'),'<ul><li>Kept</ul>')
+        self.assertEqual(strip('<ul><li hidden><a>x</a></li><li>Kept</li></ul>'),'<ul><li>Kept</li></ul>')
+
+    def test_visible_void_elements_are_kept(self):
+        self.assertEqual(strip('<p>a<br>b<img src="x.png" alt="x"></p><hr>'),'<p>a<br>b<img src="x.png" alt="x"></p><hr>')
+
+    def test_void_elements_inside_a_skipped_element_do_not_end_it(self):
+        self.assertEqual(strip('<nav><img src="logo.png"><a>Home</a><br></nav><p>Kept</p>'),'<p>Kept</p>')
+
+    def test_pieces_give_the_same_html_as_the_whole_page(self):
+        page='<html><body><nav>Menu</nav><main><h1>T&amp;C</h1><input hidden><p>One <b>two</b></p><script>x<y</script></main></body></html>'*20
+        whole=strip(page)
+        for piece in (1,7,64):
+            with self.subTest(piece=piece):
+                self.assertEqual(strip(page,piece),whole)
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+from typing import Literal
+import unittest
+
+try:
+    from src.desktop.dispatch import ToolDispatcher
+except ImportError:
+    # uiautomation only installs on Windows
+    ToolDispatcher=None
+
+@unittest.skipIf(ToolDispatcher is None,'uiautomation is not installed')
+class CheckArgsTest(unittest.TestCase):
+    def setUp(self):
+        self.dispatcher=ToolDispatcher(workers=1)
+        def click_tool(loc:list[int],button:Literal['left','right','middle']='left',clicks:int=1)->str:
+            return 'clicked'
+        self.dispatcher.input(click_tool)
+
+    def tearDown(self):
+        self.dispatcher.shutdown()
+
+    def test_valid_args_pass(self):
+        self.dispatcher.check_args('click_tool',{'loc':[1,2]})
+        self.dispatcher.check_args('click_tool',{'loc':[1,2],'button':'right','clicks':2})
+
+    def test_numbers_must_have_the_type_and_range_of_the_parameter(self):
+        def wait_tool(duration:float,timeout:float=10.0,region:list[int]=None,since_version:int=None)->str:
+            return 'waited'
+        self.dispatcher.read(wait_tool)
+        for args in ({'duration':0},{'duration':1.5,'timeout':2},{'duration':1,'region':[-1920,0,10,10]},{'duration':1,'since_version':None}):
+            with self.subTest(args=args):
+                self.dispatcher.check_args('wait_tool',args)
+        for args in ({'duration':-1},{'duration':'1'},{'duration':True},{'duration':float('inf')},{'duration':float('nan')},{'duration':1,'region':[1.5,2]},{'duration':1,'since_version':-3}):
+            with self.subTest(args=args):
+                with self.assertRaises(ValueError):
+                    self.dispatcher.check_args('wait_tool',args)
+        for args in ({'loc':[1,2],'clicks':2.0},{'loc':[1,2],'clicks':-1},{'loc':[True,2]},{'loc':'1,2'}):
+            with self.subTest(args=args):
+                with self.assertRaises(ValueError):
+                    self.dispatcher.check_args('click_tool',args)
+
+    def test_invalid_args_are_refused(self):
+        for args in ({},{'loc':[1,2],'x':1},{'loc':[1,2],'button':'back'},[[1,2]]):
+            with self.subTest(args=args):
+                with self.assertRaises(ValueError):
+                    self.dispatcher.check_args('click_tool',args)
+
+@unittest.skipIf(ToolDispatcher is None,'uiautomation is not installed')
+class DispatcherStatsTest(unittest.IsolatedAsyncioTestCase):
+    async def test_stats_count_the_tools_of_each_pool(self):
+        dispatcher=ToolDispatcher(workers=2)
+        try:
+            def fail_tool()->str:
+                raise RuntimeError('failed')
+            await dispatcher.run_input(lambda: 'typed')
+            await dispatcher.run_read(lambda: 'read')
+            with self.assertRaises(RuntimeError):
+                await dispatcher.run_read(fail_tool)
+            input_stats,read_stats=dispatcher.get_stats()
+            self.assertEqual((input_stats.size,input_stats.completed,input_stats.failed),(1,1,0))
+            self.assertEqual((read_stats.size,read_stats.completed,read_stats.failed),(2,2,1))
+            self.assertIn('Workers: 0/2 busy',read_stats.to_string())
+        finally:
+            dispatcher.shutdown()
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+import ctypes
+
+from src.desktop.inject import (
+    build_text_events, build_key_events, normalize_point, build_move_events, build_click_events, build_drag_events,
+    chunk_events, to_inputs, INPUT, INPUT_KEYBOARD, INPUT_MOUSE, KEYEVENTF_KEYUP, KEYEVENTF_UNICODE, MOUSEEVENTF_MOVE,
+    MOUSEEVENTF_ABSOLUTE, MOUSEEVENTF_VIRTUALDESK, BUTTON_FLAGS, VK_RETURN, VK_TAB, VK_CONTROL, VK_V
+)
+from src.desktop.views import KeyEvent, PointerEvent
+
+SCREEN=(0,0,1920,1080)
+ABSOLUTE=MOUSEEVENTF_ABSOLUTE|MOUSEEVENTF_VIRTUALDESK
+
+def denormalize(value:int,origin:int,extent:int)->int:
+    '''Maps an absolute coordinate back to a pixel the way Windows does.'''
+    return origin+value*extent//65536
+
+class TextEventsTest(unittest.TestCase):
+    def test_every_character_is_pressed_and_released(self):
+        self.assertEqual(build_text_events('ab'),[
+            KeyEvent(code=ord('a')),KeyEvent(code=ord('a'),is_up=True),
+            KeyEvent(code=ord('b')),KeyEvent(code=ord('b'),is_up=True)
+        ])
+
+    def test_characters_outside_the_bmp_become_a_surrogate_pair(self):
+        events=build_text_events('\U0001F600')
+        self.assertEqual([event.code for event in events],[0xD83D,0xD83D,0xDE00,0xDE00])
+        self.assertEqual([event.is_up for event in events],[False,True,False,True])
+        self.assertTrue(all(event.is_unicode for event in events))
+
+    def test_line_breaks_and_tabs_are_keys(self):
+        events=build_text_events('a\r\nb\rc\td')
+        keys=[event.code for event in events if not event.is_unicode and not event.is_up]
+        self.assertEqual(keys,[VK_RETURN,VK_RETURN,VK_TAB])
+        self.assertEqual(len(events),2*7)
+
+    def test_empty_text_has_no_events(self):
+        self.assertEqual(build_text_events(''),[])
+
+class KeyEventsTest(unittest.TestCase):
+    def test_keys_are_released_in_reverse(self):
+        self.assertEqual(build_key_events([VK_CONTROL,VK_V]),[
+            KeyEvent(code=VK_CONTROL,is_unicode=False),KeyEvent(code=VK_V,is_unicode=False),
+            KeyEvent(code=VK_V,is_unicode=False,is_up=True),KeyEvent(code=VK_CONTROL,is_unicode=False,is_up=True)
+        ])
+
+class PointerEventsTest(unittest.TestCase):
+    def test_normalized_points_map_back_to_the_same_pixel(self):
+        screens=[SCREEN,(-1920,0,3840,1080),(0,-300,2560,1740),(0,0,1366,768),(0,0,7,3)]
+        for left,top,width,height in screens:
+            for x in sorted({left,left+1,left+width//3,left+width//2,left+width-2,left+width-1}):
+                for y in sorted({top,top+1,top+height//2,top+height-1}):
+                    with self.subTest(screen=(left,top,width,height),x=x,y=y):
+                        normalized_x,normalized_y=normalize_point(x,y,(left,top,width,height))
+                        self.assertEqual(denormalize(normalized_x,left,width),x)
+                        self.assertEqual(denormalize(normalized_y,top,height),y)
+
+    def test_points_off_the_screen_are_clamped(self):
+        self.assertEqual(normalize_point(-50,-50,SCREEN),(0,0))
+        self.assertEqual(normalize_point(5000,5000,SCREEN),(65535,65535))
+
+    def test_move_is_absolute_over_the_virtual_desktop(self):
+        (event,)=build_move_events(960,540,SCREEN)
+        self.assertEqual(event.flags,MOUSEEVENTF_MOVE|ABSOLUTE)
+        self.assertEqual((event.x,event.y),normalize_point(960,540,SCREEN))
+
+    def test_clicks_press_and_release_where_the_pointer_moved(self):
+        for button,(down,up) in BUTTON_FLAGS.items():
+            for clicks in (1,2,3):
+                with self.subTest(button=button,clicks=clicks):
+                    move,*events=build_click_events(100,200,SCREEN,button=button,clicks=clicks)
+                    self.assertEqual(events,[PointerEvent(x=move.x,y=move.y,flags=flags|ABSOLUTE) for flags in (down,up)]*clicks)
+
+    def test_unknown_button_is_refused(self):
+        with self.assertRaises(ValueError):
+            build_click_events(0,0,SCREEN,button='back')
+
+    def test_drag_presses_moves_and_releases_in_three_batches(self):
+        down,up=BUTTON_FLAGS['left']
+        press,moves,release=build_drag_events((100,100),(200,300),SCREEN,steps=4)
+        self.assertEqual(press[1],PointerEvent(x=press[0].x,y=press[0].y,flags=down|ABSOLUTE))
+        self.assertEqual(len(moves),4)
+        self.assertEqual((moves[-1].x,moves[-1].y),normalize_point(200,300,SCREEN))
+        self.assertEqual(release,[PointerEvent(x=moves[-1].x,y=moves[-1].y,flags=up|ABSOLUTE)])
+
+    def test_drag_without_steps_still_reaches_the_end(self):
+        _,moves,_=build_drag_events((0,0),(10,10),SCREEN,steps=0)
+        self.assertEqual([(event.x,event.y) for event in moves],[normalize_point(10,10,SCREEN)])
+
+class ChunkEventsTest(unittest.TestCase):
+    def test_chunks_keep_the_order_and_size(self):
+        events=build_text_events('hello world')
+        chunks=chunk_events(events,4)
+        self.assertEqual(sum(chunks,[]),events)
+        self.assertTrue(all(len(chunk)==4 for chunk in chunks[:-1]))
+        self.assertTrue(all(not chunk[0].is_up for chunk in chunks))
+
+    def test_size_below_one_sends_one_event_per_chunk(self):
+        self.assertEqual(chunk_events([1,2],0),[[1],[2]])
+
+    def test_no_events_no_chunks(self):
+        self.assertEqual(chunk_events([],200),[])
+
+class InputsTest(unittest.TestCase):
+    def test_events_become_the_input_structures(self):
+        events=[KeyEvent(code=0x263A),KeyEvent(code=VK_V,is_unicode=False,is_up=True),PointerEvent(x=10,y=20,flags=MOUSEEVENTF_MOVE,data=120)]
+        inputs=to_inputs(events)
+        self.assertEqual(len(inputs),3)
+        self.assertEqual(ctypes.sizeof(inputs),3*ctypes.sizeof(INPUT))
+        unicode,key,pointer=inputs
+        self.assertEqual((unicode.type,unicode.union.ki.wVk,unicode.union.ki.wScan,unicode.union.ki.dwFlags),(INPUT_KEYBOARD,0,0x263A,KEYEVENTF_UNICODE))
+        self.assertEqual((key.type,key.union.ki.wVk,key.union.ki.wScan,key.union.ki.dwFlags),(INPUT_KEYBOARD,VK_V,0,KEYEVENTF_KEYUP))
+        self.assertEqual((pointer.type,pointer.union.mi.dx,pointer.union.mi.dy,pointer.union.mi.mouseData,pointer.union.mi.dwFlags),(INPUT_MOUSE,10,20,120,MOUSEEVENTF_MOVE))
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import random
+
+try:
+    from fuzzywuzzy import process
+    from src.desktop.matcher import NameMatcher
+except ImportError:
+    NameMatcher=None
+
+CORPUS=[
+    'Notepad','Notepad++','Untitled - Notepad','Calculator','Visual Studio Code','Visual Studio 2022','Microsoft Edge',
+    'Google Chrome','Mozilla Firefox','File Explorer','Windows PowerShell','Windows PowerShell ISE','Command Prompt',
+    'Task Manager','Control Panel','Settings','Microsoft Word','Microsoft Excel','Microsoft PowerPoint','Outlook',
+    'Paint','Paint 3D','Snipping Tool','Microsoft Store','Spotify','Slack','Microsoft Teams','Zoom','OBS Studio',
+    'Windows Terminal','Registry Editor','Device Manager','Event Viewer','Disk Management','7-Zip File Manager',
+    'Adobe Acrobat Reader','VLC media player','Steam','Discord','Git Bash','Python 3.12','IDLE (Python 3.12)',
+    'Sticky Notes','Photos','Camera','Clock','Mail','Calendar','Maps','Weather','Xbox','Café Ñandú','東京 Viewer',
+    'Excel - Book1.xlsx','Book1.xlsx - Excel','chrome','CHROME','Chrome Beta','Edge Dev','a','',
+]
+
+QUERIES=[
+    'notepad','note pad','notepad plus plus','calc','vs code','visual studio','code','edge','chrome','google',
+    'firefox','explorer','file explorer','powershell','power shell','cmd','command','task','settings','word',
+    'excel','book1','powerpoint','paint','snip','store','teams','terminal','regedit','device','7zip','acrobat',
+    'vlc','steam','python','idle','notes','cafe','nandu','東京','x','zz','Microsoft','windows','studio code',
+    '  Chrome!  ','e','studio visual','excel book1','12',
+]
+
+@unittest.skipIf(NameMatcher is None,'numpy or fuzzywuzzy is not installed')
+class NameMatcherTest(unittest.TestCase):
+    def assert_same_as_extract_one(self,matcher:'NameMatcher',names:list[str],queries:list[str]):
+        for query in queries:
+            for score_cutoff in (0,60,70,90):
+                with self.subTest(query=query,score_cutoff=score_cutoff):
+                    self.assertEqual(
+                        matcher.extract_one(query,score_cutoff=score_cutoff),
+                        process.extractOne(query,names,score_cutoff=score_cutoff)
+                    )
+
+    def test_same_result_as_extract_one_on_a_fixed_corpus(self):
+        self.assert_same_as_extract_one(NameMatcher(CORPUS),CORPUS,QUERIES)
+
+    def test_same_result_after_updates(self):
+        matcher=NameMatcher(capacity=4)
+        shuffled=random.Random(7).sample(CORPUS,len(CORPUS))
+        for names in (shuffled[:20],shuffled[10:40],list(reversed(shuffled)),shuffled[:5]):
+            matcher.update(names)
+            self.assertEqual(len(matcher),len(set(names)))
+            self.assert_same_as_extract_one(matcher,names,QUERIES[::3])
+
+    def test_scores_are_between_the_cutoff_and_100(self):
+        matcher=NameMatcher(CORPUS)
+        for query in QUERIES:
+            with self.subTest(query=query):
+                match=matcher.extract_one(query,score_cutoff=50)
+                if match is not None:
+                    self.assertGreaterEqual(match[1],50)
+                    self.assertLessEqual(match[1],100)
+        self.assertEqual(matcher.extract_one('Calculator'),('Calculator',100))
+
+    def test_ties_go_to_the_earlier_name(self):
+        for names in (['chrome','CHROME','Chrome'],['CHROME','chrome','Chrome']):
+            with self.subTest(names=names):
+                matcher=NameMatcher(names)
+                self.assertEqual(matcher.extract_one('chrome'),(names[0],100))
+                self.assertEqual(matcher.extract_one('chrome'),process.extractOne('chrome',names))
+        matcher=NameMatcher(['chrome','CHROME'])
+        matcher.update(['CHROME','chrome'])
+        self.assertEqual(matcher.extract_one('chrome'),('CHROME',100))
+
+    def test_no_match_below_the_cutoff_or_without_names(self):
+        self.assertIsNone(NameMatcher().extract_one('notepad'))
+        self.assertIsNone(NameMatcher(CORPUS).extract_one('qqqqqqqq',score_cutoff=60))
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+from itertools import count
+import unittest
+
+from src.mirror.service import TreeMirror, ScriptedEventSource
+from src.mirror.views import EventType, UIEvent
+from src.tree.views import TraversalNode, TraversalContext, TraversalResult, TraversalBudget, TextRecord
+
+runtime_ids=count(1)
+
+class FakeElement:
+    '''An element of a fake app, its name is what the fake tree reports for it.'''
+    def __init__(self,name:str,children:list['FakeElement']|None=None):
+        self.name=name
+        self.runtime_id=(next(runtime_ids),)
+        self.parent=None
+        self.children=[]
+        for child in children or []:
+            self.add(child)
+
+    def add(self,child:'FakeElement')->'FakeElement':
+        child.parent=self
+        self.children.append(child)
+        return child
+
+class FakeTree:
+    '''Walks fake elements as the tree walks controls, and counts the elements it walked and visited.'''
+    def __init__(self):
+        self.walked:list[str]=[]
+        self.visited:list[str]=[]
+
+    def get_runtime_id(self,element:FakeElement)->tuple[int,...]:
+        return element.runtime_id
+
+    def get_app_name(self,app:FakeElement)->str:
+        return app.name
+
+    def get_context(self,app:FakeElement)->TraversalContext:
+        return TraversalContext(app_name=app.name)
+
+    def get_child_context(self,element:FakeElement,context:TraversalContext)->tuple[TraversalContext,str|None]:
+        return context,None
+
+    def get_parent(self,element:FakeElement)->FakeElement|None:
+        return element.parent
+
+    def refresh(self,element:FakeElement,context:TraversalContext)->FakeElement:
+        return element
+
+    def visit_node(self,element:FakeElement,context:TraversalContext,result:TraversalResult)->bool:
+        self.visited.append(element.name)
+        result.informative_nodes.append(TextRecord(name=element.name,app_name=context.app_name))
+        return True
+
+    def get_mirror_node(self,element:FakeElement,context:TraversalContext,reset=None,budget=None,executor=None)->TraversalNode:
+        self.walked.append(element.name)
+        node=TraversalNode(element=element,context=context,reset=reset)
+        node.result.informative_nodes.append(TextRecord(name=element.name,app_name=context.app_name))
+        for child in element.children:
+            node.add_child(self.get_mirror_node(child,context))
+        return node
+
+def make_app()->FakeElement:
+    return FakeElement('app',[FakeElement('pane',[FakeElement('button'),FakeElement('label')]),FakeElement('status')])
+
+class TreeMirrorTest(unittest.TestCase):
+    def setUp(self):
+        self.source=ScriptedEventSource()
+        self.tree=FakeTree()
+        self.mirror=TreeMirror(source=self.source,resync_interval=None,resync_events=None)
+        self.mirror.start()
+        self.app=make_app()
+        self.pane,self.status=self.app.children
+        self.button,self.label=self.pane.children
+
+    def tearDown(self):
+        self.mirror.stop()
+
+    def get_names(self,apps:list[FakeElement]|None=None)->list[str]:
+        '''Runs one snapshot and returns the names it reports, the walks and visits start counting anew.'''
+        self.tree.walked.clear()
+        self.tree.visited.clear()
+        _,informative_nodes,_=self.mirror.get_nodes(self.tree,apps if apps is not None else [self.app],TraversalBudget())
+        return [node.name for node in informative_nodes]
+
+    def play(self,event_type:EventType,element:FakeElement,property_id:int|None=None):
+        self.source.play([UIEvent(type=event_type,runtime_id=element.runtime_id,element=element,property_id=property_id)])
+
+    def test_app_is_walked_once_and_then_served_from_the_mirror(self):
+        self.assertEqual(self.get_names(),['app','pane','button','label','status'])
+        self.assertEqual(self.source.watched,[self.app])
+        self.assertEqual(self.get_names(),['app','pane','button','label','status'])
+        self.assertEqual((self.tree.walked,self.tree.visited),([],[]))
+
+    def test_property_change_revisits_only_the_element(self):
+        self.get_names()
+        self.button.name='OK'
+        self.play(EventType.PROPERTY_CHANGED,self.button,property_id=30005)
+        self.assertEqual(self.get_names(),['app','pane','OK','label','status'])
+        self.assertEqual((self.tree.walked,self.tree.visited),([],['OK']))
+
+    def test_structure_change_rebuilds_only_the_subtree(self):
+        self.get_names()
+        self.pane.add(FakeElement('checkbox'))
+        self.play(EventType.STRUCTURE_CHANGED,self.pane)
+        self.assertEqual(self.get_names(),['app','pane','button','label','checkbox','status'])
+        self.assertEqual(self.tree.walked,['pane','button','label','checkbox'])
+        self.assertEqual(self.mirror.stats.subtrees_rebuilt,1)
+
+    def test_move_and_scroll_rebuild_the_subtree(self):
+        for property_id in (30001,30053,30055):
+            with self.subTest(property_id=property_id):
+                self.get_names()
+                self.play(EventType.PROPERTY_CHANGED,self.pane,property_id=property_id)
+                self.get_names()
+                self.assertEqual(self.tree.walked,['pane','button','label'])
+
+    def test_event_of_an_unmirrored_element_rebuilds_its_mirrored_ancestor(self):
+        self.get_names()
+        popup=self.label.add(FakeElement('popup'))
+        self.play(EventType.PROPERTY_CHANGED,popup,property_id=30005)
+        self.assertEqual(self.get_names(),['app','pane','button','label','popup','status'])
+        self.assertEqual(self.tree.walked,['label','popup'])
+
+    def test_changes_inside_a_rebuilt_subtree_are_coalesced(self):
+        self.get_names()
+        self.play(EventType.PROPERTY_CHANGED,self.button,property_id=30005)
+        self.play(EventType.STRUCTURE_CHANGED,self.label)
+        self.play(EventType.STRUCTURE_CHANGED,self.pane)
+        self.get_names()
+        self.assertEqual((self.tree.walked,self.tree.visited),(['pane','button','label'],[]))
+        self.assertEqual(self.mirror.stats.events_coalesced,2)
+
+    def test_focus_change_revisits_the_old_and_the_new_element(self):
+        self.get_names()
+        self.play(EventType.FOCUS_CHANGED,self.button)
+        self.get_names()
+        self.play(EventType.FOCUS_CHANGED,self.status)
+        self.get_names()
+        self.assertEqual(sorted(self.tree.visited),['button','status'])
+
+    def test_removed_element_is_dropped(self):
+        self.get_names()
+        self.pane.children.remove(self.label)
+        self.play(EventType.STRUCTURE_CHANGED,self.pane)
+        self.assertEqual(self.get_names(),['app','pane','button','status'])
+        self.assertNotIn(self.label.runtime_id,self.mirror.nodes)
+
+    def test_closed_app_is_unwatched(self):
+        other=FakeElement('other')
+        self.get_names([self.app,other])
+        self.assertEqual(self.source.watched,[self.app,other])
+        self.assertEqual(self.get_names([other]),['other'])
+        self.assertEqual(self.source.watched,[other])
+        self.assertNotIn(self.button.runtime_id,self.mirror.nodes)
+
+    def test_events_of_unknown_apps_are_ignored(self):
+        self.get_names()
+        stranger=FakeElement('stranger')
+        self.play(EventType.STRUCTURE_CHANGED,stranger)
+        self.get_names()
+        self.assertEqual(self.tree.walked,[])
+        self.assertEqual(self.mirror.stats.events_ignored,1)
+
+class TreeMirrorResyncTest(unittest.TestCase):
+    def setUp(self):
+        self.source=ScriptedEventSource()
+        self.tree=FakeTree()
+        self.app=make_app()
+
+    def walk(self,mirror:TreeMirror)->list[str]:
+        self.tree.walked.clear()
+        _,informative_nodes,_=mirror.get_nodes(self.tree,[self.app],TraversalBudget())
+        return [node.name for node in informative_nodes]
+
+    def test_missed_event_is_fixed_by_the_next_resync(self):
+        mirror=TreeMirror(source=self.source,resync_interval=0.0,resync_events=None)
+        self.walk(mirror)
+        # The name changed without an event, only a full walk sees it
+        self.app.children[1].name='done'
+        self.assertEqual(self.walk(mirror),['app','pane','button','label','done'])
+        self.assertEqual(self.tree.walked,['app','pane','button','label','done'])
+        self.assertEqual(mirror.stats.resyncs,1)
+
+    def test_many_events_force_a_resync(self):
+        mirror=TreeMirror(source=self.source,resync_interval=None,resync_events=3)
+        self.walk(mirror)
+        status=self.app.children[1]
+        for _ in range(2):
+            self.source.play([UIEvent(type=EventType.PROPERTY_CHANGED,runtime_id=status.runtime_id,element=status,property_id=30005)])
+        self.walk(mirror)
+        self.assertEqual((self.tree.walked,mirror.stats.resyncs),([],0))
+        self.source.play([UIEvent(type=EventType.PROPERTY_CHANGED,runtime_id=status.runtime_id,element=status,property_id=30005)])
+        self.walk(mirror)
+        self.assertEqual(self.tree.walked[0],'app')
+        self.assertEqual(mirror.stats.resyncs,1)
+
+    def test_without_limits_the_mirror_is_not_resynced(self):
+        mirror=TreeMirror(source=self.source,resync_interval=None,resync_events=None)
+        self.walk(mirror)
+        self.walk(mirror)
+        self.assertEqual((self.tree.walked,mirror.stats.resyncs),([],0))
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+from tempfile import TemporaryDirectory
+from time import sleep, perf_counter
+import unittest
+import shutil
+import signal
+import os
+
+from src.desktop.shell import ShellDialect, BashDialect, ShellPool
+from src.desktop.views import ShellResult
+
+def is_running(pid:int)->bool:
+    try:
+        os.kill(pid,0)
+    except ProcessLookupError:
+        return False
+    # A killed child of init can linger as a zombie for a moment
+    try:
+        with open(f'/proc/{pid}/stat') as file:
+            return file.read().split()[2]!='Z'
+    except OSError:
+        return True
+
+def wait_until_gone(pid:int,timeout:float=5.0)->bool:
+    deadline=perf_counter()+timeout
+    while perf_counter()<deadline:
+        if not is_running(pid):
+            return True
+        sleep(0.05)
+    return False
+
+class ShellDialectTest(unittest.TestCase):
+    def test_dialect_without_frame_can_not_be_made(self):
+        class Incomplete(ShellDialect):
+            argv=('sh',)
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+@unittest.skipIf(os.name=='nt' or shutil.which('bash') is None,'bash is not available')
+class ShellPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.directory=TemporaryDirectory()
+        self.pids=[]
+
+    def tearDown(self):
+        for pid in self.pids:
+            try:
+                os.kill(pid,signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self.directory.cleanup()
+
+    def start_background(self,pool:ShellPool,then:str='',timeout:float=5.0)->tuple[int,ShellResult]:
+        '''Runs a command that starts a program in the background, then runs then, and returns the program's pid.'''
+        path=os.path.join(self.directory.name,'pid')
+        result=pool.run(f'sleep 30 >/dev/null 2>&1 & echo $! >{path}; {then}',timeout=timeout)
+        with open(path) as file:
+            pid=int(file.read())
+        self.pids.append(pid)
+        return pid,result
+
+    def test_commands_keep_their_output_and_exit_code(self):
+        pool=ShellPool(BashDialect(),size=1,timeout=5.0)
+        try:
+            result=pool.run('echo out; echo err >&2; exit_code() { return 3; }; exit_code')
+            self.assertEqual((result.stdout,result.stderr,result.exit_code),('out\n','err\n',3))
+        finally:
+            pool.close()
+
+    def test_programs_started_by_a_command_outlive_a_stateless_session(self):
+        pool=ShellPool(BashDialect(),size=1,timeout=5.0,stateless=True)
+        try:
+            pid,result=self.start_background(pool)
+            self.assertEqual(result.exit_code,0)
+            sleep(0.5)
+            self.assertTrue(is_running(pid))
+        finally:
+            pool.close()
+        self.assertTrue(is_running(pid))
+
+    def test_command_that_times_out_is_killed_with_what_it_started(self):
+        pool=ShellPool(BashDialect(),size=1,timeout=5.0)
+        try:
+            pid,result=self.start_background(pool,then='sleep 10',timeout=0.5)
+            self.assertTrue(result.is_timed_out)
+            self.assertTrue(wait_until_gone(pid))
+        finally:
+            pool.close()
+
+if __name__=='__main__':
+    unittest.main()
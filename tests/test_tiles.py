@@ -0,0 +1,91 @@
+import unittest
+
+try:
+    from PIL import Image, ImageDraw
+    from src.desktop.tiles import TileDiffer
+except ImportError:
+    TileDiffer=None
+
+def make_frame(width:int=256,height:int=192,boxes:list[tuple[int,int,int,int]]=())->'Image.Image':
+    '''A grey frame with a white box drawn at each (left,top,right,bottom), right and bottom exclusive.'''
+    image=Image.new('RGB',(width,height),(40,40,40))
+    draw=ImageDraw.Draw(image)
+    for left,top,right,bottom in boxes:
+        draw.rectangle((left,top,right-1,bottom-1),fill=(255,255,255))
+    return image
+
+@unittest.skipIf(TileDiffer is None,'numpy or Pillow is not installed')
+class TileDifferTest(unittest.TestCase):
+    def setUp(self):
+        self.differ=TileDiffer(tile_size=32,keyframe_interval=3,max_dirty_ratio=0.5)
+
+    def test_first_frame_is_a_keyframe(self):
+        delta=self.differ.diff(make_frame())
+        self.assertTrue(delta.is_keyframe)
+        self.assertEqual(delta.rects,[(0,0,256,192)])
+        self.assertEqual(delta.total_tiles,8*6)
+
+    def test_unchanged_frame_has_no_rects(self):
+        self.differ.diff(make_frame())
+        delta=self.differ.diff(make_frame())
+        self.assertFalse(delta.is_keyframe)
+        self.assertEqual((delta.rects,delta.changed_tiles,delta.sequence),([],0,1))
+
+    def test_changed_tiles_are_merged_into_rects(self):
+        self.differ.diff(make_frame())
+        # One box inside a tile, one spanning a block of two by two tiles
+        delta=self.differ.diff(make_frame(boxes=[(5,5,10,10),(100,70,150,120)]))
+        self.assertFalse(delta.is_keyframe)
+        self.assertEqual(delta.changed_tiles,5)
+        self.assertEqual(sorted(delta.rects),[(0,0,32,32),(96,64,160,128)])
+
+    def test_rects_are_cut_at_the_frame_edge(self):
+        differ=TileDiffer(tile_size=32)
+        differ.diff(make_frame(width=250,height=190))
+        delta=differ.diff(make_frame(width=250,height=190,boxes=[(240,180,250,190)]))
+        self.assertEqual(delta.rects,[(224,160,250,190)])
+
+    def test_keyframe_when_asked_resized_moved_or_after_the_interval(self):
+        cases={
+            'asked':lambda: self.differ.diff(make_frame(),keyframe=True),
+            'resized':lambda: self.differ.diff(make_frame(width=320)),
+            'moved':lambda: self.differ.diff(make_frame(),area=(10,10,266,202))
+        }
+        for case,diff in cases.items():
+            with self.subTest(case=case):
+                self.differ.reset()
+                self.differ.diff(make_frame())
+                self.assertTrue(diff().is_keyframe)
+        self.differ.reset()
+        self.differ.diff(make_frame())
+        sequences=[self.differ.diff(make_frame()) for _ in range(4)]
+        self.assertEqual([delta.is_keyframe for delta in sequences],[False,False,False,True])
+        self.assertEqual([delta.sequence for delta in sequences],[1,2,3,0])
+
+    def test_mostly_changed_frame_falls_back_to_a_keyframe(self):
+        self.differ.diff(make_frame())
+        delta=self.differ.diff(make_frame(boxes=[(0,0,256,100)]))
+        self.assertTrue(delta.is_keyframe)
+        self.assertEqual(delta.changed_tiles,delta.total_tiles)
+        # Just under the ratio is still a delta
+        self.differ.diff(make_frame())
+        delta=self.differ.diff(make_frame(boxes=[(0,0,256,96)]))
+        self.assertFalse(delta.is_keyframe)
+        self.assertEqual(delta.changed_tiles,24)
+
+    def test_reset_forces_a_keyframe(self):
+        self.differ.diff(make_frame())
+        self.differ.reset()
+        self.assertTrue(self.differ.diff(make_frame()).is_keyframe)
+
+    def test_tile_rows_must_be_whole_words(self):
+        for tile_size in (12,20,36):
+            with self.subTest(tile_size=tile_size):
+                with self.assertRaises(ValueError):
+                    TileDiffer(tile_size=tile_size)
+        differ=TileDiffer(tile_size=8)
+        differ.diff(make_frame(width=20,height=20))
+        self.assertEqual(differ.diff(make_frame(width=20,height=20,boxes=[(9,9,10,10)])).rects,[(8,8,16,16)])
+
+if __name__=='__main__':
+    unittest.main()
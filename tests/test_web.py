@@ -0,0 +1,194 @@
+from contextlib import redirect_stderr, redirect_stdout
+from tempfile import TemporaryDirectory
+import unittest
+import asyncio
+import io
+import os
+
+try:
+    from aiohttp import web
+except ImportError:
+    web=None
+
+from src.web.service import WebFetcher
+from src.web.cache import DiskCache
+from src.web.views import CacheEntry
+
+PAGE='<html><head><script>var tracking=1;</script><style>p{}</style></head><body><nav><a href="/">Home</a></nav><main><h1>Title</h1><p>Body text</p></main><footer>Footer</footer></body></html>'
+
+class StandInServer:
+    '''A local aiohttp server whose pages count the requests they get.'''
+    def __init__(self):
+        self.requests:dict[str,int]={}
+        self.revalidations=0
+        self.runner=None
+        self.base_url=''
+
+    def count(self,request)->None:
+        self.requests[request.path]=self.requests.get(request.path,0)+1
+
+    async def page(self,request):
+        self.count(request)
+        if request.headers.get('If-None-Match')=='"v1"':
+            self.revalidations+=1
+            return web.Response(status=304,headers={'ETag':'"v1"'})
+        return web.Response(text=PAGE,content_type='text/html',headers={'ETag':'"v1"'})
+
+    async def slow(self,request):
+        self.count(request)
+        await asyncio.sleep(0.2)
+        return web.Response(text='<p>Slow</p>',content_type='text/html')
+
+    async def no_store(self,request):
+        self.count(request)
+        return web.Response(text='<p>Private</p>',content_type='text/html',headers={'Cache-Control':'no-store'})
+
+    async def large(self,request):
+        self.count(request)
+        return web.Response(text='<p>'+'word '*100000+'</p>',content_type='text/html')
+
+    async def missing(self,request):
+        self.count(request)
+        return web.Response(status=404,text='<p>Not found</p>',content_type='text/html')
+
+    async def start(self):
+        app=web.Application()
+        app.router.add_get('/page',self.page)
+        app.router.add_get('/slow',self.slow)
+        app.router.add_get('/no-store',self.no_store)
+        app.router.add_get('/large',self.large)
+        app.router.add_get('/missing',self.missing)
+        self.runner=web.AppRunner(app)
+        await self.runner.setup()
+        site=web.TCPSite(self.runner,'127.0.0.1',0)
+        await site.start()
+        port=self.runner.addresses[0][1]
+        self.base_url=f'http://127.0.0.1:{port}'
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+@unittest.skipIf(web is None,'aiohttp is not installed')
+class WebFetcherTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server=StandInServer()
+        await self.server.start()
+        self.directory=TemporaryDirectory()
+        self.conversions=0
+        self.fetcher=self.make_fetcher()
+
+    async def asyncTearDown(self):
+        await self.fetcher.close()
+        await self.server.stop()
+        self.directory.cleanup()
+
+    def convert(self,html:str)->str:
+        self.conversions+=1
+        return html
+
+    def make_fetcher(self,**options)->WebFetcher:
+        return WebFetcher(convert=self.convert,cache_dir=self.directory.name,**options)
+
+    def url(self,path:str)->str:
+        return f'{self.server.base_url}{path}'
+
+    async def test_boilerplate_is_stripped(self):
+        result=await self.fetcher.fetch(self.url('/page'))
+        self.assertEqual((result.status,result.source),(200,'network'))
+        self.assertIn('<h1>Title</h1>',result.markdown)
+        self.assertIn('Body text',result.markdown)
+        for boilerplate in ('tracking','p{}','Home','Footer'):
+            self.assertNotIn(boilerplate,result.markdown)
+
+    async def test_fresh_page_comes_from_memory(self):
+        first=await self.fetcher.fetch(self.url('/page'))
+        second=await self.fetcher.fetch(self.url('/page'))
+        self.assertEqual(second.source,'memory')
+        self.assertEqual(second.markdown,first.markdown)
+        self.assertEqual(self.server.requests['/page'],1)
+        self.assertEqual((self.fetcher.stats.downloads,self.fetcher.stats.memory_hits,self.conversions),(1,1,1))
+
+    async def test_page_comes_from_disk_after_a_restart(self):
+        await self.fetcher.fetch(self.url('/page'))
+        await self.fetcher.close()
+        self.fetcher=self.make_fetcher()
+        result=await self.fetcher.fetch(self.url('/page'))
+        self.assertEqual(result.source,'disk')
+        self.assertEqual(self.server.requests['/page'],1)
+
+    async def test_stale_page_is_revalidated_without_converting(self):
+        await self.fetcher.close()
+        self.fetcher=self.make_fetcher(fresh_for=0.0)
+        first=await self.fetcher.fetch(self.url('/page'))
+        second=await self.fetcher.fetch(self.url('/page'))
+        self.assertEqual(second.source,'revalidated')
+        self.assertEqual(second.markdown,first.markdown)
+        self.assertEqual((self.server.requests['/page'],self.server.revalidations,self.conversions),(2,1,1))
+
+    async def test_concurrent_fetches_share_one_request(self):
+        results=await asyncio.gather(*(self.fetcher.fetch(self.url('/slow')) for _ in range(3)))
+        self.assertEqual(self.server.requests['/slow'],1)
+        self.assertEqual(self.fetcher.stats.coalesced,2)
+        self.assertTrue(all(result.markdown=='<p>Slow</p>' for result in results))
+
+    async def test_no_store_and_errors_are_not_cached(self):
+        for path in ('/no-store','/missing'):
+            with self.subTest(path=path):
+                first=await self.fetcher.fetch(self.url(path))
+                second=await self.fetcher.fetch(self.url(path))
+                self.assertEqual((first.source,second.source),('network','network'))
+                self.assertEqual(self.server.requests[path],2)
+        self.assertEqual(os.listdir(self.directory.name),[])
+
+    async def test_body_is_cut_at_max_bytes(self):
+        await self.fetcher.close()
+        self.fetcher=self.make_fetcher(max_bytes=10000,chunk_size=4096)
+        result=await self.fetcher.fetch(self.url('/large'))
+        self.assertTrue(result.is_truncated)
+        self.assertLessEqual(len(result.markdown),10000)
+        self.assertIn('only its beginning was read',self.fetcher.paginate(result).to_string())
+
+    async def test_long_page_is_handed_out_in_pages(self):
+        await self.fetcher.close()
+        self.fetcher=self.make_fetcher(page_size=50000)
+        result=await self.fetcher.fetch(self.url('/large'))
+        page=self.fetcher.paginate(result)
+        markdown=page.markdown
+        while page.next_cursor is not None:
+            page=self.fetcher.get_page(page.next_cursor)
+            markdown+=page.markdown
+        self.assertGreater(page.pages,1)
+        self.assertEqual(markdown,result.markdown)
+
+    async def test_one_failing_url_does_not_fail_the_others(self):
+        ok,failed=await self.fetcher.fetch_many([self.url('/page'),'http://127.0.0.1:1/unreachable'])
+        self.assertEqual(ok.status,200)
+        self.assertIsInstance(failed,Exception)
+
+class DiskCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory=TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_least_recently_used_pages_are_evicted(self):
+        cache=DiskCache(self.directory.name,max_bytes=600)
+        for index in range(4):
+            cache.put(CacheEntry(url=f'https://example.com/{index}',markdown='x'*200))
+        self.assertLessEqual(cache.total,600)
+        self.assertIsNone(cache.get('https://example.com/0'))
+        self.assertIsNotNone(cache.get('https://example.com/3'))
+
+    def test_unreadable_entry_is_reported_on_stderr(self):
+        cache=DiskCache(self.directory.name)
+        with open(cache.get_path('https://example.com/'),'w',encoding='utf-8') as file:
+            file.write('{not json')
+        stdout,stderr=io.StringIO(),io.StringIO()
+        with redirect_stdout(stdout),redirect_stderr(stderr):
+            self.assertIsNone(cache.get('https://example.com/'))
+        self.assertEqual(stdout.getvalue(),'')
+        self.assertIn('Error:',stderr.getvalue())
+
+if __name__=='__main__':
+    unittest.main()